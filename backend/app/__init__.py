@@ -6,15 +6,40 @@ from flask_cors import CORS
 from flask_marshmallow import Marshmallow
 from flask_jwt_extended import JWTManager
 from datetime import timedelta
+from .events import EventBus
+from .cache import ResponseCache
+from .passwords import PasswordHasher
+from .leaderboard import Leaderboard
+from .database import RoutingSession, configure_database, init_engines
+from .metrics import Metrics
+from .identity import IdentityCache
+from .ratelimit import RateLimiter
+from .usernames import Usernames
+from .matchmaking import Matchmaker
+from .stats import Stats
+from .writebehind import WriteBehind
+from .logs import configure_logging
 
 # Initialize extensions
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={"class_": RoutingSession})
 migrate = Migrate()
 ma = Marshmallow()
 jwt = JWTManager()
+event_bus = EventBus()
+response_cache = ResponseCache()
+password_hasher = PasswordHasher()
+leaderboard = Leaderboard()
+metrics = Metrics()
+identity_cache = IdentityCache()
+rate_limiter = RateLimiter()
+usernames = Usernames()
+matchmaker = Matchmaker()
+stats = Stats()
+write_behind = WriteBehind()
 
 
-def create_app():
+def create_app(config=None):
+    """Build the app; `config` overrides settings before extensions start"""
     app = Flask(__name__)
     app.config["JWT_SECRET_KEY"] = os.getenv("JWT_SECRET_KEY", "super-secret-key")
     app.config["JWT_ACCESS_TOKEN_EXPIRES"] = timedelta(hours=24)
@@ -24,21 +49,50 @@ def create_app():
     # Config
     app.config["SQLALCHEMY_DATABASE_URI"] = os.getenv("DATABASE_URL", "sqlite:///app.db")
     app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+    app.config["ADMIN_TOKEN"] = os.getenv("ADMIN_TOKEN")
+    app.config["BCRYPT_ROUNDS"] = int(os.getenv("BCRYPT_ROUNDS", "12"))
+    app.config["PROFILE_SLOW_REQUEST_MS"] = float(os.getenv("PROFILE_SLOW_REQUEST_MS", "0")) or None
+    app.config["QUERY_COUNT_THRESHOLD"] = int(os.getenv("QUERY_COUNT_THRESHOLD", "0")) or None
+    app.config["QUERY_REPEAT_THRESHOLD"] = int(os.getenv("QUERY_REPEAT_THRESHOLD", "0")) or None
+    app.config["IDENTITY_CACHE_TTL_SECONDS"] = float(os.getenv("IDENTITY_CACHE_TTL_SECONDS", "60"))
+    app.config["MATCHMAKING_BAND_WIDTH"] = int(os.getenv("MATCHMAKING_BAND_WIDTH", "100"))
+    app.config.update(config or {})
+    configure_logging(app)
+    configure_database(app)
 
     # Initialize extensions with app
     db.init_app(app)
+    init_engines(app, db)
     migrate.init_app(app, db)
     ma.init_app(app)
     jwt.init_app(app)
+    identity_cache.init_app(app)
+    event_bus.init_app(app)
+    response_cache.init_app(app)
+    password_hasher.init_app(app)
+    leaderboard.init_app(app)
+    usernames.init_app(app)
+    matchmaker.init_app(app)
+    stats.init_app(app)
+    write_behind.init_app(app)
+    metrics.init_app(app)
+    rate_limiter.init_app(app)
     CORS(app)
 
     # Import and register routes
     from .routes import api_bp
     from .auth_routes import auth_bp
+    from .admin_routes import admin_bp
     
     app.register_blueprint(auth_bp)
     app.register_blueprint(api_bp)
+    app.register_blueprint(admin_bp)
 
-    from .models import Player, Game, Move  # Ensure models are imported
+    from .commands import export_cli, players_cli, simulate_cli
+    app.cli.add_command(export_cli)
+    app.cli.add_command(players_cli)
+    app.cli.add_command(simulate_cli)
+
+    from .models import Player, Game, Move, GameBoard, GameSnapshot, GamePlayer  # Ensure models are imported
 
     return app
@@ -0,0 +1,56 @@
+from flask import Blueprint, request, jsonify, current_app
+from .cleanup import purge_finished_games
+from . import response_cache, stats, write_behind
+from .writebehind import QueueStalled
+import hmac
+
+admin_bp = Blueprint("admin", __name__, url_prefix="/api/admin")
+
+
+def is_admin_request():
+    """Admin routes require the X-Admin-Token header to match ADMIN_TOKEN"""
+    expected = current_app.config.get("ADMIN_TOKEN")
+    provided = request.headers.get("X-Admin-Token", "")
+    # Admin routes stay disabled until a token is configured
+    if not expected:
+        return False
+    return hmac.compare_digest(provided, expected)
+
+
+@admin_bp.route("/games/purge", methods=["POST"])
+def purge_games():
+    """Purge finished games older than N days in chunks"""
+    if not is_admin_request():
+        return jsonify({"error": "Admin token required"}), 403
+
+    data = request.get_json(silent=True) or {}
+    older_than_days = data.get("older_than_days")
+    batch_size = data.get("batch_size", 500)
+
+    if not isinstance(older_than_days, int) or older_than_days < 0:
+        return jsonify({"error": "older_than_days must be a non-negative integer"}), 400
+    if not isinstance(batch_size, int) or not 1 <= batch_size <= 5000:
+        return jsonify({"error": "batch_size must be between 1 and 5000"}), 400
+
+    try:
+        # Purged games may have moves still queued for write-behind
+        with write_behind.paused():
+            games_deleted, moves_deleted = purge_finished_games(older_than_days, batch_size)
+    except QueueStalled:
+        return jsonify({"error": "Moves are still being saved; try again shortly"}), 503
+    if games_deleted:
+        response_cache.clear()
+        stats.invalidate()
+
+    return jsonify({
+        "deleted_games": games_deleted,
+        "deleted_moves": moves_deleted
+    }), 200
+
+
+@admin_bp.route("/cache", methods=["GET"])
+def cache_stats():
+    """Response cache hit/miss counters, for tuning CACHE_MAX_ENTRIES"""
+    if not is_admin_request():
+        return jsonify({"error": "Admin token required"}), 403
+    return jsonify(response_cache.stats()), 200
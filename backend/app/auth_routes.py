@@ -1,15 +1,26 @@
+import logging
 from flask import Blueprint, request, jsonify
 from .models import Player
-from . import db
-from flask_jwt_extended import create_access_token, create_refresh_token, jwt_required, get_jwt_identity
+from . import db, leaderboard, identity_cache, rate_limiter, usernames
+from .passwords import HasherBusy
+from .identity import token_claims
+from flask_jwt_extended import create_access_token, create_refresh_token, jwt_required
 import re
 
 auth_bp = Blueprint("auth", __name__, url_prefix="/api/auth")
+logger = logging.getLogger(__name__)
 
 # Email validation regex
 EMAIL_REGEX = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
 
 
+def hasher_busy_response():
+    """503 while the password hashing queue is full"""
+    response = jsonify({"error": "Server is busy, please retry shortly"})
+    response.headers["Retry-After"] = "1"
+    return response, 503
+
+
 def validate_password(password):
     """Validate password strength"""
     if len(password) < 8:
@@ -24,6 +35,7 @@ def validate_password(password):
 
 
 @auth_bp.route("/register", methods=["POST"])
+@rate_limiter.limit("register")
 def register():
     """Register a new player"""
     try:
@@ -71,9 +83,13 @@ def register():
 
         db.session.add(new_player)
         db.session.commit()
+        leaderboard.set_score(new_player.id, new_player.score)
+        usernames.add(new_player.name)
+        # SQLite can hand out a deleted player's id again
+        identity_cache.invalidate(new_player.id)
 
         # Create access token
-        access_token = create_access_token(identity=new_player.id)
+        access_token = create_access_token(identity=new_player.id, additional_claims=token_claims(new_player))
         refresh_token = create_refresh_token(identity=new_player.id)
 
         return jsonify({
@@ -88,12 +104,17 @@ def register():
             }
         }), 201
 
+    except HasherBusy:
+        db.session.rollback()
+        return hasher_busy_response()
     except Exception as e:
+        logger.exception("Registration failed")
         db.session.rollback()
         return jsonify({"error": f"Registration failed: {str(e)}"}), 500
 
 
 @auth_bp.route("/login", methods=["POST"])
+@rate_limiter.limit("login")
 def login():
     """Login an existing player"""
     try:
@@ -118,8 +139,16 @@ def login():
         if not player.check_password(password):
             return jsonify({"error": "Invalid username or password"}), 401
 
+        # Upgrade hashes made with an old BCRYPT_ROUNDS while we have the password
+        if player.password_needs_rehash():
+            try:
+                player.set_password(password)
+                db.session.commit()
+            except HasherBusy:
+                db.session.rollback()
+
         # Create tokens
-        access_token = create_access_token(identity=player.id)
+        access_token = create_access_token(identity=player.id, additional_claims=token_claims(player))
         refresh_token = create_refresh_token(identity=player.id)
 
         return jsonify({
@@ -134,7 +163,10 @@ def login():
             }
         }), 200
 
+    except HasherBusy:
+        return hasher_busy_response()
     except Exception as e:
+        logger.exception("Login failed")
         return jsonify({"error": f"Login failed: {str(e)}"}), 500
 
 
@@ -143,8 +175,10 @@ def login():
 def refresh():
     """Refresh access token using refresh token"""
     try:
-        current_user_id = get_jwt_identity()
-        new_access_token = create_access_token(identity=current_user_id)
+        player = identity_cache.current()
+        if not player:
+            return jsonify({"error": "User not found"}), 404
+        new_access_token = create_access_token(identity=player.id, additional_claims=token_claims(player))
 
         return jsonify({
             "access_token": new_access_token
@@ -159,8 +193,7 @@ def refresh():
 def get_current_user():
     """Get current logged in user info"""
     try:
-        current_user_id = get_jwt_identity()
-        player = Player.query.get(current_user_id)
+        player = identity_cache.current()
 
         if not player:
             return jsonify({"error": "User not found"}), 404
@@ -180,8 +213,9 @@ def get_current_user():
 
 
 @auth_bp.route("/check-username", methods=["POST"])
+@rate_limiter.limit("check_username")
 def check_username():
-    """Check if username is available"""
+    """Check if username is available; taken names come with suggestions"""
     try:
         data = request.get_json()
         name = data.get("name", "").strip()
@@ -189,11 +223,26 @@ def check_username():
         if not name:
             return jsonify({"available": False, "error": "Username is required"}), 400
 
-        existing_user = Player.query.filter_by(name=name).first()
-
-        return jsonify({
-            "available": existing_user is None
-        }), 200
+        return jsonify(usernames.check(name)), 200
 
     except Exception as e:
         return jsonify({"error": str(e)}), 500
+
+
+# Maximum number of names accepted by a single batch check
+MAX_BATCH_NAMES = 100
+
+
+@auth_bp.route("/check-username/batch", methods=["POST"])
+@rate_limiter.limit("check_username_batch")
+def check_usernames_batch():
+    """Check up to MAX_BATCH_NAMES usernames at once"""
+    data = request.get_json(silent=True) or {}
+    names = data.get("names")
+
+    if not isinstance(names, list) or not names or not all(isinstance(name, str) for name in names):
+        return jsonify({"error": "Expected a non-empty array of names"}), 400
+    if len(names) > MAX_BATCH_NAMES:
+        return jsonify({"error": f"At most {MAX_BATCH_NAMES} names per batch"}), 400
+
+    return jsonify({"results": {name: usernames.check(name.strip()) for name in names}}), 200
@@ -0,0 +1,133 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from importlib import import_module
+from flask import current_app, request
+
+
+class LRUCache:
+    """Thread-safe in-process LRU cache with a per-entry TTL.
+
+    Any object with the same get/set/delete/clear/stats methods can be
+    used as a CACHE_BACKEND instead.
+    """
+
+    def __init__(self, maxsize=10000, ttl=60):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires, value = entry
+            if expires < time.monotonic():
+                del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+            }
+
+
+def make_etag(body):
+    return hashlib.blake2b(body, digest_size=16).hexdigest()
+
+
+class ResponseCache:
+    """Flask extension caching serialized JSON responses of read routes.
+
+    Entries hold the response body and its ETag, so a hit skips both the
+    query and the serialization, and If-None-Match gets a 304. Mutating
+    routes call invalidate() after they commit. Each worker has its own
+    cache, so CACHE_TTL_SECONDS bounds how stale another worker can be.
+    """
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault("CACHE_BACKEND", None)
+        app.config.setdefault("CACHE_MAX_ENTRIES", 10000)
+        app.config.setdefault("CACHE_TTL_SECONDS", 60)
+        backend = app.config["CACHE_BACKEND"]
+        if backend is None:
+            backend = LRUCache(app.config["CACHE_MAX_ENTRIES"], app.config["CACHE_TTL_SECONDS"])
+        elif isinstance(backend, str):
+            module_name, _, class_name = backend.partition(":")
+            backend = getattr(import_module(module_name), class_name)()
+        app.extensions["response_cache"] = backend
+
+    @property
+    def backend(self):
+        return current_app.extensions["response_cache"]
+
+    def cached_view(self, key_template):
+        """Cache a view's 200 responses under key_template.format(**view_args)"""
+        def decorator(view):
+            @wraps(view)
+            def wrapper(**kwargs):
+                key = key_template.format(**kwargs)
+                entry = self.backend.get(key)
+                if entry is None:
+                    response = current_app.make_response(view(**kwargs))
+                    if response.status_code != 200:
+                        return response
+                    body = response.get_data()
+                    # Views may set their own ETag (a version, say); else hash the body
+                    etag, _ = response.get_etag()
+                    entry = (body, etag or make_etag(body))
+                    self.backend.set(key, entry)
+
+                body, etag = entry
+                response = current_app.response_class(body, mimetype="application/json")
+                response.set_etag(etag)
+                return response.make_conditional(request)
+            return wrapper
+        return decorator
+
+    def invalidate(self, *keys):
+        self.backend.delete(*keys)
+
+    def clear(self):
+        self.backend.clear()
+
+    def stats(self):
+        return self.backend.stats()
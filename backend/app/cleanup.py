@@ -0,0 +1,48 @@
+from datetime import datetime, timedelta
+from . import db
+from .models import Game, Move, GameBoard, GameSnapshot, GamePlayer
+
+
+def delete_games(game_ids):
+    """Delete games, their moves, seats and stored boards with set-based DELETEs.
+
+    Does not commit; callers decide the transaction boundary.
+    Returns (games_deleted, moves_deleted).
+    """
+    if not game_ids:
+        return 0, 0
+    GameSnapshot.query.filter(GameSnapshot.game_id.in_(game_ids)).delete(
+        synchronize_session=False)
+    GameBoard.query.filter(GameBoard.game_id.in_(game_ids)).delete(
+        synchronize_session=False)
+    GamePlayer.query.filter(GamePlayer.game_id.in_(game_ids)).delete(
+        synchronize_session=False)
+    moves_deleted = Move.query.filter(Move.game_id.in_(game_ids)).delete(
+        synchronize_session=False)
+    games_deleted = Game.query.filter(Game.id.in_(game_ids)).delete(
+        synchronize_session=False)
+    return games_deleted, moves_deleted
+
+
+def purge_finished_games(older_than_days, batch_size=500):
+    """Delete finished games older than N days, one chunk per transaction.
+
+    Committing after every chunk releases SQLite's writer lock between
+    batches so normal game traffic keeps flowing during a cleanup run.
+    """
+    cutoff = datetime.utcnow() - timedelta(days=older_than_days)
+    total_games = total_moves = 0
+
+    while True:
+        ids = [row.id for row in db.session.query(Game.id)
+               .filter(Game.status == "finished", Game.created_at < cutoff)
+               .order_by(Game.id)
+               .limit(batch_size)]
+        if not ids:
+            break
+        games_deleted, moves_deleted = delete_games(ids)
+        db.session.commit()
+        total_games += games_deleted
+        total_moves += moves_deleted
+
+    return total_games, total_moves
@@ -0,0 +1,359 @@
+"""Management commands for whole-table jobs, run through the flask CLI:
+
+    flask export moves moves.bin [--format packed|ndjson] [--workers 4]
+    flask export players players.ndjson
+    flask players rescore
+    flask simulate engine|api --games N [--workers 4] [--strategy random]
+
+Rows stream through server-side cursors (yield_per) in id order, so
+memory stays flat however large the table is. An export records a
+checkpoint next to its output after every chunk; running the same
+command again after an interrupt carries on from the last completed
+chunk (--restart starts over). --workers splits the id range between
+processes, each writing a part file, and joins the parts at the end.
+The simulate commands are described in simulation.py.
+"""
+import json
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from sqlalchemy import event
+
+from . import db
+from .models import Player, Game, Move, GameBoard
+from .packed import MAGIC, pack_moves
+from .engine import GameState
+from .leaderboard import WIN_POINTS
+from . import simulation
+
+CHUNK_SIZE = 10000
+CHECKPOINT_SUFFIX = ".checkpoint"
+
+export_cli = AppGroup("export", help="Export tables in streaming chunks.")
+players_cli = AppGroup("players", help="Whole-table player maintenance.")
+simulate_cli = AppGroup("simulate", help="Bot self-play for benchmarks and load tests.")
+
+
+def _json_default(value):
+    return value.isoformat()
+
+
+def _ndjson(names):
+    def encode(rows):
+        return "".join(json.dumps(dict(zip(names, row)), sort_keys=True, default=_json_default) + "\n"
+                       for row in rows).encode()
+    return encode
+
+
+def _packed(rows):
+    return b"".join(pack_moves(rows, header=False))
+
+
+# table -> (model, columns, {format: (stream header, chunk encoder)})
+MOVE_COLUMNS = (Move.game_id, Move.id, Move.player_id, Move.dice_roll, Move.piece_id, Move.position, Move.seat)
+PLAYER_COLUMNS = (Player.id, Player.name, Player.email, Player.score, Player.created_at)
+TABLES = {
+    "moves": (Move, MOVE_COLUMNS, {
+        "packed": (MAGIC, _packed),
+        "ndjson": (b"", _ndjson([column.key for column in MOVE_COLUMNS])),
+    }),
+    "players": (Player, PLAYER_COLUMNS, {
+        "ndjson": (b"", _ndjson([column.key for column in PLAYER_COLUMNS])),
+    }),
+}
+
+
+def _read_checkpoint(path):
+    try:
+        with open(path + CHECKPOINT_SUFFIX) as source:
+            return json.load(source)
+    except FileNotFoundError:
+        return None
+
+
+def _write_checkpoint(path, state):
+    # Write-then-rename so a crash never leaves a half-written checkpoint
+    tmp = path + CHECKPOINT_SUFFIX + ".tmp"
+    with open(tmp, "w") as out:
+        json.dump(state, out)
+        out.flush()
+        os.fsync(out.fileno())
+    os.replace(tmp, path + CHECKPOINT_SUFFIX)
+
+
+def _remove_checkpoint(path):
+    try:
+        os.remove(path + CHECKPOINT_SUFFIX)
+    except FileNotFoundError:
+        pass
+
+
+def export_range(table, encoding, path, lower, upper, chunk_size=CHUNK_SIZE, header=True):
+    """Write rows with lower < id <= upper to `path`, resuming from its checkpoint.
+
+    Returns the number of rows in the file.
+    """
+    model, columns, encodings = TABLES[table]
+    stream_header, encode = encodings[encoding]
+    checkpoint = _read_checkpoint(path)
+    if checkpoint is not None and checkpoint["done"]:
+        return checkpoint["rows"]
+
+    if checkpoint is None:
+        out = open(path, "wb")
+        if header:
+            out.write(stream_header)
+        after, written = lower, 0
+    else:
+        # Drop anything written after the last checkpoint
+        out = open(path, "r+b")
+        out.truncate(checkpoint["offset"])
+        out.seek(checkpoint["offset"])
+        after, written = checkpoint["after_id"], checkpoint["rows"]
+
+    statement = (db.select(*columns)
+                 .where(model.id > after, model.id <= upper)
+                 .order_by(model.id)
+                 .execution_options(yield_per=chunk_size))
+    with out:
+        result = db.session.execute(statement)
+        for rows in result.partitions():
+            out.write(encode(rows))
+            out.flush()
+            os.fsync(out.fileno())
+            written += len(rows)
+            after = rows[-1].id
+            _write_checkpoint(path, {"after_id": after, "rows": written, "offset": out.tell(), "done": False})
+        result.close()
+        _write_checkpoint(path, {"after_id": after, "rows": written, "offset": out.tell(), "done": True})
+    db.session.rollback()
+    return written
+
+
+def split_ids(model, workers):
+    """[(lower, upper)] id ranges covering the table, one per worker"""
+    low, high = db.session.query(db.func.min(model.id), db.func.max(model.id)).one()
+    if low is None:
+        return [(0, 0)]
+    workers = max(1, min(workers, high - low + 1))
+    bounds = [low - 1 + (high - low + 1) * index // workers for index in range(workers + 1)]
+    return list(zip(bounds, bounds[1:]))
+
+
+# App inherited by forked export workers
+_worker_app = None
+
+
+def _export_part(job):
+    with _worker_app.app_context():
+        return export_range(*job)
+
+
+def _disable_mmap(dbapi_connection, connection_record):
+    dbapi_connection.execute("PRAGMA mmap_size=0")
+
+
+def export(table, out, encoding, chunk_size, workers, restart):
+    """Export `table` to `out`, resuming an interrupted run unless `restart`"""
+    global _worker_app
+
+    # A single pass gains nothing from SQLite's mmap, and the mapped pages of
+    # a large database would count against this process's memory
+    for engine in db.engines.values():
+        if engine.dialect.name == "sqlite":
+            event.listen(engine, "connect", _disable_mmap)
+            engine.dispose()
+
+    # The id ranges are fixed on the first run so a resumed run matches it
+    plan = None if restart else _read_checkpoint(out)
+    if plan is None:
+        plan = {"table": table, "format": encoding, "ranges": split_ids(TABLES[table][0], workers)}
+        db.session.rollback()
+        _write_checkpoint(out, plan)
+    elif (plan["table"], plan["format"]) != (table, encoding):
+        raise click.UsageError(f"{out} is a {plan['format']} {plan['table']} export; pass --restart to replace it")
+
+    parts = [f"{out}.part{index}" for index in range(len(plan["ranges"]))]
+    if restart:
+        for part in parts:
+            _remove_checkpoint(part)
+    jobs = [(table, encoding, part, lower, upper, chunk_size, index == 0)
+            for index, (part, (lower, upper)) in enumerate(zip(parts, plan["ranges"]))]
+
+    if len(jobs) == 1:
+        counts = [export_range(*jobs[0])]
+    else:
+        # Forked workers reuse this app; each opens its own connections
+        _worker_app = current_app._get_current_object()
+        context = multiprocessing.get_context("fork")
+        with ProcessPoolExecutor(len(jobs), mp_context=context) as pool:
+            counts = list(pool.map(_export_part, jobs))
+
+    if len(parts) == 1:
+        os.replace(parts[0], out)
+    else:
+        with open(out, "wb") as target:
+            for part in parts:
+                with open(part, "rb") as source:
+                    while chunk := source.read(1 << 20):
+                        target.write(chunk)
+        for part in parts:
+            os.remove(part)
+    for part in parts:
+        _remove_checkpoint(part)
+    _remove_checkpoint(out)
+    click.echo(f"Exported {sum(counts)} {table} to {out}")
+
+
+chunk_size_option = click.option("--chunk-size", default=CHUNK_SIZE, show_default=True,
+                                 help="Rows per chunk and checkpoint.")
+restart_option = click.option("--restart", is_flag=True, help="Ignore checkpoints from an earlier run.")
+
+
+@export_cli.command("moves")
+@click.argument("out", type=click.Path(dir_okay=False))
+@click.option("--format", "encoding", default="packed", show_default=True, type=click.Choice(["packed", "ndjson"]))
+@chunk_size_option
+@click.option("--workers", default=1, show_default=True, help="Processes, each exporting an id range.")
+@restart_option
+def export_moves(out, encoding, chunk_size, workers, restart):
+    """Export all moves to OUT."""
+    export("moves", out, encoding, chunk_size, workers, restart)
+
+
+@export_cli.command("players")
+@click.argument("out", type=click.Path(dir_okay=False))
+@chunk_size_option
+@restart_option
+def export_players(out, chunk_size, restart):
+    """Export all players (without password hashes) to OUT as NDJSON."""
+    export("players", out, "ndjson", chunk_size, 1, restart)
+
+
+@players_cli.command("rescore")
+@click.option("--chunk-size", default=1000, show_default=True, help="Finished games per chunk.")
+def rescore_players(chunk_size):
+    """Recompute every score as WIN_POINTS per finished game won.
+
+    Wins are counted from games.winner_id. Finished games without one
+    (finished before it was recorded) are credited to whoever last played
+    the winning seat on their stored board, as award_win() does, and
+    their winner_id is backfilled. Overwrites scores set by hand. Running
+    workers pick up the new scores on their next leaderboard refresh.
+    """
+    games = (db.select(Game.id, GameBoard.state)
+             .outerjoin(GameBoard, GameBoard.game_id == Game.id)
+             .where(Game.status == "finished", Game.winner_id.is_(None))
+             .order_by(Game.id)
+             .execution_options(yield_per=chunk_size))
+    skipped = 0
+    credited = []
+    for rows in db.session.execute(games).partitions():
+        winners = {}
+        for game_id, state in rows:
+            if state is None:
+                skipped += 1
+                continue
+            seat = GameState.from_bytes(state).winner()
+            if seat is not None:
+                winners[game_id] = seat
+        if not winners:
+            continue
+        # Whoever last played the winning seat, as in award_win()
+        last_moves = (db.select(Move.game_id, Move.seat, db.func.max(Move.id).label("id"))
+                      .where(Move.game_id.in_(winners))
+                      .group_by(Move.game_id, Move.seat)
+                      .subquery())
+        players = db.session.execute(
+            db.select(last_moves.c.game_id, last_moves.c.seat, Move.player_id)
+            .join(Move, Move.id == last_moves.c.id))
+        credited.extend((game_id, player_id) for game_id, seat, player_id in players if winners[game_id] == seat)
+
+    if credited:
+        table = Game.__table__
+        db.session.execute(table.update()
+                           .where(table.c.id == db.bindparam("game"))
+                           .values(winner_id=db.bindparam("winner"), version=table.c.version + 1),
+                           [{"game": game_id, "winner": player_id} for game_id, player_id in credited])
+    wins = dict(db.session.execute(
+        db.select(Game.winner_id, db.func.count(Game.id))
+        .where(Game.status == "finished", Game.winner_id.is_not(None))
+        .group_by(Game.winner_id)).all())
+    Player.query.update({Player.score: 0}, synchronize_session=False)
+    if wins:
+        db.session.execute(db.update(Player), [{"id": player_id, "score": count * WIN_POINTS}
+                                               for player_id, count in wins.items()])
+    db.session.commit()
+    click.echo(f"Rescored players: {len(wins)} with wins, {sum(wins.values())} games counted")
+    if credited:
+        click.echo(f"Backfilled the winner of {len(credited)} finished games")
+    if skipped:
+        click.echo(f"Skipped {skipped} finished games with no stored board")
+
+
+def _strategies(ctx, param, value):
+    names = [name.strip() for name in value.split(",") if name.strip()]
+    if len(names) == 1:
+        names *= len(simulation.SEATS)
+    if len(names) != len(simulation.SEATS):
+        raise click.BadParameter(f"give one strategy or {len(simulation.SEATS)}, one per seat")
+    for name in names:
+        try:
+            simulation.resolve_strategy(name)
+        except (ValueError, ImportError, AttributeError) as err:
+            raise click.BadParameter(str(err))
+    return names
+
+
+games_option = click.option("--games", default=1000, show_default=True, help="Games to play.")
+workers_option = click.option("--workers", default=1, show_default=True, help="Processes sharing the games.")
+strategy_option = click.option(
+    "--strategy", "strategies", default="random", show_default=True, callback=_strategies,
+    help=f"Bot strategy for every seat, or one per seat separated by commas "
+         f"({', '.join(simulation.STRATEGIES)} or module:function).")
+seed_option = click.option("--seed", default=1, show_default=True, help="Seed for dice and bot choices.")
+
+
+@simulate_cli.command("engine")
+@games_option
+@workers_option
+@strategy_option
+@seed_option
+def simulate_engine(games, workers, strategies, seed):
+    """Play bot games in memory and report games/sec."""
+    tally, elapsed = simulation.run("engine", games, strategies, workers, seed)
+    for line in tally.report(elapsed, strategies):
+        click.echo(line)
+
+
+@simulate_cli.command("api")
+@games_option
+@workers_option
+@strategy_option
+@seed_option
+@click.option("--database-url", help="Database to play against (default: a throwaway SQLite file).")
+def simulate_api(games, workers, strategies, seed, database_url):
+    """Play bot games through the HTTP API and report per-endpoint latency.
+
+    Bots register, take seats through the lobby, post every move and
+    finish each game, all through the Flask test client. Rate limits are
+    off. Pass --database-url only for a database you can fill with bot
+    players and games. Exits non-zero on any failed request or any move
+    the server placed differently from the local engine.
+    """
+    scratch = None
+    if database_url is None:
+        database_url, scratch = simulation.scratch_database()
+    try:
+        tally, elapsed = simulation.run("api", games, strategies, workers, seed, database_url)
+    finally:
+        if scratch is not None:
+            scratch.cleanup()
+    for line in tally.report(elapsed, strategies):
+        click.echo(line)
+    if tally.mismatches or sum(tally.errors.values()):
+        raise click.exceptions.Exit(1)
@@ -0,0 +1,57 @@
+"""Optimistic concurrency for games.
+
+Every game has a version, raised by one whenever the game or its move log
+changes, and a turn_seq counting the moves it has accepted. Game
+responses and new moves carry the version as their ETag; a client sends
+it back in If-Match to name the version it acted on. Writes are
+compare-and-swap: UPDATE ... WHERE version = ? matching no row means
+another request changed the game first, and the route answers 409
+instead of applying the change on top. Without If-Match the version the
+route read at the start of the request is used, so two requests racing
+on one game can't both apply to the same version.
+"""
+from . import db
+from .models import Game
+
+
+class PreconditionError(ValueError):
+    """Raised when the If-Match header is not a single game version"""
+
+
+def version_etag(version):
+    return str(version)
+
+
+def expected_version(request):
+    """The game version in the request's If-Match header, or None if absent or *"""
+    if_match = request.if_match
+    if not if_match or if_match.star_tag:
+        return None
+    tags = if_match.as_set()
+    if len(tags) != 1:
+        raise PreconditionError("If-Match must hold exactly one game version")
+    try:
+        return int(next(iter(tags)))
+    except ValueError:
+        raise PreconditionError("If-Match must be a game version")
+
+
+def current_version(game_id):
+    return db.session.query(Game.version).filter(Game.id == game_id).scalar()
+
+
+def advance_game(game_id, version=None, turns=0):
+    """Raise a game's version by one and its turn_seq by `turns`.
+
+    A single UPDATE ... WHERE version = ? (no version check when `version`
+    is None). Returns the new (version, turn_seq), or None if the game is
+    not at `version`. Does not commit.
+    """
+    statement = db.update(Game).where(Game.id == game_id)
+    if version is not None:
+        statement = statement.where(Game.version == version)
+    row = db.session.execute(
+        statement.values(version=Game.version + 1, turn_seq=Game.turn_seq + turns)
+        .returning(Game.version, Game.turn_seq)
+        .execution_options(synchronize_session=False)).first()
+    return tuple(row) if row is not None else None
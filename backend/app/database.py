@@ -0,0 +1,140 @@
+"""Database engine setup.
+
+create_app() builds the pool options and an optional read-only "reader"
+bind from the environment. RoutingSession then sends plain SELECTs to
+the reader and everything else (flushes, bulk writes, SELECT ... FOR
+UPDATE and any read after the first write in a transaction) to the
+default engine, the writer.
+
+File-based SQLite gets WAL mode and a few pragmas on every connection.
+The writer opens transactions with BEGIN IMMEDIATE, so concurrent
+writers queue on busy_timeout instead of failing to upgrade a read lock
+with "database is locked".
+"""
+import os
+import sqlalchemy as sa
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from flask_sqlalchemy.session import Session
+
+READER = "reader"
+
+
+def _env_int(name, default):
+    value = os.getenv(name)
+    return int(value) if value not in (None, "") else default
+
+
+def _env_flag(name, default):
+    value = os.getenv(name)
+    if value in (None, ""):
+        return default
+    return value.lower() in ("1", "true", "yes", "on")
+
+
+def is_sqlite_file(uri):
+    url = make_url(uri)
+    return (url.get_backend_name() == "sqlite"
+            and url.database not in (None, "", ":memory:")
+            and url.query.get("mode") != "memory")
+
+
+def engine_options(uri):
+    """SQLALCHEMY_ENGINE_OPTIONS for `uri`, tunable through DB_POOL_* variables"""
+    url = make_url(uri)
+    if url.get_backend_name() == "sqlite" and not is_sqlite_file(uri):
+        # In-memory SQLite uses a single static connection
+        return {}
+    server = url.get_backend_name() != "sqlite"
+    return {
+        "pool_size": _env_int("DB_POOL_SIZE", 10),
+        "max_overflow": _env_int("DB_MAX_OVERFLOW", 20),
+        "pool_timeout": _env_int("DB_POOL_TIMEOUT", 30),
+        "pool_recycle": _env_int("DB_POOL_RECYCLE", 1800),
+        "pool_pre_ping": _env_flag("DB_POOL_PRE_PING", server),
+    }
+
+
+def configure_database(app):
+    """Fill in engine, bind and SQLite settings not already in app.config"""
+    uri = app.config["SQLALCHEMY_DATABASE_URI"]
+    options = app.config.setdefault("SQLALCHEMY_ENGINE_OPTIONS", engine_options(uri))
+
+    # SQLite readers can share the file; other databases need a replica URL
+    read_uri = os.getenv("DATABASE_READ_URL") or (uri if is_sqlite_file(uri) else None)
+    app.config.setdefault("SQLALCHEMY_BINDS", {READER: {"url": read_uri, **options}} if read_uri else {})
+
+    app.config.setdefault("SQLITE_TUNING", _env_flag("SQLITE_TUNING", True))
+    app.config.setdefault("SQLITE_BUSY_TIMEOUT_MS", _env_int("SQLITE_BUSY_TIMEOUT_MS", 5000))
+    app.config.setdefault("SQLITE_MMAP_SIZE", _env_int("SQLITE_MMAP_SIZE", 256 * 1024 * 1024))
+
+
+def init_engines(app, db):
+    """Install the SQLite connect hooks; call after db.init_app(app)"""
+    with app.app_context():
+        engines = dict(db.engines)
+
+    # A pre-forking server (gunicorn --preload) builds the app once in the
+    # master; each worker must open its own connections
+    def reset_pools():
+        for engine in engines.values():
+            engine.dispose(close=False)
+    if hasattr(os, "register_at_fork"):
+        os.register_at_fork(after_in_child=reset_pools)
+
+    if not app.config["SQLITE_TUNING"]:
+        return
+    for key, engine in engines.items():
+        if is_sqlite_file(engine.url):
+            _tune_sqlite(engine, app.config, read_only=key == READER)
+
+
+def _tune_sqlite(engine, config, read_only):
+    busy_timeout = int(config["SQLITE_BUSY_TIMEOUT_MS"])
+    mmap_size = int(config["SQLITE_MMAP_SIZE"])
+
+    @event.listens_for(engine, "connect")
+    def on_connect(dbapi_connection, connection_record):
+        # Stop pysqlite issuing its own BEGIN; on_begin below does it
+        dbapi_connection.isolation_level = None
+        cursor = dbapi_connection.cursor()
+        cursor.execute(f"PRAGMA busy_timeout={busy_timeout}")
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute(f"PRAGMA mmap_size={mmap_size}")
+        if read_only:
+            cursor.execute("PRAGMA query_only=ON")
+        cursor.close()
+
+    @event.listens_for(engine, "begin")
+    def on_begin(connection):
+        connection.exec_driver_sql("BEGIN" if read_only else "BEGIN IMMEDIATE")
+
+
+class RoutingSession(Session):
+    """Session that reads from the "reader" bind when one is configured.
+
+    Once a transaction has used the writer it sticks to it, so a request
+    always sees its own uncommitted changes.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and not self._needs_writer(clause):
+            reader = self._db.engines.get(READER)
+            if reader is not None:
+                return reader
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+    def _needs_writer(self, clause):
+        if self._flushing or self.info.get("writer"):
+            return True
+        if isinstance(clause, sa.Select) and clause._for_update_arg is None:
+            return False
+        self.info["writer"] = True
+        return True
+
+
+@event.listens_for(RoutingSession, "after_transaction_end")
+def _reset_writer(session, transaction):
+    if transaction.parent is None:
+        session.info.pop("writer", None)
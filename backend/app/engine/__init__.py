@@ -0,0 +1,10 @@
+"""Server-side Ludo engine operating on a compact GameState"""
+from .rules import SEATS, FINISHED, YARD, target_position
+from .state import (
+    GameState, IllegalMove, legal_moves, apply_move, skip_turn, replay,
+)
+
+__all__ = [
+    "SEATS", "FINISHED", "YARD", "target_position",
+    "GameState", "IllegalMove", "legal_moves", "apply_move", "skip_turn", "replay",
+]
@@ -0,0 +1,96 @@
+"""Ludo rules, ported from client/src/components/TokenCapture.jsx and pathData.js.
+
+Token positions are stored as progress along the token's own route:
+
+    0       in the yard (not entered yet)
+    1-51    on the shared track, 1 being the seat's start square
+    52-56   in the seat's victory lane
+    57      finished
+
+This matches the 0-57 range MoveSchema validates for `position`.
+"""
+
+SEATS = ("Blue", "Red", "Green", "Yellow")
+NUM_SEATS = 4
+TOKENS_PER_SEAT = 4
+
+TRACK_LENGTH = 52
+# Index into mainPath where each seat enters the track (playerStartIndex)
+START_SQUARE = (3, 16, 29, 42)
+# Squares where tokens cannot be captured (isSafePosition)
+SAFE_SQUARES = frozenset((1, 9, 14, 22, 27, 35, 40, 48) + START_SQUARE)
+
+YARD = 0
+LAST_TRACK_STEP = 51
+FINISHED = 57
+ENTER_ROLL = 6
+
+
+def _square_table(seat):
+    start = START_SQUARE[seat]
+    table = [-1] * (FINISHED + 1)
+    for step in range(1, LAST_TRACK_STEP + 1):
+        table[step] = (start + step - 1) % TRACK_LENGTH
+    return tuple(table)
+
+
+# SQUARE[seat][progress] -> shared track square, or -1 off the track
+SQUARE = tuple(_square_table(seat) for seat in range(NUM_SEATS))
+# SLOT[seat][progress] -> index into GameState.occupancy, or -1 off the track
+SLOT = tuple(
+    tuple(-1 if square < 0 else square * NUM_SEATS + seat for square in SQUARE[seat])
+    for seat in range(NUM_SEATS)
+)
+
+
+def _target(progress, dice):
+    if progress == YARD:
+        return 1 if dice == ENTER_ROLL else None
+    new = progress + dice
+    # Exact roll needed to finish; finished tokens never move
+    if new > FINISHED or progress == FINISHED:
+        return None
+    return new
+
+
+# NEXT[progress * 7 + dice] -> new progress, or ILLEGAL
+ILLEGAL = 0xFF
+NEXT = bytes(
+    ILLEGAL if dice == 0 or _target(progress, dice) is None else _target(progress, dice)
+    for progress in range(FINISHED + 1)
+    for dice in range(7)
+)
+
+
+def _step_table(seat):
+    squares = SQUARE[seat]
+    table = []
+    for progress in range(FINISHED + 1):
+        for dice in range(7):
+            new = NEXT[progress * 7 + dice]
+            if new == ILLEGAL:
+                table.append(None)
+                continue
+            old_square = squares[progress]
+            new_square = squares[new]
+            table.append((
+                new,
+                old_square,
+                old_square * NUM_SEATS + seat if old_square >= 0 else -1,
+                new_square,
+                new_square * NUM_SEATS + seat if new_square >= 0 else -1,
+                new_square >= 0 and new_square not in SAFE_SQUARES,
+            ))
+    return tuple(table)
+
+
+# STEP[seat][progress * 7 + dice] -> None if illegal, else
+# (new, old_square, old_slot, new_square, new_slot, can_capture)
+# so apply_move resolves a whole move with a single lookup
+STEP = tuple(_step_table(seat) for seat in range(NUM_SEATS))
+
+
+def target_position(progress, dice):
+    """Where a token at `progress` ends up after rolling `dice`, or None if it can't move"""
+    new = NEXT[progress * 7 + dice]
+    return None if new == ILLEGAL else new
@@ -0,0 +1,166 @@
+from .rules import (
+    NUM_SEATS, TOKENS_PER_SEAT, TRACK_LENGTH, FINISHED, ENTER_ROLL,
+    SQUARE, SLOT, STEP, NEXT, ILLEGAL,
+)
+
+NUM_TOKENS = NUM_SEATS * TOKENS_PER_SEAT
+
+
+class IllegalMove(ValueError):
+    """Raised when a move breaks the Ludo rules for the current state"""
+
+
+class GameState:
+    """Compact board state: 16 token positions plus whose turn it is.
+
+    tokens[seat * 4 + piece] holds each token's progress (see rules.py).
+    occupancy[square * 4 + seat] counts a seat's tokens on each track
+    square and crowd[square] counts all tokens there; both are derived
+    from tokens and let capture checks run in O(1).
+    """
+
+    __slots__ = ("tokens", "turn", "occupancy", "crowd")
+
+    def __init__(self, tokens=None, turn=0):
+        self.tokens = bytearray(tokens) if tokens is not None else bytearray(NUM_TOKENS)
+        self.turn = turn
+        self.occupancy = bytearray(TRACK_LENGTH * NUM_SEATS)
+        self.crowd = bytearray(TRACK_LENGTH)
+        for index, progress in enumerate(self.tokens):
+            slot = SLOT[index >> 2][progress]
+            if slot >= 0:
+                self.occupancy[slot] += 1
+                self.crowd[slot // NUM_SEATS] += 1
+
+    def copy(self):
+        clone = GameState.__new__(GameState)
+        clone.tokens = bytearray(self.tokens)
+        clone.turn = self.turn
+        clone.occupancy = bytearray(self.occupancy)
+        clone.crowd = bytearray(self.crowd)
+        return clone
+
+    def to_bytes(self):
+        """17 bytes: the token positions followed by the turn index"""
+        return bytes(self.tokens) + bytes((self.turn,))
+
+    @classmethod
+    def from_bytes(cls, data):
+        if len(data) != NUM_TOKENS + 1:
+            raise ValueError("Game state must be %d bytes" % (NUM_TOKENS + 1))
+        return cls(data[:NUM_TOKENS], data[NUM_TOKENS])
+
+    def positions(self, seat):
+        base = seat * TOKENS_PER_SEAT
+        return list(self.tokens[base:base + TOKENS_PER_SEAT])
+
+    def winner(self):
+        """Seat index whose four tokens are all finished, or None"""
+        for seat in range(NUM_SEATS):
+            base = seat * TOKENS_PER_SEAT
+            if self.tokens[base:base + TOKENS_PER_SEAT] == bytes((FINISHED,) * TOKENS_PER_SEAT):
+                return seat
+        return None
+
+    def __eq__(self, other):
+        return (isinstance(other, GameState)
+                and self.tokens == other.tokens and self.turn == other.turn)
+
+    def __repr__(self):
+        return "<GameState turn=%r tokens=%r>" % (self.turn, list(self.tokens))
+
+
+def legal_moves(state, dice):
+    """Pieces (0-3) the seat whose turn it is may move with this roll"""
+    if not 0 < dice < 7:
+        return []
+    base = state.turn * TOKENS_PER_SEAT
+    tokens = state.tokens
+    return [piece for piece in range(TOKENS_PER_SEAT)
+            if NEXT[tokens[base + piece] * 7 + dice] != ILLEGAL]
+
+
+def apply_move(state, piece, dice):
+    """Move `piece` of the current seat by `dice`, capturing and passing the turn.
+
+    Mutates `state` in place and returns the token's new position.
+    Raises IllegalMove if the move is not allowed.
+    """
+    if not (0 < dice < 7 and 0 <= piece < TOKENS_PER_SEAT):
+        if not 0 < dice < 7:
+            raise IllegalMove("Dice roll must be between 1 and 6")
+        raise IllegalMove("Piece must be between 1 and 4")
+
+    seat = state.turn
+    index = seat * TOKENS_PER_SEAT + piece
+    tokens = state.tokens
+    current = tokens[index]
+
+    # One table lookup resolves the move: this is the hot path for
+    # replays and simulations
+    step = STEP[seat][current * 7 + dice]
+    if step is None:
+        if current == FINISHED:
+            raise IllegalMove("This token has already reached home")
+        if current == 0:
+            raise IllegalMove("Need to roll %d to start from home" % ENTER_ROLL)
+        raise IllegalMove("Need exactly %d to reach home" % (FINISHED - current))
+    new, old_square, old_slot, new_square, new_slot, can_capture = step
+
+    occupancy = state.occupancy
+    crowd = state.crowd
+    if old_slot >= 0:
+        occupancy[old_slot] -= 1
+        crowd[old_square] -= 1
+    if new_slot >= 0:
+        # Opponents are here if the square holds more tokens than our own
+        if can_capture and crowd[new_square] > occupancy[new_slot]:
+            _capture(state, seat, new_square)
+        occupancy[new_slot] += 1
+        crowd[new_square] += 1
+
+    tokens[index] = new
+    if dice != ENTER_ROLL:
+        state.turn = (seat + 1) % NUM_SEATS
+    return new
+
+
+def _capture(state, seat, square):
+    """Send every opponent token on `square` back to the yard"""
+    occupancy = state.occupancy
+    tokens = state.tokens
+    for other in range(NUM_SEATS):
+        slot = square * NUM_SEATS + other
+        if other == seat or not occupancy[slot]:
+            continue
+        state.crowd[square] -= occupancy[slot]
+        occupancy[slot] = 0
+        squares = SQUARE[other]
+        base = other * TOKENS_PER_SEAT
+        for index in range(base, base + TOKENS_PER_SEAT):
+            if squares[tokens[index]] == square:
+                tokens[index] = 0
+
+
+def skip_turn(state):
+    """Pass the turn without moving (no legal move, or the player skipped)"""
+    state.turn = (state.turn + 1) % NUM_SEATS
+
+
+def replay(moves, state=None, strict=False):
+    """Rebuild a state from (seat, piece_id, dice_roll) rows in move order.
+
+    A recorded seat other than the current turn means the seats in between
+    skipped. Rows that don't apply cleanly (e.g. recorded before moves were
+    validated server-side) are ignored, or with `strict` raise IllegalMove.
+    """
+    state = state if state is not None else GameState()
+    for seat, piece_id, dice_roll in moves:
+        if seat is not None:
+            state.turn = seat
+        try:
+            apply_move(state, piece_id - 1, dice_roll)
+        except IllegalMove:
+            if strict:
+                raise
+    return state
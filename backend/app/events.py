@@ -0,0 +1,158 @@
+import itertools
+import json
+import queue
+import threading
+from importlib import import_module
+from flask import current_app
+
+# Subscribers that fall this many events behind are disconnected; the
+# client reconnects and re-reads /state instead of us buffering forever
+DEFAULT_QUEUE_SIZE = 256
+
+# Sentinel telling a subscription's stream to end
+_CLOSED = object()
+
+
+def game_channel(game_id):
+    return f"game:{game_id}"
+
+
+def encode_event(event_id, event, data):
+    """Encode one Server-Sent Events frame"""
+    body = json.dumps(data, separators=(",", ":"))
+    return f"id: {event_id}\nevent: {event}\ndata: {body}\n\n".encode("utf-8")
+
+
+class Subscription:
+    """One subscriber's bounded inbox of encoded frames"""
+
+    __slots__ = ("broker", "channel", "queue", "closed")
+
+    def __init__(self, broker, channel, queue_size):
+        self.broker = broker
+        self.channel = channel
+        self.queue = queue.Queue(queue_size)
+        self.closed = False
+
+    def put(self, payload):
+        try:
+            self.queue.put_nowait(payload)
+        except queue.Full:
+            # Too slow to keep up: drop it rather than grow without bound
+            self.close()
+
+    def get(self, timeout=None):
+        """Next frame, None on timeout, or _CLOSED once the stream is over"""
+        if self.closed:
+            return _CLOSED
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        self.broker.unsubscribe(self)
+        try:
+            self.queue.put_nowait(_CLOSED)
+        except queue.Full:
+            pass
+
+
+class MemoryBroker:
+    """In-process pub/sub: fans each frame out to this worker's subscribers.
+
+    Publishers pass pre-encoded frames, so a move is serialized once no
+    matter how many spectators are watching. Swap in another broker with
+    the same subscribe/unsubscribe/publish methods to fan out across
+    workers.
+    """
+
+    def __init__(self, queue_size=DEFAULT_QUEUE_SIZE):
+        self.queue_size = queue_size
+        self._lock = threading.Lock()
+        self._channels = {}
+
+    def subscribe(self, channel):
+        subscription = Subscription(self, channel, self.queue_size)
+        with self._lock:
+            self._channels.setdefault(channel, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscribers = self._channels.get(subscription.channel)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._channels[subscription.channel]
+
+    def publish(self, channel, payload):
+        with self._lock:
+            subscribers = tuple(self._channels.get(channel, ()))
+        for subscription in subscribers:
+            subscription.put(payload)
+        return len(subscribers)
+
+    def subscriber_count(self, channel=None):
+        with self._lock:
+            if channel is not None:
+                return len(self._channels.get(channel, ()))
+            return sum(len(subscribers) for subscribers in self._channels.values())
+
+
+class EventBus:
+    """Flask extension holding the broker used for game events.
+
+    EVENT_BROKER may be a broker instance or a "module:Class" path; it
+    defaults to an in-process MemoryBroker.
+    """
+
+    def __init__(self, app=None):
+        self._ids = itertools.count(1)
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault("EVENT_BROKER", None)
+        app.config.setdefault("EVENT_HEARTBEAT_SECONDS", 15)
+        broker = app.config["EVENT_BROKER"]
+        if broker is None:
+            broker = MemoryBroker()
+        elif isinstance(broker, str):
+            module_name, _, class_name = broker.partition(":")
+            broker = getattr(import_module(module_name), class_name)()
+        app.extensions["events"] = broker
+
+    @property
+    def broker(self):
+        return current_app.extensions["events"]
+
+    def publish(self, channel, event, data):
+        """Publish an event; best-effort, never raises into the request"""
+        try:
+            return self.broker.publish(channel, encode_event(next(self._ids), event, data))
+        except Exception:
+            current_app.logger.exception("Failed to publish %s on %s", event, channel)
+            return 0
+
+    def stream(self, channel):
+        """Generator of SSE frames for one subscriber, with heartbeats"""
+        subscription = self.broker.subscribe(channel)
+        heartbeat = current_app.config["EVENT_HEARTBEAT_SECONDS"]
+
+        def frames():
+            try:
+                yield b"retry: 3000\n\n"
+                while True:
+                    payload = subscription.get(timeout=heartbeat)
+                    if payload is _CLOSED:
+                        break
+                    # Comment lines keep proxies from closing idle streams
+                    yield payload if payload is not None else b": keepalive\n\n"
+            finally:
+                subscription.close()
+
+        return frames()
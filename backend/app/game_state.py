@@ -0,0 +1,180 @@
+from . import db
+from .models import Move, GameBoard, GameSnapshot, GamePlayer
+from .engine import GameState, SEATS, replay, apply_move, legal_moves, IllegalMove
+
+# A full snapshot is written every SNAPSHOT_INTERVAL moves so rebuilding
+# after an edit only replays the moves since the nearest snapshot
+SNAPSHOT_INTERVAL = 50
+
+
+def new_board(game_id):
+    """Empty board for a freshly created game"""
+    board = GameBoard(game_id=game_id, state=GameState().to_bytes(), move_count=0)
+    db.session.add(board)
+    return board
+
+
+def get_board(game_id, for_update=False):
+    """Stored board for a game, rebuilt from its moves if it has none yet.
+
+    Pass for_update=True before changing the board; the read then goes
+    to the writer and holds its lock until commit.
+    """
+    if for_update:
+        board = db.session.get(GameBoard, game_id, with_for_update=True)
+    else:
+        board = GameBoard.query.get(game_id)
+    if board is None:
+        board = rebuild_board(game_id)
+    return board
+
+
+def load_state(game_id):
+    return GameState.from_bytes(get_board(game_id).state)
+
+
+def state_before(game_id, move_id):
+    """A game's state just before `move_id`, replayed from the nearest snapshot before it"""
+    snapshot = (GameSnapshot.query.filter(GameSnapshot.game_id == game_id, GameSnapshot.move_id < move_id)
+                .order_by(GameSnapshot.move_id.desc())
+                .first())
+    state = GameState.from_bytes(snapshot.state) if snapshot is not None else GameState()
+    moves = (db.session.query(Move.seat, Move.piece_id, Move.dice_roll)
+             .filter(Move.game_id == game_id, Move.id > (snapshot.move_id if snapshot is not None else 0),
+                     Move.id < move_id)
+             .order_by(Move.id))
+    return replay(moves, state)
+
+
+class SeatError(ValueError):
+    """Raised when a player moves for a seat they don't hold"""
+
+
+def game_seats(game_id):
+    """{player_id: seat} for the players seated in a game"""
+    return dict(db.session.query(GamePlayer.player_id, GamePlayer.seat).filter(GamePlayer.game_id == game_id))
+
+
+def own_seat(seats, player_id, seat=None):
+    """The seat `player_id` moves for, given the game's `seats`.
+
+    In a game with seated players that is their own seat, which `seat`
+    must match if given. A game nobody is seated in (created directly
+    rather than through the lobby or matchmaking) takes moves for any
+    seat, and `seat` is returned as is. Raises SeatError.
+    """
+    if not seats:
+        return seat
+    own = seats.get(player_id)
+    if own is None:
+        raise SeatError("You aren't seated in this game")
+    if seat is not None and seat != own:
+        raise SeatError("You hold %s's seat, not %s's" % (SEATS[own], SEATS[seat]))
+    return own
+
+
+def play_move(state, seat, piece_id, dice_roll, position=None, skipped_rolls=None, seated=None):
+    """Apply one submitted move to `state`.
+
+    `seat` defaults to whoever's turn it is. Naming a later seat means the
+    seats from the current turn up to it skipped, which they may only do
+    if they couldn't move: `skipped_rolls` holds the roll each of them
+    threw, in turn order, and when it is left out each is checked against
+    this move's roll. `seated` names the seats in play when some are
+    empty (two and three player games); empty seats skip without a roll.
+    If the client sent a `position` it must match where the engine puts
+    the token. Returns (seat, position) as played. Raises IllegalMove.
+    """
+    turn = state.turn
+    skips = 0 if seat is None else (seat - turn) % len(SEATS)
+    skipping = [(turn + offset) % len(SEATS) for offset in range(skips)]
+    if seated:
+        skipping = [skipped for skipped in skipping if skipped in seated]
+    if skipped_rolls is None:
+        skipped_rolls = [dice_roll] * len(skipping)
+    elif len(skipped_rolls) != len(skipping):
+        raise IllegalMove("It is %s's turn: the move skips %d seats but sent %d skipped rolls"
+                          % (SEATS[turn], len(skipping), len(skipped_rolls)))
+    for skipped, roll in zip(skipping, skipped_rolls):
+        state.turn = skipped
+        if legal_moves(state, roll):
+            state.turn = turn
+            raise IllegalMove("It is %s's turn, and %s can't skip: it can move with a %d"
+                              % (SEATS[turn], SEATS[skipped], roll))
+    state.turn = (turn + skips) % len(SEATS)
+    seat = state.turn
+    new_position = apply_move(state, piece_id - 1, dice_roll)
+    if position is not None and position != new_position:
+        raise IllegalMove("Token would end at position %d, not %d" % (new_position, position))
+    return seat, new_position
+
+
+def record_move(board, state_bytes, move_id):
+    """Advance the stored board past a flushed move; does not commit"""
+    board.state = state_bytes
+    board.last_move_id = move_id
+    board.move_count += 1
+    if board.move_count % SNAPSHOT_INTERVAL == 0:
+        db.session.add(GameSnapshot(
+            game_id=board.game_id, move_id=move_id,
+            move_count=board.move_count, state=state_bytes))
+
+
+def rebuild_board(game_id, from_move_id=None, strict=False):
+    """Recompute a game's board after its move log changed.
+
+    Snapshots at or after `from_move_id` are stale and dropped; replay
+    starts from the nearest snapshot before it, so only the tail of the
+    log is read. With no `from_move_id` the whole log is replayed. With
+    `strict`, a move in the tail that no longer applies raises
+    IllegalMove instead of being skipped. Does not commit.
+    """
+    snapshots = GameSnapshot.query.filter(GameSnapshot.game_id == game_id)
+    snapshot = None
+    if from_move_id is None:
+        snapshots.delete(synchronize_session=False)
+    else:
+        snapshots.filter(GameSnapshot.move_id >= from_move_id).delete(synchronize_session=False)
+        snapshot = (snapshots.filter(GameSnapshot.move_id < from_move_id)
+                    .order_by(GameSnapshot.move_id.desc())
+                    .first())
+
+    board = GameBoard.query.get(game_id)
+    if board is None:
+        board = GameBoard(game_id=game_id)
+        db.session.add(board)
+
+    if snapshot is not None:
+        state = GameState.from_bytes(snapshot.state)
+        board.move_count = snapshot.move_count
+        board.last_move_id = snapshot.move_id
+    else:
+        state = GameState()
+        board.move_count = 0
+        board.last_move_id = None
+    board.state = state.to_bytes()
+
+    tail = (db.session.query(Move.id, Move.seat, Move.piece_id, Move.dice_roll)
+            .filter(Move.game_id == game_id, Move.id > (board.last_move_id or 0))
+            .order_by(Move.id))
+    for move_id, seat, piece_id, dice_roll in tail:
+        try:
+            replay(((seat, piece_id, dice_roll),), state, strict)
+        except IllegalMove as err:
+            raise IllegalMove("Move %d no longer applies: %s" % (move_id, err))
+        record_move(board, state.to_bytes(), move_id)
+
+    return board
+
+
+def board_to_dict(board):
+    state = GameState.from_bytes(board.state)
+    winner = state.winner()
+    return {
+        "game_id": board.game_id,
+        "turn": SEATS[state.turn],
+        "tokens": {SEATS[seat]: state.positions(seat) for seat in range(len(SEATS))},
+        "winner": SEATS[winner] if winner is not None else None,
+        "move_count": board.move_count,
+        "last_move_id": board.last_move_id,
+    }
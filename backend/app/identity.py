@@ -0,0 +1,84 @@
+"""Who a request is acting for, without a players query per request.
+
+The access token already proves the player id; the profile fields that
+/me and the ownership checks need come from a small per-process TTL
+cache keyed by player id. Routes that change or delete a player
+invalidate its entry. Each worker has its own cache, so
+IDENTITY_CACHE_TTL_SECONDS bounds how stale another worker can be; set
+it to 0 to always read the database.
+"""
+from typing import NamedTuple
+from flask import current_app
+from flask_jwt_extended import get_jwt_identity
+
+from .cache import LRUCache
+
+
+class Identity(NamedTuple):
+    id: int
+    name: str
+    email: str
+    score: int
+    created_at: object
+
+
+def current_player_id():
+    """Player id from the verified access token"""
+    return int(get_jwt_identity())
+
+
+def token_claims(player):
+    """Non-sensitive claims embedded in access tokens"""
+    return {"name": player.name}
+
+
+class IdentityCache:
+    """Flask extension caching players' identities by id"""
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault("IDENTITY_CACHE_TTL_SECONDS", 60)
+        app.config.setdefault("IDENTITY_CACHE_MAX_ENTRIES", 10000)
+        app.extensions["identity_cache"] = LRUCache(
+            app.config["IDENTITY_CACHE_MAX_ENTRIES"], app.config["IDENTITY_CACHE_TTL_SECONDS"])
+
+        # PyJWT requires a string "sub"; player ids are ints everywhere else
+        manager = app.extensions["flask-jwt-extended"]
+        manager.user_identity_loader(str)
+
+    @property
+    def backend(self):
+        return current_app.extensions["identity_cache"]
+
+    def get(self, player_id):
+        """Identity for `player_id`, or None if there is no such player"""
+        from . import db
+        from .models import Player
+
+        cache = self.backend
+        if cache.ttl <= 0:
+            cache = None
+        identity = cache.get(player_id) if cache is not None else None
+        if identity is None:
+            row = (db.session.query(Player.id, Player.name, Player.email, Player.score, Player.created_at)
+                   .filter(Player.id == player_id)
+                   .first())
+            if row is None:
+                return None
+            identity = Identity(*row)
+            if cache is not None:
+                cache.set(player_id, identity)
+        return identity
+
+    def current(self):
+        """Identity of the player the access token belongs to"""
+        return self.get(current_player_id())
+
+    def invalidate(self, player_id):
+        self.backend.delete(player_id)
+
+    def stats(self):
+        return self.backend.stats()
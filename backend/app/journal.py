@@ -0,0 +1,179 @@
+"""Append-only journal of accepted moves for write-behind persistence.
+
+The journal is a directory of segment files named after the id of their
+first move. A segment starts with MAGIC and holds fixed-size records:
+the move packed as RECORD followed by a CRC32 of those bytes. Records are
+appended in move id order.
+
+Durability comes from group commit: append() only writes to the file,
+and sync(position) returns once everything up to `position` has been
+fsynced. Threads that call sync() while another thread's fsync is
+running wait for it and usually find their records already covered, so
+one fsync serves every move appended in the meantime.
+
+A crash can leave a torn record at the end of the last segment. It was
+never synced, so it was never acknowledged; read() stops at the first
+record that is short or fails its CRC and truncates it away.
+"""
+import os
+import struct
+import threading
+import time
+import zlib
+
+try:
+    import fcntl
+except ImportError:  # not on Windows; nothing then stops two processes sharing a journal
+    fcntl = None
+
+MAGIC = b"LUDOJR1\n"
+# move id, game id, player id, seat, piece id, dice roll, position
+RECORD = struct.Struct("<IIIBBBB")
+CRC = struct.Struct("<I")
+FRAME_SIZE = RECORD.size + CRC.size
+
+
+def _segment_name(first_id):
+    return f"moves-{first_id:012d}.log"
+
+
+class Journal:
+    """Segmented move journal in `directory`, owned by one process at a time"""
+
+    def __init__(self, directory, segment_bytes=4 * 1024 * 1024):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self._lock_file = open(os.path.join(directory, "journal.lock"), "a")
+        if fcntl is not None:
+            try:
+                fcntl.flock(self._lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                self._lock_file.close()
+                raise RuntimeError(f"Move journal {directory} is in use by another process; "
+                                   "write-behind needs a single worker process")
+        # [(first move id, path)], oldest first
+        self._segments = []
+        self._fd = None
+        self._size = 0
+        # Bytes appended and bytes known durable, across all segments
+        self._written = 0
+        self._synced = 0
+        self._sync_lock = threading.Lock()
+
+    def _paths(self):
+        names = sorted(name for name in os.listdir(self.directory)
+                       if name.startswith("moves-") and name.endswith(".log"))
+        return [os.path.join(self.directory, name) for name in names]
+
+    def read(self):
+        """Every intact record in every segment, in order, as RECORD tuples.
+
+        Truncates a torn tail; anything after a damaged record is dropped.
+        """
+        records = []
+        paths = self._paths()
+        for index, path in enumerate(paths):
+            with open(path, "r+b") as segment:
+                data = segment.read()
+                end = len(MAGIC) if data.startswith(MAGIC) else 0
+                while end + FRAME_SIZE <= len(data):
+                    body = data[end:end + RECORD.size]
+                    (crc,) = CRC.unpack_from(data, end + RECORD.size)
+                    if zlib.crc32(body) != crc:
+                        break
+                    records.append(RECORD.unpack(body))
+                    end += FRAME_SIZE
+                if end < len(data):
+                    segment.truncate(end)
+                    segment.flush()
+                    os.fsync(segment.fileno())
+                    if index < len(paths) - 1:
+                        # Damage before the last segment: later segments can't be trusted either
+                        for later in paths[index + 1:]:
+                            os.remove(later)
+                        break
+        return records
+
+    def append(self, move_id, game_id, player_id, seat, piece_id, dice_roll, position):
+        """Write one record; returns the position to pass to sync().
+
+        Callers serialise appends (WriteBehind holds its lock) so records
+        land in move id order.
+        """
+        if self._fd is None or self._size >= self.segment_bytes:
+            self._rotate(move_id)
+        body = RECORD.pack(move_id, game_id, player_id, seat, piece_id, dice_roll, position)
+        frame = body + CRC.pack(zlib.crc32(body))
+        os.write(self._fd, frame)
+        self._size += FRAME_SIZE
+        self._written += FRAME_SIZE
+        return self._written
+
+    def _rotate(self, first_id):
+        path = os.path.join(self.directory, _segment_name(first_id))
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+        os.write(fd, MAGIC)
+        with self._sync_lock:
+            if self._fd is not None:
+                # Everything in the old segment becomes durable before we let go of it
+                os.fsync(self._fd)
+                os.close(self._fd)
+                self._synced = self._written
+            self._fd = fd
+        self._size = len(MAGIC)
+        self._written += len(MAGIC)
+        self._segments.append((first_id, path))
+        # The new file's directory entry must survive a crash too
+        self._sync_directory()
+
+    def _sync_directory(self):
+        if hasattr(os, "O_DIRECTORY"):
+            fd = os.open(self.directory, os.O_RDONLY | os.O_DIRECTORY)
+            try:
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+
+    def sync(self, position):
+        """Block until everything up to `position` is on disk.
+
+        Returns how long this call's fsync took, or None if another
+        thread's fsync already covered `position`.
+        """
+        if self._synced >= position:
+            return None
+        with self._sync_lock:
+            if self._synced >= position:
+                return None
+            # Covers every append made before this point, not just ours
+            target = self._written
+            start = time.perf_counter()
+            os.fsync(self._fd)
+            self._synced = target
+            return time.perf_counter() - start
+
+    def release(self, committed_id):
+        """Delete segments whose moves are all in the database (ids <= committed_id)"""
+        while len(self._segments) > 1 and self._segments[1][0] <= committed_id + 1:
+            _, path = self._segments.pop(0)
+            os.remove(path)
+
+    def reset(self):
+        """Delete every segment, once recovery has committed their moves"""
+        with self._sync_lock:
+            if self._fd is not None:
+                os.close(self._fd)
+                self._fd = None
+        for path in self._paths():
+            os.remove(path)
+        self._segments = []
+        self._sync_directory()
+
+    def close(self):
+        with self._sync_lock:
+            if self._fd is not None:
+                os.fsync(self._fd)
+                os.close(self._fd)
+                self._fd = None
+        self._lock_file.close()
@@ -0,0 +1,125 @@
+import threading
+from flask import current_app
+from sortedcontainers import SortedList
+from .reload import ReloadedCopy
+
+# Points a player earns when their seat wins a game
+WIN_POINTS = 10
+
+# Ranking keys pack (score desc, id asc) into one int so the index stays
+# compact: one small int per player instead of a tuple
+_ID_BITS = 32
+_MAX_SCORE = (1 << 31) - 1
+
+
+def _key(player_id, score):
+    return ((_MAX_SCORE - (score or 0)) << _ID_BITS) | player_id
+
+
+def _player_id(key):
+    return key & ((1 << _ID_BITS) - 1)
+
+
+class Ranking:
+    """Order-statistic index of players by score.
+
+    Backed by a SortedList, so updates, rank lookups and fetching the
+    entry at a given rank are O(log n); a page of k entries is O(log n + k).
+    Ties are broken by player id, lowest first.
+    """
+
+    def __init__(self, rows=()):
+        self._lock = threading.Lock()
+        self._scores = {player_id: score or 0 for player_id, score in rows}
+        self._keys = SortedList(_key(player_id, score) for player_id, score in self._scores.items())
+
+    def __len__(self):
+        return len(self._keys)
+
+    def set_score(self, player_id, score):
+        score = score or 0
+        with self._lock:
+            old = self._scores.get(player_id)
+            if old == score:
+                return
+            if old is not None:
+                self._keys.remove(_key(player_id, old))
+            self._scores[player_id] = score
+            self._keys.add(_key(player_id, score))
+
+    def remove(self, player_id):
+        with self._lock:
+            old = self._scores.pop(player_id, None)
+            if old is not None:
+                self._keys.remove(_key(player_id, old))
+
+    def rank(self, player_id):
+        """1-based rank, or None for unknown players"""
+        with self._lock:
+            score = self._scores.get(player_id)
+            if score is None:
+                return None
+            return self._keys.index(_key(player_id, score)) + 1
+
+    def page(self, start, limit):
+        """[(rank, player_id, score)] for ranks start..start+limit-1"""
+        with self._lock:
+            first = max(start, 1) - 1
+            return [(first + offset + 1, _player_id(key), self._scores[_player_id(key)])
+                    for offset, key in enumerate(self._keys.islice(first, first + limit))]
+
+
+class Leaderboard:
+    """Flask extension owning each app's Ranking.
+
+    The ranking is loaded from the players table on first use and then
+    kept current by the routes that change scores. Every worker holds its
+    own copy, reloaded in the background every LEADERBOARD_REFRESH_SECONDS
+    (30 by default; None turns it off) to pick up other workers' writes.
+    """
+
+    def __init__(self, app=None):
+        self._copy = ReloadedCopy("leaderboard", "LEADERBOARD_REFRESH_SECONDS", self._load)
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault("LEADERBOARD_REFRESH_SECONDS", 30)
+
+    @staticmethod
+    def _load():
+        from . import db
+        from .models import Player
+
+        return Ranking(db.session.query(Player.id, Player.score).all())
+
+    @property
+    def ranking(self):
+        return self._copy.get()
+
+    def set_score(self, player_id, score):
+        self._copy.apply("set_score", player_id, score)
+
+    def remove(self, player_id):
+        self._copy.apply("remove", player_id)
+
+
+def award_win(game_id, winner_seat):
+    """Credit WIN_POINTS to whoever played the winning seat; does not commit.
+
+    Returns the winning player's id, or None if nobody played that seat.
+    """
+    from . import db
+    from .models import Player, Move
+
+    player_id = (db.session.query(Move.player_id)
+                 .filter(Move.game_id == game_id, Move.seat == winner_seat)
+                 .order_by(Move.id.desc())
+                 .limit(1)
+                 .scalar())
+    if player_id is None:
+        return None
+    Player.query.filter_by(id=player_id).update(
+        {Player.score: db.func.coalesce(Player.score, 0) + WIN_POINTS},
+        synchronize_session=False)
+    return player_id
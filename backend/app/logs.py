@@ -0,0 +1,61 @@
+"""Structured logging for the app's loggers.
+
+Everything under the "app" logger (app.logger and the module loggers in
+app.*) goes through one handler. LOG_LEVEL gates what is emitted;
+LOG_FORMAT picks "text" (message followed by key=value fields) or
+"json" (one object per line). Fields come from the `extra` argument:
+
+    logger.info("Game created", extra={"game_id": game.id})
+"""
+import json
+import logging
+import os
+from flask.logging import default_handler
+
+# Attributes every LogRecord has; anything else came in through `extra`
+_RESERVED = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+
+def _fields(record):
+    return {key: value for key, value in vars(record).items() if key not in _RESERVED}
+
+
+class TextFormatter(logging.Formatter):
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+    def format(self, record):
+        line = super().format(record)
+        fields = " ".join(f"{key}={json.dumps(value, default=str)}" for key, value in _fields(record).items())
+        if fields:
+            # Keep any traceback after the fields
+            head, sep, tail = line.partition("\n")
+            line = f"{head} {fields}{sep}{tail}"
+        return line
+
+
+class JSONFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            **_fields(record),
+        }
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+_handler = logging.StreamHandler()
+
+
+def configure_logging(app):
+    app.config.setdefault("LOG_LEVEL", os.getenv("LOG_LEVEL", "DEBUG" if app.debug else "INFO").upper())
+    app.config.setdefault("LOG_FORMAT", os.getenv("LOG_FORMAT", "text"))
+
+    _handler.setFormatter(JSONFormatter() if app.config["LOG_FORMAT"] == "json" else TextFormatter())
+    app.logger.removeHandler(default_handler)
+    app.logger.addHandler(_handler)
+    app.logger.setLevel(app.config["LOG_LEVEL"])
@@ -0,0 +1,199 @@
+"""Matchmaking: an in-memory queue that seats players in 2-4 player games.
+
+POST /api/matchmaking/join files the player under (seats wanted, score
+band), where the band is score // MATCHMAKING_BAND_WIDTH. Once a bucket
+holds enough players, the longest-waiting ones are seated in a new game
+written in a single transaction; joins that only wait touch no table, so
+the database sees one write per game rather than one per join.
+
+Every worker keeps its own queue, so players only meet others queued on
+the same worker. Route matchmaking to one worker (or use sticky sessions)
+when there are few players online. Players who want an open table
+instead of a match use the lobby (GET /api/lobby), which reads the
+game_players table and works across workers.
+"""
+import threading
+import time
+from collections import OrderedDict
+from flask import current_app
+from .cache import LRUCache
+
+# Seats filled for each game size; two players sit opposite each other
+SEAT_ORDER = {2: (0, 2), 3: (0, 1, 2), 4: (0, 1, 2, 3)}
+MIN_PLAYERS = 2
+MAX_PLAYERS = 4
+
+
+class MatchQueue:
+    """Waiting players bucketed by (seats, score band).
+
+    Each bucket is an OrderedDict of player id -> time queued, so the
+    longest-waiting players are matched first and joining, leaving and
+    matching are all O(1) per player.
+    """
+
+    def __init__(self, band_width):
+        self.band_width = band_width
+        self._lock = threading.Lock()
+        self._buckets = {}
+        # player id -> bucket key
+        self._tickets = {}
+
+    def __len__(self):
+        return len(self._tickets)
+
+    def bucket_key(self, score, seats):
+        return seats, (score or 0) // self.band_width
+
+    def push(self, player_id, score, seats):
+        """Queue a player; returns the full group (ids in queue order) or None.
+
+        Joining again with the same seats and band keeps the player's place.
+        """
+        key = self.bucket_key(score, seats)
+        with self._lock:
+            old = self._tickets.get(player_id)
+            if old is not None and old != key:
+                self._discard(player_id, old)
+            bucket = self._buckets.setdefault(key, OrderedDict())
+            if player_id not in bucket:
+                bucket[player_id] = time.monotonic()
+            self._tickets[player_id] = key
+            if len(bucket) < seats:
+                return None
+            group = [bucket.popitem(last=False)[0] for _ in range(seats)]
+            for member in group:
+                del self._tickets[member]
+            if not bucket:
+                del self._buckets[key]
+            return group
+
+    def restore(self, player_ids, score, seats):
+        """Put players back at the front of their bucket after a failed match"""
+        key = self.bucket_key(score, seats)
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.setdefault(key, OrderedDict())
+            for player_id in reversed(player_ids):
+                if player_id in self._tickets:
+                    continue
+                bucket[player_id] = now
+                bucket.move_to_end(player_id, last=False)
+                self._tickets[player_id] = key
+
+    def remove(self, player_id):
+        """Take a player out of the queue; returns whether they were queued"""
+        with self._lock:
+            key = self._tickets.pop(player_id, None)
+            if key is None:
+                return False
+            self._discard(player_id, key)
+            return True
+
+    def _discard(self, player_id, key):
+        bucket = self._buckets[key]
+        del bucket[player_id]
+        if not bucket:
+            del self._buckets[key]
+
+    def ticket(self, player_id):
+        """{"seats", "band", "waiting", "queued_seconds"} or None if not queued"""
+        with self._lock:
+            key = self._tickets.get(player_id)
+            if key is None:
+                return None
+            bucket = self._buckets[key]
+            return {"seats": key[0], "band": key[1], "waiting": len(bucket),
+                    "queued_seconds": round(time.monotonic() - bucket[player_id], 3)}
+
+    def stats(self):
+        with self._lock:
+            return {"queued": len(self._tickets), "buckets": len(self._buckets)}
+
+
+def seat_players(player_ids, seats):
+    """Create a full game with `player_ids` seated in order; commits.
+
+    Returns the match as sent to each player.
+    """
+    from . import db
+    from .models import Game, GamePlayer, GameBoard
+    from .engine import GameState
+
+    # Core INSERTs: three statements per game and no ORM state to flush or refresh
+    game_id = db.session.execute(
+        db.insert(Game).values(status="ongoing", max_players=seats, player_count=len(player_ids))
+        .returning(Game.id)).scalar_one()
+    players = [{"game_id": game_id, "seat": seat, "player_id": player_id}
+               for seat, player_id in zip(SEAT_ORDER[seats], player_ids)]
+    db.session.execute(db.insert(GamePlayer), players)
+    db.session.execute(db.insert(GameBoard).values(game_id=game_id, state=GameState().to_bytes(), move_count=0))
+    db.session.commit()
+    return {"status": "matched", "game_id": game_id,
+            "players": [{"player_id": row["player_id"], "seat": row["seat"]} for row in players]}
+
+
+class Matchmaker:
+    """Flask extension owning each app's MatchQueue.
+
+    Matches are remembered for MATCHMAKING_RESULT_TTL_SECONDS so players
+    whose join was completed by someone else can collect their game from
+    GET /api/matchmaking.
+    """
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault("MATCHMAKING_BAND_WIDTH", 100)
+        app.config.setdefault("MATCHMAKING_RESULT_TTL_SECONDS", 300)
+        app.config.setdefault("MATCHMAKING_MAX_RESULTS", 100000)
+        app.extensions["matchmaking"] = (
+            MatchQueue(app.config["MATCHMAKING_BAND_WIDTH"]),
+            LRUCache(app.config["MATCHMAKING_MAX_RESULTS"], app.config["MATCHMAKING_RESULT_TTL_SECONDS"]),
+        )
+
+    @property
+    def queue(self):
+        return current_app.extensions["matchmaking"][0]
+
+    @property
+    def matches(self):
+        return current_app.extensions["matchmaking"][1]
+
+    def join(self, player_id, score, seats):
+        """Queue a player for a `seats`-player game.
+
+        Returns {"status": "queued", ...ticket} or, when the player
+        completes a group, the match. If the game cannot be written the
+        rest of the group goes back to the front of the queue.
+        """
+        from . import db
+
+        self.matches.delete(player_id)
+        group = self.queue.push(player_id, score, seats)
+        if group is None:
+            return dict(self.queue.ticket(player_id) or {}, status="queued")
+        try:
+            match = seat_players(group, seats)
+        except Exception:
+            db.session.rollback()
+            self.queue.restore([member for member in group if member != player_id], score, seats)
+            raise
+        for member in group:
+            self.matches.set(member, match)
+        return match
+
+    def status(self, player_id):
+        """The player's ticket or latest match, or None"""
+        ticket = self.queue.ticket(player_id)
+        if ticket is not None:
+            return dict(ticket, status="queued")
+        return self.matches.get(player_id)
+
+    def leave(self, player_id):
+        return self.queue.remove(player_id)
+
+    def stats(self):
+        return self.queue.stats()
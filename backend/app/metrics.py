@@ -0,0 +1,340 @@
+"""Request instrumentation exposed in Prometheus text format.
+
+Per request we record latency by endpoint, how many SQL statements ran
+and how long they took, and the time spent turning results into JSON.
+GET /metrics renders the totals. Each worker process keeps its own
+numbers; scrape every worker (or run one) to see all traffic.
+"""
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from flask import Response, current_app, g, has_request_context, request
+from flask.json.provider import DefaultJSONProvider
+from sqlalchemy import event
+
+from .profiler import SamplingProfiler, write_folded
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+SERIALIZATION_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+BATCH_SIZE_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values, extra=""):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, label_values=(), amount=1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for label_values, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_labels(self.labels, label_values)} {value}")
+        return lines
+
+
+class Gauge:
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def set(self, value, label_values=()):
+        with self._lock:
+            self._values[label_values] = value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} gauge"]
+        with self._lock:
+            for label_values, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_labels(self.labels, label_values)} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = tuple(buckets)
+        # label values -> [per-bucket counts..., +Inf count, sum]
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, label_values=()):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [0] * (len(self.buckets) + 2)
+            series[index] += 1
+            series[-1] += value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for label_values, series in sorted(self._series.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets + ("+Inf",), series):
+                    cumulative += count
+                    le = f'le="{bound}"'
+                    lines.append(f"{self.name}_bucket{_labels(self.labels, label_values, le)} {cumulative}")
+                lines.append(f"{self.name}_sum{_labels(self.labels, label_values)} {series[-1]}")
+                lines.append(f"{self.name}_count{_labels(self.labels, label_values)} {cumulative}")
+        return lines
+
+
+class TooManyQueries(Exception):
+    """Raised by the query guard when QUERY_GUARD_RAISE is set"""
+
+
+class RequestStats:
+    __slots__ = ("start", "queries", "statements", "query_time", "query_start", "serialize_time",
+                 "serialize_depth", "serialize_start", "profiling", "recorded")
+
+    def __init__(self, track_statements=False):
+        self.start = time.perf_counter()
+        self.queries = 0
+        # SQL text -> times run, kept only while looking for repeats
+        self.statements = {} if track_statements else None
+        self.query_time = 0.0
+        self.query_start = None
+        self.serialize_time = 0.0
+        self.serialize_depth = 0
+        self.serialize_start = None
+        self.profiling = False
+        self.recorded = False
+
+
+def _current_stats():
+    if has_request_context():
+        return g.get("_request_stats")
+    return None
+
+
+@contextmanager
+def serialization_timer():
+    """Count the enclosed block as serialization time of the current request"""
+    stats = _current_stats()
+    if stats is None:
+        yield
+        return
+    # Nested timers (schema dump around JSON encoding) count once
+    stats.serialize_depth += 1
+    if stats.serialize_depth == 1:
+        stats.serialize_start = time.perf_counter()
+    try:
+        yield
+    finally:
+        stats.serialize_depth -= 1
+        if stats.serialize_depth == 0:
+            stats.serialize_time += time.perf_counter() - stats.serialize_start
+
+
+class TimedJSONProvider(DefaultJSONProvider):
+    """Flask's JSON provider, timing jsonify() as serialization"""
+
+    def response(self, *args, **kwargs):
+        with serialization_timer():
+            return super().response(*args, **kwargs)
+
+
+class Registry:
+    """One app's metrics"""
+
+    def __init__(self):
+        self.requests = Counter(
+            "http_requests_total", "Requests served", ("method", "endpoint", "status"))
+        self.latency = Histogram(
+            "http_request_duration_seconds", "Request latency", ("method", "endpoint"))
+        self.query_count = Histogram(
+            "db_queries_per_request", "SQL statements per request", ("endpoint",), QUERY_COUNT_BUCKETS)
+        self.query_time = Counter(
+            "db_query_duration_seconds_total", "Time spent in SQL statements", ("endpoint",))
+        self.serialization = Histogram(
+            "response_serialization_seconds", "Time spent serializing responses", ("endpoint",),
+            SERIALIZATION_BUCKETS)
+        self.profiles = Counter(
+            "slow_request_profiles_total", "Slow requests whose stacks were dumped", ("endpoint",))
+        self.query_alerts = Counter(
+            "query_guard_alerts_total", "Requests over the query count or repeat threshold", ("endpoint",))
+        self.rejections = Counter(
+            "rate_limited_requests_total", "Requests shed by rate or concurrency limits", ("rule", "reason"))
+        self.write_behind_depth = Gauge(
+            "write_behind_queue_depth", "Moves acknowledged but not yet committed")
+        self.write_behind_latency = Histogram(
+            "write_behind_commit_latency_seconds", "Time from acknowledging a move to committing it")
+        self.write_behind_batches = Histogram(
+            "write_behind_batch_size", "Moves per write-behind commit", buckets=BATCH_SIZE_BUCKETS)
+        self.journal_fsync = Histogram(
+            "move_journal_fsync_seconds", "Time spent in move journal fsyncs", buckets=SERIALIZATION_BUCKETS)
+        self.write_behind_dead_letters = Counter(
+            "write_behind_dead_letters_total", "Acknowledged moves the database rejected, moved to the dead-letter file")
+        self.profiler = None
+
+    def render(self):
+        lines = []
+        for metric in (self.requests, self.latency, self.query_count, self.query_time,
+                       self.serialization, self.profiles, self.query_alerts, self.rejections,
+                       self.write_behind_depth, self.write_behind_latency, self.write_behind_batches,
+                       self.journal_fsync, self.write_behind_dead_letters):
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+class Metrics:
+    """Flask extension collecting request metrics and serving /metrics.
+
+    METRICS_ENABLED turns collection off. PROFILE_SLOW_REQUEST_MS turns on
+    the sampling profiler: every PROFILE_INTERVAL_MS the stacks of threads
+    serving requests are sampled, and requests slower than the threshold
+    get their stacks written to PROFILE_DIR in folded format for
+    flamegraph.pl or speedscope.
+
+    The query guard catches N+1 patterns: a request running more than
+    QUERY_COUNT_THRESHOLD statements, or the same statement more than
+    QUERY_REPEAT_THRESHOLD times, is logged as a warning, or fails with
+    TooManyQueries when QUERY_GUARD_RAISE is set (for test runs).
+    """
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        from . import db
+
+        app.config.setdefault("METRICS_ENABLED", True)
+        app.config.setdefault("PROFILE_SLOW_REQUEST_MS", None)
+        app.config.setdefault("PROFILE_INTERVAL_MS", 5)
+        app.config.setdefault("PROFILE_DIR", None)
+        app.config.setdefault("QUERY_COUNT_THRESHOLD", None)
+        app.config.setdefault("QUERY_REPEAT_THRESHOLD", None)
+        app.config.setdefault("QUERY_GUARD_RAISE", False)
+        if not app.config["METRICS_ENABLED"]:
+            return
+
+        registry = app.extensions["metrics"] = Registry()
+        if app.config["PROFILE_SLOW_REQUEST_MS"]:
+            registry.profiler = SamplingProfiler(app.config["PROFILE_INTERVAL_MS"] / 1000)
+        app.json = TimedJSONProvider(app)
+
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        app.teardown_request(self._teardown_request)
+        app.add_url_rule("/metrics", "metrics", self.render_view)
+
+        with app.app_context():
+            engines = set(db.engines.values())
+        for engine in engines:
+            event.listen(engine, "before_cursor_execute", self._before_query)
+            event.listen(engine, "after_cursor_execute", self._after_query)
+
+    @property
+    def registry(self):
+        return current_app.extensions["metrics"]
+
+    def _before_request(self):
+        stats = g._request_stats = RequestStats(current_app.config["QUERY_REPEAT_THRESHOLD"] is not None)
+        if self.registry.profiler is not None:
+            self.registry.profiler.start()
+            stats.profiling = True
+
+    def _after_request(self, response):
+        self._record(response.status_code)
+        return response
+
+    def _teardown_request(self, exc):
+        # after_request does not run when a view raises
+        stats = g.get("_request_stats")
+        if stats is not None and not stats.recorded:
+            self._record(500)
+
+    def _record(self, status):
+        stats = g.get("_request_stats")
+        if stats is None or stats.recorded:
+            return
+        stats.recorded = True
+        elapsed = time.perf_counter() - stats.start
+        endpoint = request.endpoint or "unmatched"
+        method = request.method
+        registry = self.registry
+
+        registry.requests.inc((method, endpoint, str(status)))
+        registry.latency.observe(elapsed, (method, endpoint))
+        registry.query_count.observe(stats.queries, (endpoint,))
+        registry.query_time.inc((endpoint,), stats.query_time)
+        registry.serialization.observe(stats.serialize_time, (endpoint,))
+
+        if stats.profiling:
+            stacks = registry.profiler.stop()
+            threshold = current_app.config["PROFILE_SLOW_REQUEST_MS"]
+            if elapsed * 1000 >= threshold and stacks:
+                path = write_folded(current_app, endpoint, elapsed, stacks)
+                registry.profiles.inc((endpoint,))
+                current_app.logger.warning(
+                    "Slow request", extra={"endpoint": endpoint, "method": method, "status": status,
+                                           "duration_ms": round(elapsed * 1000, 1),
+                                           "queries": stats.queries, "profile": path})
+
+        self._check_queries(stats, endpoint, registry)
+
+    def _check_queries(self, stats, endpoint, registry):
+        config = current_app.config
+        problems = []
+        limit = config["QUERY_COUNT_THRESHOLD"]
+        if limit is not None and stats.queries > limit:
+            problems.append(f"{stats.queries} statements (threshold {limit})")
+        repeats = config["QUERY_REPEAT_THRESHOLD"]
+        if repeats is not None:
+            for statement, count in stats.statements.items():
+                if count > repeats:
+                    problems.append(f"{count}x {' '.join(statement.split())[:200]}")
+        if not problems:
+            return
+
+        registry.query_alerts.inc((endpoint,))
+        message = f"Possible N+1 queries in {endpoint}: " + "; ".join(problems)
+        if config["QUERY_GUARD_RAISE"]:
+            raise TooManyQueries(message)
+        current_app.logger.warning(message, extra={"endpoint": endpoint, "queries": stats.queries})
+
+    def _before_query(self, conn, cursor, statement, parameters, context, executemany):
+        stats = _current_stats()
+        if stats is not None:
+            stats.query_start = time.perf_counter()
+
+    def _after_query(self, conn, cursor, statement, parameters, context, executemany):
+        stats = _current_stats()
+        if stats is not None and stats.query_start is not None:
+            stats.queries += 1
+            stats.query_time += time.perf_counter() - stats.query_start
+            stats.query_start = None
+            if stats.statements is not None:
+                stats.statements[statement] = stats.statements.get(statement, 0) + 1
+
+    def render_view(self):
+        return Response(self.registry.render(), content_type=CONTENT_TYPE)
@@ -1,6 +1,5 @@
-from . import db
+from . import db, password_hasher
 from datetime import datetime
-import bcrypt
 
 
 class Player(db.Model):
@@ -14,14 +13,16 @@ class Player(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
     def set_password(self, password):
-        """Hash and set the password"""
-        salt = bcrypt.gensalt()
-        self.password_hash = bcrypt.hashpw(
-            password.encode('utf-8'), salt).decode('utf-8')
+        """Hash and set the password (runs on the hashing pool)"""
+        self.password_hash = password_hasher.hash(password)
 
     def check_password(self, password):
         """Check if provided password matches the hash"""
-        return bcrypt.checkpw(password.encode('utf-8'), self.password_hash.encode('utf-8'))
+        return password_hasher.check(password, self.password_hash)
+
+    def password_needs_rehash(self):
+        """True if the hash was made with a different BCRYPT_ROUNDS"""
+        return password_hasher.needs_rehash(self.password_hash)
 
     def __repr__(self):
         return "<Player %r - %r>" % (self.id, self.name)
@@ -29,10 +30,30 @@ class Player(db.Model):
 
 class Game(db.Model):
     __tablename__ = "games"
+    __table_args__ = (
+        # Lobby listing filters by status and orders by creation time
+        db.Index("ix_games_status_created_at", "status", "created_at"),
+        # Open ("waiting") games in id order for the lobby's keyset pages
+        db.Index("ix_games_status_id", "status", "id"),
+        # Games a player is credited with winning, for deleting the player
+        db.Index("ix_games_winner_id", "winner_id"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     status = db.Column(db.String(20), default="ongoing")
     created_at = db.Column(db.DateTime, server_default=db.func.now())
+    # Seats (2-4) and how many are taken; null on games without seated players
+    max_players = db.Column(db.Integer, nullable=True)
+    player_count = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    # Bumped by every change to the game or its moves; see concurrency.py
+    version = db.Column(db.Integer, nullable=False, default=1, server_default="1")
+    # Moves accepted so far; never goes down
+    turn_seq = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    # Player credited with the win; set once, when the game finishes
+    winner_id = db.Column(db.Integer, db.ForeignKey("players.id", name="fk_games_winner_id_players"), nullable=True)
+
+    # ORM flushes become UPDATE ... WHERE id = ? AND version = ?
+    __mapper_args__ = {"version_id_col": version}
 
     def __repr__(self):
         return "<Game %r - %r>" % (self.id, self.status)
@@ -40,22 +61,80 @@ class Game(db.Model):
 
 class Move(db.Model):
     __tablename__ = "moves"
+    __table_args__ = (
+        # Per-game and per-player lookups, ordered by id for pagination
+        db.Index("ix_moves_game_id_id", "game_id", "id"),
+        db.Index("ix_moves_player_id_id", "player_id", "id"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     dice_roll = db.Column(db.Integer, nullable=False)
     piece_id = db.Column(db.Integer, nullable=False)
     position = db.Column(db.Integer, nullable=False)
+    # Seat (0-3: Blue, Red, Green, Yellow) that made the move; null on legacy rows
+    seat = db.Column(db.Integer, nullable=True)
+    # Rolls of the seats the move skipped, as submitted; checked, never stored
+    skipped_rolls = None
 
     # Foreign keys
     player_id = db.Column(db.Integer, db.ForeignKey(
         "players.id"), nullable=False)
     game_id = db.Column(db.Integer, db.ForeignKey("games.id"), nullable=False)
 
-    # Relationships
+    # Relationships. These lazy-load per object; endpoints that walk them
+    # over many rows must pick a loader (joinedload/selectinload)
     player = db.relationship("Player", backref="moves")
-    game = db.relationship("Game", backref="moves")
+    game = db.relationship("Game", backref=db.backref("moves", order_by="Move.id"))
 
     def __repr__(self):
         return "<Move %r - Player %r, Game %r, Roll %r>" % (
             self.id, self.player_id, self.game_id, self.dice_roll
         )
+
+
+class GamePlayer(db.Model):
+    """A player's seat in a game"""
+    __tablename__ = "game_players"
+    __table_args__ = (
+        db.UniqueConstraint("game_id", "player_id", name="uq_game_players_game_id_player_id"),
+        db.Index("ix_game_players_player_id", "player_id"),
+    )
+
+    game_id = db.Column(db.Integer, db.ForeignKey("games.id"), primary_key=True)
+    seat = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    player_id = db.Column(db.Integer, db.ForeignKey("players.id"), nullable=False)
+    joined_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return "<GamePlayer game %r seat %r - Player %r>" % (self.game_id, self.seat, self.player_id)
+
+
+class GameBoard(db.Model):
+    """Current board of a game, kept in step with its moves"""
+    __tablename__ = "game_states"
+
+    game_id = db.Column(db.Integer, db.ForeignKey("games.id"), primary_key=True)
+    # engine.GameState.to_bytes(): 16 token positions + turn index
+    state = db.Column(db.LargeBinary(17), nullable=False)
+    move_count = db.Column(db.Integer, nullable=False, default=0)
+    last_move_id = db.Column(db.Integer, nullable=True)
+
+    def __repr__(self):
+        return "<GameBoard %r - %r moves>" % (self.game_id, self.move_count)
+
+
+class GameSnapshot(db.Model):
+    """Board as it stood right after a given move, written periodically"""
+    __tablename__ = "game_snapshots"
+    __table_args__ = (
+        db.Index("ix_game_snapshots_game_id_move_id", "game_id", "move_id"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    game_id = db.Column(db.Integer, db.ForeignKey("games.id"), nullable=False)
+    move_id = db.Column(db.Integer, nullable=False)
+    move_count = db.Column(db.Integer, nullable=False)
+    state = db.Column(db.LargeBinary(17), nullable=False)
+
+    def __repr__(self):
+        return "<GameSnapshot %r - Game %r, Move %r>" % (self.id, self.game_id, self.move_id)
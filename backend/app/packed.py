@@ -0,0 +1,94 @@
+"""Compact binary encoding of move histories for replay and analytics tools.
+
+A stream starts with MAGIC, then holds blocks. Each block is a header
+(game id, record count) followed by that many fixed-width records, so
+the game id is written once per block instead of once per move:
+
+    block header  <IH   game_id (u32), count (u16)
+    record        <IIBBBB  id, player_id (u32), dice_roll, piece_id,
+                           position, seat (u8; 255 = not recorded)
+
+The HTTP endpoints write blocks in (game_id, id) order; `flask export
+moves` writes them in id order, so a game may span several blocks. A
+record is 12 bytes where the JSON form of a move is around 95.
+read_packed() turns a stream back into move dicts; run this module on a
+file to print it as NDJSON:
+
+    python -m app.packed moves.bin
+"""
+import json
+import struct
+import sys
+
+MAGIC = b"LUDOMV1\n"
+MIMETYPE = "application/x-ludo-moves"
+
+BLOCK = struct.Struct("<IH")
+RECORD = struct.Struct("<IIBBBB")
+NO_SEAT = 255
+# Rows per block; a block is flushed to the client as soon as it fills
+BLOCK_ROWS = 4096
+
+FIELDS = ("id", "player_id", "dice_roll", "piece_id", "position", "seat")
+
+
+def move_rows():
+    """Select for the columns pack_moves() expects, in export order"""
+    from . import db
+    from .models import Move
+
+    return (db.select(Move.game_id, Move.id, Move.player_id, Move.dice_roll, Move.piece_id,
+                      Move.position, Move.seat)
+            .order_by(Move.game_id, Move.id))
+
+
+def pack_moves(rows, block_rows=BLOCK_ROWS, header=True):
+    """Encode (game_id, id, player_id, dice_roll, piece_id, position, seat) rows.
+
+    Yields MAGIC (unless `header` is false, for appending to a stream)
+    and then one bytes chunk per block, consuming `rows` lazily so a
+    server-side cursor can feed it without building a list.
+    """
+    if header:
+        yield MAGIC
+    pack = RECORD.pack
+    game_id = None
+    records = []
+    for row in rows:
+        if row[0] != game_id or len(records) == block_rows:
+            if records:
+                yield BLOCK.pack(game_id, len(records)) + b"".join(records)
+            game_id = row[0]
+            records = []
+        seat = row[6]
+        records.append(pack(row[1], row[2], row[3], row[4], row[5], NO_SEAT if seat is None else seat))
+    if records:
+        yield BLOCK.pack(game_id, len(records)) + b"".join(records)
+
+
+def read_packed(stream):
+    """Yield move dicts from a binary file object holding a packed stream"""
+    if stream.read(len(MAGIC)) != MAGIC:
+        raise ValueError("Not a packed move stream")
+    while True:
+        header = stream.read(BLOCK.size)
+        if not header:
+            return
+        if len(header) < BLOCK.size:
+            raise ValueError("Truncated block header")
+        game_id, count = BLOCK.unpack(header)
+        body = stream.read(count * RECORD.size)
+        if len(body) < count * RECORD.size:
+            raise ValueError(f"Truncated block for game {game_id}")
+        for record in RECORD.iter_unpack(body):
+            move = dict(zip(FIELDS, record))
+            move["game_id"] = game_id
+            if move["seat"] == NO_SEAT:
+                move["seat"] = None
+            yield move
+
+
+if __name__ == "__main__":
+    with open(sys.argv[1], "rb") if len(sys.argv) > 1 else sys.stdin.buffer as source:
+        for move in read_packed(source):
+            sys.stdout.write(json.dumps(move, sort_keys=True) + "\n")
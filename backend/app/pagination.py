@@ -0,0 +1,117 @@
+from datetime import datetime
+
+# Page size used when the client does not pass ?limit=
+DEFAULT_LIMIT = 100
+# Hard cap so no single request can pull a whole table
+MAX_LIMIT = 1000
+
+
+class PaginationError(ValueError):
+    """Raised when pagination or filter query params are invalid"""
+
+
+def parse_limit(args):
+    """Read ?limit= and clamp it to MAX_LIMIT"""
+    raw = args.get("limit")
+    if raw is None:
+        return DEFAULT_LIMIT
+    try:
+        limit = int(raw)
+    except ValueError:
+        raise PaginationError("limit must be an integer")
+    if limit < 1:
+        raise PaginationError("limit must be at least 1")
+    return min(limit, MAX_LIMIT)
+
+
+def parse_cursor(args):
+    """Read ?cursor= (the id of the last row of the previous page)"""
+    raw = args.get("cursor")
+    if not raw:
+        return None
+    try:
+        return int(raw)
+    except ValueError:
+        raise PaginationError("cursor is invalid")
+
+
+def parse_int_filter(args, name):
+    raw = args.get(name)
+    if raw is None:
+        return None
+    try:
+        return int(raw)
+    except ValueError:
+        raise PaginationError(f"{name} must be an integer")
+
+
+def parse_datetime_filter(args, name):
+    raw = args.get(name)
+    if raw is None:
+        return None
+    try:
+        return datetime.fromisoformat(raw)
+    except ValueError:
+        raise PaginationError(f"{name} must be an ISO 8601 datetime")
+
+
+def parse_include(args, allowed):
+    """Names from ?include=a,b (related data to embed); each must be in `allowed`"""
+    names = {name.strip() for name in args.get("include", "").split(",") if name.strip()}
+    if names - set(allowed):
+        raise PaginationError(f"include must be one of: {', '.join(allowed)}")
+    return names
+
+
+# List filters and the column each one needs on the listed model
+FILTER_COLUMNS = {"game_id": "game_id", "player_id": "player_id", "status": "status", "created_after": "created_at"}
+
+
+def apply_filters(query, model, args):
+    """Apply the list filters in `args`.
+
+    A filter whose column the model lacks (e.g. created_after on moves,
+    which record no creation time) raises PaginationError rather than
+    being ignored, so the client never mistakes an unfiltered page for
+    a filtered one.
+    """
+    for name, column in FILTER_COLUMNS.items():
+        if name in args and not hasattr(model, column):
+            raise PaginationError(f"{name} is not a filter for {model.__tablename__}")
+
+    for name in ("game_id", "player_id"):
+        value = parse_int_filter(args, name)
+        if value is not None:
+            query = query.filter(getattr(model, name) == value)
+
+    status = args.get("status")
+    if status is not None:
+        query = query.filter(model.status == status)
+
+    created_after = parse_datetime_filter(args, "created_after")
+    if created_after is not None:
+        query = query.filter(model.created_at > created_after)
+
+    return query
+
+
+def paginate(query, model, args):
+    """Keyset-paginate a query on the model's primary key.
+
+    Returns (rows, next_cursor). next_cursor is None on the last page.
+    Seeking with `id > cursor` keeps every page an index range scan, so
+    deep pages cost the same as the first one (unlike OFFSET).
+    """
+    limit = parse_limit(args)
+    cursor = parse_cursor(args)
+
+    query = apply_filters(query, model, args)
+    if cursor is not None:
+        query = query.filter(model.id > cursor)
+
+    # Fetch one extra row to know whether another page exists
+    rows = query.order_by(model.id).limit(limit + 1).all()
+    if len(rows) > limit:
+        rows = rows[:limit]
+        return rows, str(rows[-1].id)
+    return rows, None
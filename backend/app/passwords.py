@@ -0,0 +1,141 @@
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, TimeoutError
+import bcrypt
+from flask import current_app
+
+
+_pool_lock = threading.Lock()
+
+
+class HasherBusy(Exception):
+    """Raised when the hashing queue is full; routes answer 503"""
+
+
+def _hash(password, rounds):
+    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds)).decode('utf-8')
+
+
+def _check(password, password_hash):
+    return bcrypt.checkpw(password.encode('utf-8'), password_hash.encode('utf-8'))
+
+
+def hash_rounds(password_hash):
+    """Cost factor encoded in a bcrypt hash ("$2b$12$..." -> 12)"""
+    try:
+        return int(password_hash.split("$")[2])
+    except (IndexError, ValueError):
+        return None
+
+
+def server_workers():
+    """Server worker processes sharing this host (WEB_CONCURRENCY, set by gunicorn.conf.py)"""
+    try:
+        return max(1, int(os.getenv("WEB_CONCURRENCY", "1")))
+    except ValueError:
+        return 1
+
+
+class PasswordHasher:
+    """Flask extension running bcrypt off the request threads.
+
+    Hashes run on a bounded pool (PASSWORD_HASH_EXECUTOR: "process",
+    "thread" or "inline"). At most PASSWORD_HASH_QUEUE hashes may be
+    pending; beyond that hash()/check() raise HasherBusy straight away so
+    a login storm sheds load instead of tying up every worker.
+    BCRYPT_ROUNDS sets the cost for new hashes.
+
+    Every server worker has its own pool, so PASSWORD_HASH_PROCESSES (the
+    CPU count by default) is shared out between them: each pool gets
+    PASSWORD_HASH_PROCESSES / WEB_CONCURRENCY workers, at least one,
+    unless PASSWORD_HASH_WORKERS sets it directly. The queue defaults to
+    four hashes per pool worker.
+    """
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault("BCRYPT_ROUNDS", 12)
+        app.config.setdefault("PASSWORD_HASH_EXECUTOR", "process")
+        app.config.setdefault("PASSWORD_HASH_PROCESSES", os.cpu_count() or 1)
+        app.config.setdefault("PASSWORD_HASH_WORKERS", None)
+        app.config.setdefault("PASSWORD_HASH_QUEUE", None)
+        app.config.setdefault("PASSWORD_HASH_TIMEOUT", 10)
+
+    @property
+    def pool(self):
+        # Built from config on first use, so settings changed after
+        # create_app() still apply, and in the server worker, after
+        # gunicorn has settled how many there are
+        pool = current_app.extensions.get("password_hasher")
+        if pool is None:
+            with _pool_lock:
+                pool = current_app.extensions.get("password_hasher")
+                if pool is None:
+                    config = current_app.config
+                    workers = (config["PASSWORD_HASH_WORKERS"]
+                               or max(1, config["PASSWORD_HASH_PROCESSES"] // server_workers()))
+                    pool = _HashPool(
+                        config["PASSWORD_HASH_EXECUTOR"],
+                        workers,
+                        config["PASSWORD_HASH_QUEUE"] or workers * 4,
+                        config["PASSWORD_HASH_TIMEOUT"],
+                    )
+                    current_app.extensions["password_hasher"] = pool
+        return pool
+
+    def hash(self, password):
+        return self.pool.run(_hash, password, current_app.config["BCRYPT_ROUNDS"])
+
+    def check(self, password, password_hash):
+        return self.pool.run(_check, password, password_hash)
+
+    def needs_rehash(self, password_hash):
+        return hash_rounds(password_hash) != current_app.config["BCRYPT_ROUNDS"]
+
+
+class _HashPool:
+    def __init__(self, kind, workers, queue_size, timeout):
+        if kind not in ("process", "thread", "inline"):
+            raise ValueError(f"Unknown PASSWORD_HASH_EXECUTOR {kind!r}")
+        self.kind = kind
+        self.workers = workers
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(queue_size)
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self):
+        # Created on first use so forked server workers each get their own
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    if self.kind == "process":
+                        self._executor = ProcessPoolExecutor(self.workers)
+                    else:
+                        self._executor = ThreadPoolExecutor(self.workers)
+        return self._executor
+
+    def run(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            raise HasherBusy()
+        if self.kind == "inline":
+            try:
+                return fn(*args)
+            finally:
+                self._slots.release()
+        try:
+            future = self._get_executor().submit(fn, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        # The slot is held until the hash is done, not until we stop waiting:
+        # cancel() only stops hashes still queued, never a running one
+        future.add_done_callback(lambda _: self._slots.release())
+        try:
+            return future.result(timeout=self.timeout)
+        except TimeoutError:
+            future.cancel()
+            raise HasherBusy()
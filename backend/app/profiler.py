@@ -0,0 +1,78 @@
+"""Low-overhead sampling profiler for slow requests.
+
+A daemon thread wakes every `interval` seconds and records the current
+stack of each thread that is serving a request. Stacks are kept in
+folded form ("outer;inner;leaf" -> sample count), which flamegraph.pl,
+inferno and speedscope read directly.
+"""
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+
+
+def fold(frame):
+    """Folded stack for `frame`, outermost call first"""
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+class SamplingProfiler:
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self._active = {}
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+
+    def _ensure_sampler(self):
+        # Threads don't survive fork, so each worker starts its own
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    self._active = {}
+                    self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+                    self._thread.start()
+                    self._pid = os.getpid()
+
+    def start(self):
+        """Begin sampling the calling thread"""
+        self._ensure_sampler()
+        with self._lock:
+            self._active[threading.get_ident()] = Counter()
+
+    def stop(self):
+        """Stop sampling the calling thread and return its folded stacks"""
+        with self._lock:
+            return self._active.pop(threading.get_ident(), None)
+
+    def _run(self):
+        own = threading.get_ident()
+        while True:
+            time.sleep(self.interval)
+            with self._lock:
+                if not self._active:
+                    continue
+                frames = sys._current_frames()
+                for thread_id, stacks in self._active.items():
+                    frame = frames.get(thread_id)
+                    if frame is not None and thread_id != own:
+                        stacks[fold(frame)] += 1
+
+
+def write_folded(app, endpoint, elapsed, stacks):
+    """Write one request's stacks under PROFILE_DIR and return the file path"""
+    directory = app.config["PROFILE_DIR"] or os.path.join(app.instance_path, "profiles")
+    os.makedirs(directory, exist_ok=True)
+    name = re.sub(r"[^A-Za-z0-9_.-]", "_", endpoint)
+    path = os.path.join(directory, f"{time.time_ns() // 1000}-{os.getpid()}-{name}-{elapsed * 1000:.0f}ms.folded")
+    with open(path, "w") as out:
+        for stack, count in stacks.most_common():
+            out.write(f"{stack} {count}\n")
+    return path
@@ -0,0 +1,191 @@
+"""Per-client rate limits and per-route concurrency limits.
+
+Each limited route names a rule. RATE_LIMITS maps rule names to
+"<count>/<second|minute|hour>" (or None to switch a rule off); a client
+gets a token bucket per rule holding up to <count> requests and
+refilling at <count> per period, so short bursts pass and sustained
+floods get 429 with Retry-After. Clients are keyed by player id when the
+route is behind @jwt_required (put the limit below it), otherwise by
+remote address; run behind ProxyFix when a proxy sits in front.
+
+CONCURRENCY_LIMITS caps how many requests a worker serves on a route at
+once, so slow routes (bcrypt) can't take every thread; requests over the
+cap get 503 with Retry-After straight away.
+
+Buckets live in process memory by default; set RATELIMIT_BACKEND to a
+`module:Class` with the same hit()/clear() methods to share them across
+workers.
+"""
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from importlib import import_module
+from flask import current_app, jsonify, request
+from flask_jwt_extended import get_jwt_identity
+
+PERIODS = {"second": 1, "minute": 60, "hour": 3600}
+
+DEFAULT_RATE_LIMITS = {
+    "login": "10/minute",
+    "register": "5/minute",
+    "check_username": "10/second",
+    "check_username_batch": "60/minute",
+    "moves": "10/second",
+    "moves_batch": "30/minute",
+    "export": "10/minute",
+    "matchmaking": "2/second",
+}
+
+DEFAULT_CONCURRENCY_LIMITS = {
+    "login": 2,
+    "register": 2,
+}
+
+
+def parse_rate(rule):
+    """"10/minute" -> (capacity 10, refill 10/60 tokens per second)"""
+    count, _, period = rule.partition("/")
+    try:
+        count = int(count)
+        seconds = PERIODS[period.strip().rstrip("s")]
+    except (ValueError, KeyError):
+        raise ValueError(f"Invalid rate limit {rule!r}; expected '<count>/<second|minute|hour>'") from None
+    if count < 1:
+        raise ValueError(f"Invalid rate limit {rule!r}; count must be positive")
+    return count, count / seconds
+
+
+class TokenBuckets:
+    """Thread-safe in-process token buckets, least recently used dropped first"""
+
+    def __init__(self, maxsize=100000):
+        self.maxsize = maxsize
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def hit(self, key, capacity, rate):
+        """Take a token from `key`'s bucket; seconds to wait if it is empty, else 0"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._buckets.get(key)
+            if entry is None:
+                tokens = capacity
+            else:
+                tokens, stamp = entry
+                tokens = min(capacity, tokens + (now - stamp) * rate)
+                self._buckets.move_to_end(key)
+            if tokens >= 1:
+                self._buckets[key] = (tokens - 1, now)
+                wait = 0.0
+            else:
+                self._buckets[key] = (tokens, now)
+                wait = (1 - tokens) / rate
+            if len(self._buckets) > self.maxsize:
+                self._buckets.popitem(last=False)
+            return wait
+
+    def clear(self):
+        with self._lock:
+            self._buckets.clear()
+
+
+class _State:
+    def __init__(self, backend, rates, slots):
+        self.backend = backend
+        self.rates = rates
+        self.slots = slots
+
+
+def client_key(by):
+    """Who a request counts against: "player:<id>" or "ip:<address>\""""
+    if by == "identity":
+        try:
+            identity = get_jwt_identity()
+        except RuntimeError:
+            identity = None
+        if identity is not None:
+            return f"player:{identity}"
+    return f"ip:{request.remote_addr}"
+
+
+def too_many_requests(wait):
+    response = jsonify({"error": "Too many requests, please slow down"})
+    response.headers["Retry-After"] = str(max(1, int(wait + 0.999)))
+    return response, 429
+
+
+def route_busy():
+    response = jsonify({"error": "Server is busy, please retry shortly"})
+    response.headers["Retry-After"] = "1"
+    return response, 503
+
+
+class RateLimiter:
+    """Flask extension applying RATE_LIMITS and CONCURRENCY_LIMITS to routes"""
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault("RATELIMIT_ENABLED", True)
+        app.config.setdefault("RATELIMIT_BACKEND", None)
+        app.config.setdefault("RATELIMIT_MAX_CLIENTS", 100000)
+        app.config.setdefault("RATE_LIMITS", {})
+        app.config.setdefault("CONCURRENCY_LIMITS", {})
+
+        backend = app.config["RATELIMIT_BACKEND"]
+        if backend is None:
+            backend = TokenBuckets(app.config["RATELIMIT_MAX_CLIENTS"])
+        elif isinstance(backend, str):
+            module_name, _, class_name = backend.partition(":")
+            backend = getattr(import_module(module_name), class_name)()
+
+        # Parse rules once so a request only does dict lookups
+        rates = {name: parse_rate(rule)
+                 for name, rule in {**DEFAULT_RATE_LIMITS, **app.config["RATE_LIMITS"]}.items()
+                 if rule}
+        slots = {name: threading.BoundedSemaphore(limit)
+                 for name, limit in {**DEFAULT_CONCURRENCY_LIMITS, **app.config["CONCURRENCY_LIMITS"]}.items()
+                 if limit}
+        app.extensions["rate_limiter"] = _State(backend, rates, slots)
+
+    @property
+    def backend(self):
+        return current_app.extensions["rate_limiter"].backend
+
+    def limit(self, name, by="ip"):
+        """Apply rule `name` to a view, counting per player ("identity") or per address ("ip")"""
+        def decorator(view):
+            @wraps(view)
+            def wrapper(*args, **kwargs):
+                if not current_app.config["RATELIMIT_ENABLED"]:
+                    return view(*args, **kwargs)
+                state = current_app.extensions["rate_limiter"]
+
+                rate = state.rates.get(name)
+                if rate is not None:
+                    wait = state.backend.hit(f"{name}:{client_key(by)}", *rate)
+                    if wait:
+                        _count_rejection(name, "rate")
+                        return too_many_requests(wait)
+
+                slots = state.slots.get(name)
+                if slots is None:
+                    return view(*args, **kwargs)
+                if not slots.acquire(blocking=False):
+                    _count_rejection(name, "concurrency")
+                    return route_busy()
+                try:
+                    return view(*args, **kwargs)
+                finally:
+                    slots.release()
+            return wrapper
+        return decorator
+
+
+def _count_rejection(name, reason):
+    registry = current_app.extensions.get("metrics")
+    if registry is not None:
+        registry.rejections.inc((name, reason))
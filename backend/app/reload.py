@@ -0,0 +1,74 @@
+"""Per-worker in-memory copies of database tables, reloaded in the background.
+
+The leaderboard's Ranking and the username NameIndex are built from a
+whole table and then kept current by the routes that write to it. Every
+worker holds its own copy, so writes made through other workers only
+show up once the copy is reloaded. A reload reads the whole table, which
+takes seconds on a large one, so it runs on a background thread while
+requests keep reading the old copy. The changes this worker makes in the
+meantime are recorded and replayed onto the new copy before it is
+swapped in, so they never disappear.
+"""
+import threading
+import time
+from flask import current_app
+
+
+class ReloadedCopy:
+    """One app-wide copy built by `load()`, reloaded every `setting` seconds.
+
+    `load` runs in an app context and returns the copy. `setting` names
+    the config key holding the reload interval (None turns reloading off).
+    Changes go through apply(), which calls a method on the copy.
+    """
+
+    def __init__(self, key, setting, load):
+        self.key = key
+        self.setting = setting
+        self.load = load
+        self._lock = threading.Lock()
+
+    def _state(self):
+        """[copy, loaded at, changes made during a reload or None], reloading it when due"""
+        state = current_app.extensions.get(self.key)
+        if state is None:
+            with self._lock:
+                state = current_app.extensions.get(self.key)
+                if state is None:
+                    state = current_app.extensions[self.key] = [self.load(), time.monotonic(), None]
+        interval = current_app.config[self.setting]
+        if interval and state[2] is None and time.monotonic() - state[1] > interval:
+            with self._lock:
+                if state[2] is None:
+                    state[2] = []
+                    threading.Thread(target=self._reload, args=(current_app._get_current_object(), state),
+                                     name=f"{self.key}-reload", daemon=True).start()
+        return state
+
+    def get(self):
+        return self._state()[0]
+
+    def _reload(self, app, state):
+        # Changes are recorded from before the load starts reading, so each
+        # is either in the rows it reads or replayed on top of them
+        copy = None
+        with app.app_context():
+            try:
+                copy = self.load()
+            except Exception:
+                app.logger.exception("Reloading %s failed", self.key)
+        with self._lock:
+            if copy is not None:
+                for method, args in state[2]:
+                    getattr(copy, method)(*args)
+                state[0] = copy
+            # A failed reload is retried after another interval
+            state[1], state[2] = time.monotonic(), None
+
+    def apply(self, method, *args):
+        """Call `method` on the copy, and on the one replacing it if a reload is running"""
+        state = self._state()
+        with self._lock:
+            if state[2] is not None:
+                state[2].append((method, args))
+            getattr(state[0], method)(*args)
@@ -1,26 +1,53 @@
-from flask import Blueprint, request, jsonify
-from .models import Player, Game, Move
-from .schemas import player_schema, players_schema, game_schema, games_schema, move_schema, moves_schema
-from . import db
+import logging
+from flask import Blueprint, Response, request, jsonify, stream_with_context
+from .models import Player, Game, Move, GamePlayer
+from .schemas import (
+    player_schema, players_schema, game_schema, games_schema, move_schema, moves_schema, moves_batch_schema,
+    moves_with_player_schema, game_detail_schema,
+)
+from .pagination import paginate, parse_limit, parse_int_filter, parse_include, PaginationError
+from .serialization import column_query, rows_as_dicts, json_response
+from .cleanup import delete_games
+from .game_state import (
+    new_board, get_board, play_move, record_move, rebuild_board, board_to_dict,
+    game_seats, own_seat, SeatError, state_before,
+)
+from .engine import GameState, IllegalMove
+from .concurrency import PreconditionError, expected_version, current_version, advance_game, version_etag
+from .events import game_channel
+from .leaderboard import award_win
+from .packed import BLOCK_ROWS, MIMETYPE as PACKED_MIMETYPE, move_rows, pack_moves
+from .identity import current_player_id
+from .matchmaking import SEAT_ORDER, MIN_PLAYERS, MAX_PLAYERS
+from . import db, event_bus, response_cache, leaderboard, identity_cache, rate_limiter, usernames, matchmaker, stats, write_behind
 from marshmallow import ValidationError
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import joinedload, selectinload
+from sqlalchemy.orm.exc import StaleDataError
+from flask_jwt_extended import jwt_required
 
 api_bp = Blueprint("api", __name__, url_prefix="/api")
+logger = logging.getLogger(__name__)
 
 # GET all players (PUBLIC - no auth needed)
+# Paginated: ?limit=&cursor=&created_after=
 
 
 @api_bp.route("/players", methods=["GET"])
 def get_players():
     try:
-        players = Player.query.all()
-        return players_schema.jsonify(players)
+        names, query = column_query(players_schema)
+        players, next_cursor = paginate(query, Player, request.args)
+        return json_response({"items": rows_as_dicts(names, players), "next_cursor": next_cursor})
+    except PaginationError as err:
+        return jsonify({"error": str(err)}), 400
     except Exception:
         return jsonify({"error": "Failed to retrieve players"}), 500
 
 
 # GET single player (PUBLIC)
 @api_bp.route("/players/<int:id>", methods=["GET"])
+@response_cache.cached_view("player:{id}")
 def get_player(id):
     player = Player.query.get(id)
     if not player:
@@ -32,7 +59,7 @@ def get_player(id):
 @api_bp.route("/players/<int:id>", methods=["PATCH"])
 @jwt_required()
 def update_player(id):
-    current_user_id = get_jwt_identity()
+    current_user_id = current_player_id()
 
     # Users can only update their own profile
     if current_user_id != id:
@@ -50,10 +77,14 @@ def update_player(id):
     if 'id' in data:
         del data['id']
 
+    old_name = player.name
     try:
         updated_player = player_schema.load(
             data, instance=player, partial=True)
         db.session.commit()
+        response_cache.invalidate(f"player:{id}")
+        identity_cache.invalidate(id)
+        usernames.rename(old_name, updated_player.name)
         return player_schema.jsonify(updated_player)
     except ValidationError as err:
         return jsonify(err.messages), 400
@@ -62,8 +93,9 @@ def update_player(id):
 # DELETE player (PROTECTED)
 @api_bp.route("/players/<int:id>", methods=["DELETE"])
 @jwt_required()
+@write_behind.exclusive()
 def delete_player(id):
-    current_user_id = get_jwt_identity()
+    current_user_id = current_player_id()
 
     # Users can only delete their own account
     if current_user_id != id:
@@ -72,25 +104,55 @@ def delete_player(id):
     player = Player.query.get(id)
     if not player:
         return jsonify({"error": "Player not found"}), 404
-
-    # Delete all moves related to this player first
-    moves = Move.query.filter_by(player_id=id).all()
-    for move in moves:
-        db.session.delete(move)
-
-    db.session.delete(player)
+    name = player.name
+
+    # Games whose boards change, and the earliest move removed from each
+    affected = (db.session.query(Move.game_id, db.func.min(Move.id))
+                .filter(Move.player_id == id)
+                .group_by(Move.game_id)
+                .all())
+    seated = [row.game_id for row in db.session.query(GamePlayer.game_id).filter(GamePlayer.player_id == id)]
+    won = [row.id for row in db.session.query(Game.id).filter(Game.winner_id == id)]
+
+    # Delete the player's moves, seats and the player in one transaction;
+    # seats they held in lobby games open up again
+    Move.query.filter_by(player_id=id).delete(synchronize_session=False)
+    GamePlayer.query.filter_by(player_id=id).delete(synchronize_session=False)
+    if seated:
+        Game.query.filter(Game.id.in_(seated), Game.status == "waiting").update(
+            {Game.player_count: Game.player_count - 1, Game.version: Game.version + 1},
+            synchronize_session=False)
+    if won:
+        # The award stays spent: finished games can't be finished again
+        Game.query.filter(Game.id.in_(won)).update(
+            {Game.winner_id: None, Game.version: Game.version + 1}, synchronize_session=False)
+    Player.query.filter_by(id=id).delete(synchronize_session=False)
+    for game_id, first_move_id in affected:
+        rebuild_board(game_id, first_move_id)
     db.session.commit()
+    response_cache.invalidate(
+        f"player:{id}", *(f"game_moves:{game_id}" for game_id, _ in affected),
+        *(f"game:{game_id}" for game_id in seated + won))
+    identity_cache.invalidate(id)
+    matchmaker.leave(id)
+    stats.invalidate()
+    leaderboard.remove(id)
+    usernames.remove(name)
 
     return jsonify({"message": f"Player {id} deleted successfully"})
 
 
 # ===== GAME ROUTES =====
 
+# Paginated: ?limit=&cursor=&status=&created_after=
 @api_bp.route("/games", methods=["GET"])
 def get_games():
     try:
-        games = Game.query.all()
-        return games_schema.jsonify(games)
+        names, query = column_query(games_schema)
+        games, next_cursor = paginate(query, Game, request.args)
+        return json_response({"items": rows_as_dicts(names, games), "next_cursor": next_cursor})
+    except PaginationError as err:
+        return jsonify({"error": str(err)}), 400
     except Exception:
         return jsonify({"error": "Failed to retrieve games"}), 500
 
@@ -100,91 +162,382 @@ def get_games():
 def create_game():
     try:
         data = request.get_json()
-        print("=== RECEIVED DATA ===")
-        print(data)
-        print("=== END DATA ===")
+        logger.debug("Creating game", extra={"payload": data})
 
         game = game_schema.load(data)
+        if game.status == "waiting" and game.max_players is None:
+            return jsonify({"max_players": ["Required for waiting games"]}), 400
         db.session.add(game)
+        db.session.flush()
+        new_board(game.id)
         db.session.commit()
         return game_schema.jsonify(game), 201
     except ValidationError as err:
-        print("=== VALIDATION ERROR ===")
-        print(err.messages)
-        print("=== END ERROR ===")
+        logger.info("Rejected game", extra={"errors": err.messages})
         return jsonify(err.messages), 400
-    except Exception as e:
-        print("=== EXCEPTION ===")
-        print(str(e))
-        print("=== END EXCEPTION ===")
+    except Exception:
+        logger.exception("Failed to create game")
         db.session.rollback()
         return jsonify({"error": "Failed to create game"}), 500
 
 
+# ?include=moves embeds the game's moves
 @api_bp.route("/games/<int:id>", methods=["GET"])
 def get_game(id):
+    try:
+        include = parse_include(request.args, ("moves",))
+    except PaginationError as err:
+        return jsonify({"error": str(err)}), 400
+    if "moves" in include:
+        # Two queries (the game, then all its moves) however long the game is
+        game = db.session.get(Game, id, options=[selectinload(Game.moves)])
+        if not game:
+            return jsonify({"error": "Game not found"}), 404
+        response = game_detail_schema.jsonify(game)
+        response.set_etag(version_etag(game.version))
+        return response
+    return get_cached_game(id=id)
+
+
+@response_cache.cached_view("game:{id}")
+def get_cached_game(id):
     game = Game.query.get(id)
     if not game:
         return jsonify({"error": "Game not found"}), 404
-    return game_schema.jsonify(game)
+    # The version is the ETag, so clients can send it back in If-Match
+    response = game_schema.jsonify(game)
+    response.set_etag(version_etag(game.version))
+    return response
+
+
+def version_conflict(game_id, version=None):
+    """409 for a write whose compare-and-swap on the game's version failed"""
+    db.session.rollback()
+    return jsonify({"error": "Game was changed by another request; reload it and retry",
+                    "version": version if version is not None else current_version(game_id)}), 409
+
+
+# Current board, read from the stored state instead of replaying moves
+@api_bp.route("/games/<int:id>/state", methods=["GET"])
+def get_game_state(id):
+    # Moves still queued for write-behind are only on the in-memory board.
+    # Ask first: a board is only dropped once its moves are committed, so
+    # without one the reads below see them
+    queued = write_behind.board(id)
+    game = Game.query.get(id)
+    if not game:
+        return jsonify({"error": "Game not found"}), 404
+    if queued is not None:
+        board, version, turn_seq = queued
+    else:
+        board, version, turn_seq = get_board(id), game.version, game.turn_seq
+    state = board_to_dict(board)
+    state["version"] = version
+    state["turn_seq"] = turn_seq
+    # Legacy games get their board built on first read; keep it
+    db.session.commit()
+    response = jsonify(state)
+    response.set_etag(version_etag(state["version"]))
+    return response
 
 
-@api_bp.route("/games/<int:id>", methods=["PATCH"])
+# Server-Sent Events stream of moves and game updates for spectators
+@api_bp.route("/games/<int:id>/events", methods=["GET"])
+def get_game_events(id):
+    game = Game.query.get(id)
+    if not game:
+        return jsonify({"error": "Game not found"}), 404
+
+    # Idle streams must not pin a database connection
+    db.session.close()
+    return Response(
+        event_bus.stream(game_channel(id)),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
 
+@api_bp.route("/games/<int:id>", methods=["PATCH"])
+@jwt_required()
+@write_behind.exclusive("id")
 def update_game(id):
     game = Game.query.get(id)
     if not game:
         return jsonify({"error": "Game not found"}), 404
+    try:
+        expected = expected_version(request)
+    except PreconditionError as err:
+        return jsonify({"error": str(err)}), 400
+    if expected is not None and expected != game.version:
+        return version_conflict(id)
 
     data = request.get_json()
+    was_finished = game.status == "finished"
     try:
         updated_game = game_schema.load(data, instance=game, partial=True)
+        if was_finished and updated_game.status != "finished":
+            db.session.rollback()
+            return jsonify({"error": "A finished game can't be reopened"}), 400
+
+        # Credit the winner in the same transaction the game finishes in, once:
+        # winner_id records the award
+        winner_id = None
+        if updated_game.status == "finished" and updated_game.winner_id is None:
+            winner_seat = GameState.from_bytes(get_board(id, for_update=True).state).winner()
+            if winner_seat is not None:
+                winner_id = updated_game.winner_id = award_win(id, winner_seat)
+
         db.session.commit()
-        return game_schema.jsonify(updated_game)
+        response_cache.invalidate(f"game:{id}")
+        if winner_id is not None:
+            response_cache.invalidate(f"player:{winner_id}")
+            identity_cache.invalidate(winner_id)
+            leaderboard.set_score(winner_id, Player.query.get(winner_id).score)
+        event_bus.publish(game_channel(id), "game", game_schema.dump(updated_game))
+        response = game_schema.jsonify(updated_game)
+        response.set_etag(version_etag(updated_game.version))
+        return response
     except ValidationError as err:
         return jsonify(err.messages), 400
+    except StaleDataError:
+        # The flush's UPDATE ... WHERE version = ? matched nothing
+        return version_conflict(id)
 
 
 @api_bp.route("/games/<int:id>", methods=["DELETE"])
-
+@write_behind.exclusive("id")
 def delete_game(id):
     game = Game.query.get(id)
     if not game:
         return jsonify({"error": "Game not found"}), 404
 
-    # Delete all moves related to this game first
-    moves = Move.query.filter_by(game_id=id).all()
-    for move in moves:
-        db.session.delete(move)
-
-    db.session.delete(game)
+    # Delete the game's moves and the game in one transaction
+    delete_games([id])
     db.session.commit()
+    response_cache.invalidate(f"game:{id}", f"game_moves:{id}")
+    stats.invalidate()
+    event_bus.publish(game_channel(id), "game_deleted", {"id": id})
 
     return jsonify({"message": f"Game {id} deleted successfully"})
 
 
+# ===== LEADERBOARD =====
+
+# Top players, or with ?around=<player_id> the page centred on that player
+@api_bp.route("/leaderboard", methods=["GET"])
+def get_leaderboard():
+    try:
+        limit = parse_limit(request.args)
+        around = parse_int_filter(request.args, "around")
+    except PaginationError as err:
+        return jsonify({"error": str(err)}), 400
+
+    ranking = leaderboard.ranking
+    start = 1
+    if around is not None:
+        rank = ranking.rank(around)
+        if rank is None:
+            return jsonify({"error": "Player not found"}), 404
+        start = max(1, rank - limit // 2)
+
+    entries = ranking.page(start, limit)
+    names = dict(db.session.query(Player.id, Player.name)
+                 .filter(Player.id.in_([player_id for _, player_id, _ in entries])))
+    return jsonify({
+        "items": [{"rank": rank, "id": player_id, "name": names.get(player_id), "score": score}
+                  for rank, player_id, score in entries],
+        "total": len(ranking)
+    })
+
+
+# ===== MATCHMAKING & LOBBY =====
+
+# Body: {"seats": 2-4} (default 4). 201 with the game once the player's
+# group is full, otherwise 202 while they wait in the queue
+@api_bp.route("/matchmaking/join", methods=["POST"])
+@jwt_required()
+@rate_limiter.limit("matchmaking", by="identity")
+def join_matchmaking():
+    player = identity_cache.current()
+    if not player:
+        return jsonify({"error": "Player not found"}), 404
+
+    data = request.get_json(silent=True) or {}
+    seats = data.get("seats", MAX_PLAYERS)
+    if type(seats) is not int or not MIN_PLAYERS <= seats <= MAX_PLAYERS:
+        return jsonify({"error": f"seats must be an integer from {MIN_PLAYERS} to {MAX_PLAYERS}"}), 400
+
+    try:
+        result = matchmaker.join(player.id, player.score, seats)
+    except Exception:
+        logger.exception("Failed to create matched game")
+        return jsonify({"error": "Failed to create game"}), 500
+    if result["status"] == "queued":
+        return jsonify(result), 202
+    return jsonify(result), 201
+
+
+# The player's place in the queue, or the game they were matched into
+@api_bp.route("/matchmaking", methods=["GET"])
+@jwt_required()
+def get_matchmaking():
+    result = matchmaker.status(current_player_id())
+    if result is None:
+        return jsonify({"error": "Not queued"}), 404
+    return jsonify(result)
+
+
+@api_bp.route("/matchmaking", methods=["DELETE"])
+@jwt_required()
+def leave_matchmaking():
+    if not matchmaker.leave(current_player_id()):
+        return jsonify({"error": "Not queued"}), 404
+    return jsonify({"message": "Left the queue"})
+
+
+# Open games with free seats, oldest first.
+# Paginated: ?limit=&cursor=&seats=
+@api_bp.route("/lobby", methods=["GET"])
+def get_lobby():
+    try:
+        seats = parse_int_filter(request.args, "seats")
+        query = (db.session.query(Game.id, Game.max_players, Game.player_count, Game.created_at)
+                 .filter(Game.status == "waiting", Game.player_count < Game.max_players))
+        if seats is not None:
+            query = query.filter(Game.max_players == seats)
+        games, next_cursor = paginate(query, Game, request.args)
+        return json_response({
+            "items": [{"id": game_id, "max_players": max_players, "player_count": player_count,
+                       "free_seats": max_players - player_count, "created_at": created_at}
+                      for game_id, max_players, player_count, created_at in games],
+            "next_cursor": next_cursor,
+        })
+    except PaginationError as err:
+        return jsonify({"error": str(err)}), 400
+    except Exception:
+        return jsonify({"error": "Failed to retrieve lobby"}), 500
+
+
+# Take the next free seat in a waiting game; the game starts when it fills
+@api_bp.route("/lobby/<int:game_id>/join", methods=["POST"])
+@jwt_required()
+@write_behind.exclusive("game_id")
+def join_lobby_game(game_id):
+    current_user_id = current_player_id()
+    game = db.session.get(Game, game_id, with_for_update=True)
+    if not game:
+        return jsonify({"error": "Game not found"}), 404
+    if game.status != "waiting" or game.player_count >= game.max_players:
+        db.session.rollback()
+        return jsonify({"error": "Game is not open"}), 409
+
+    taken = dict(db.session.query(GamePlayer.player_id, GamePlayer.seat).filter(GamePlayer.game_id == game_id))
+    if current_user_id in taken:
+        db.session.rollback()
+        return jsonify({"error": "Already seated in this game"}), 409
+    seat = next(seat for seat in SEAT_ORDER[game.max_players] if seat not in taken.values())
+
+    try:
+        db.session.add(GamePlayer(game_id=game_id, seat=seat, player_id=current_user_id))
+        game.player_count += 1
+        if game.player_count == game.max_players:
+            game.status = "ongoing"
+        db.session.commit()
+    except IntegrityError:
+        # Another request took the seat first
+        db.session.rollback()
+        return jsonify({"error": "Seat already taken; try again"}), 409
+    response_cache.invalidate(f"game:{game_id}")
+    event_bus.publish(game_channel(game_id), "game", game_schema.dump(game))
+    return jsonify({"game_id": game_id, "seat": seat, "status": game.status}), 201
+
+
+# ===== STATS =====
+
+# Dice, captures and wins for one player's moves
+@api_bp.route("/stats/players/<int:id>", methods=["GET"])
+def get_player_stats(id):
+    if not identity_cache.get(id):
+        return jsonify({"error": "Player not found"}), 404
+    return jsonify(stats.player(id))
+
+
+# Game lengths, captures, dice and win rate by seat across all games
+@api_bp.route("/stats/games", methods=["GET"])
+def get_game_stats():
+    return jsonify(stats.games())
+
+
 # ===== MOVE ROUTES =====
 
+# Paginated: ?limit=&cursor=&game_id=&player_id=; ?include=player embeds each player
 @api_bp.route("/moves", methods=["GET"])
 def get_moves():
     try:
-        moves = Move.query.all()
-        return moves_schema.jsonify(moves)
+        if "player" in parse_include(request.args, ("player",)):
+            # Players come from the same query, not one lookup per move
+            query = Move.query.options(joinedload(Move.player))
+            moves, next_cursor = paginate(query, Move, request.args)
+            return json_response({"items": moves_with_player_schema.dump(moves), "next_cursor": next_cursor})
+
+        names, query = column_query(moves_schema)
+        moves, next_cursor = paginate(query, Move, request.args)
+        return json_response({"items": rows_as_dicts(names, moves), "next_cursor": next_cursor})
+    except PaginationError as err:
+        return jsonify({"error": str(err)}), 400
     except Exception:
         return jsonify({"error": "Failed to retrieve moves"}), 500
 
 
+# ?format=packed streams the compact binary encoding from app.packed
 @api_bp.route("/games/<int:game_id>/moves", methods=["GET"])
 def get_game_moves(game_id):
-    moves = Move.query.filter_by(game_id=game_id).all()
-    return moves_schema.jsonify(moves)
+    encoding = request.args.get("format", "json")
+    if encoding == "packed":
+        return packed_response(move_rows().where(Move.game_id == game_id))
+    if encoding != "json":
+        return jsonify({"error": "format must be one of: json, packed"}), 400
+    return get_cached_game_moves(game_id=game_id)
+
+
+@response_cache.cached_view("game_moves:{game_id}")
+def get_cached_game_moves(game_id):
+    names, query = column_query(moves_schema)
+    moves = query.filter(Move.game_id == game_id).order_by(Move.id).all()
+    return json_response(rows_as_dicts(names, moves))
+
+
+def packed_response(statement):
+    """Stream the moves `statement` selects, read through a server-side cursor"""
+    rows = db.session.execute(statement.execution_options(yield_per=BLOCK_ROWS))
+    return Response(stream_with_context(pack_moves(rows)), mimetype=PACKED_MIMETYPE)
+
+
+# Every move in the packed format, in (game_id, id) order.
+# ?after_game= resumes an interrupted download after the last complete game
+@api_bp.route("/export/moves", methods=["GET"])
+@rate_limiter.limit("export")
+def export_moves():
+    try:
+        after_game = parse_int_filter(request.args, "after_game")
+    except PaginationError as err:
+        return jsonify({"error": str(err)}), 400
+    statement = move_rows()
+    if after_game is not None:
+        statement = statement.where(Move.game_id > after_game)
+    return packed_response(statement)
 
 
 @api_bp.route("/moves", methods=["POST"])
 @jwt_required()  # Must be logged in to create move
+@rate_limiter.limit("moves", by="identity")
 def create_move():
-    current_user_id = get_jwt_identity()
+    current_user_id = current_player_id()
     data = request.get_json()
+    try:
+        expected = expected_version(request)
+    except PreconditionError as err:
+        return jsonify({"error": str(err)}), 400
 
     try:
         move = move_schema.load(data)
@@ -194,16 +547,50 @@ def create_move():
             return jsonify({"error": "You can only create moves for your own player"}), 403
 
         # Additional validation for foreign keys
-        player = Player.query.get(move.player_id)
-        game = Game.query.get(move.game_id)
+        player = identity_cache.get(move.player_id)
         if not player:
             return jsonify({"player_id": ["Player not found"]}), 400
+        seats = game_seats(move.game_id)
+        try:
+            move.seat = own_seat(seats, current_user_id, move.seat)
+        except SeatError as err:
+            return jsonify({"error": str(err)}), 403
+        seated = set(seats.values())
+        if write_behind.enabled:
+            return create_move_write_behind(move, expected, seated)
+        game = Game.query.get(move.game_id)
         if not game:
             return jsonify({"game_id": ["Game not found"]}), 400
 
+        if expected is not None and expected != game.version:
+            return version_conflict(move.game_id)
+
+        # Claim the next turn before reading the board: one UPDATE ... WHERE
+        # version = ?, so of two moves made against the same version only one lands
+        claimed = advance_game(move.game_id, game.version, turns=1)
+        if claimed is None:
+            return version_conflict(move.game_id)
+
+        # The server decides where the token lands and rejects illegal moves
+        board = get_board(move.game_id, for_update=True)
+        state = GameState.from_bytes(board.state)
+        try:
+            move.seat, move.position = play_move(
+                state, move.seat, move.piece_id, move.dice_roll, move.position, move.skipped_rolls, seated)
+        except IllegalMove as err:
+            db.session.rollback()
+            return jsonify({"error": f"Illegal move: {err}"}), 400
+
+        # Store the move and the new board in the same transaction
         db.session.add(move)
+        db.session.flush()
+        record_move(board, state.to_bytes(), move.id)
         db.session.commit()
-        return move_schema.jsonify(move), 201
+        response_cache.invalidate(f"game:{move.game_id}", f"game_moves:{move.game_id}")
+        event_bus.publish(game_channel(move.game_id), "move", move_schema.dump(move))
+        response = move_schema.jsonify(move)
+        response.set_etag(version_etag(claimed[0]))
+        return response, 201
     except ValidationError as err:
         return jsonify(err.messages), 400
     except Exception:
@@ -211,6 +598,129 @@ def create_move():
         return jsonify({"error": "Failed to create move"}), 500
 
 
+def create_move_write_behind(move, expected, seated):
+    """Acknowledge a move once it is journaled; it reaches the database with its batch"""
+    # A game the queue holds a board for exists: deleting it drains the queue first
+    if not write_behind.tracks(move.game_id) and not Game.query.get(move.game_id):
+        return jsonify({"game_id": ["Game not found"]}), 400
+    try:
+        claimed = write_behind.submit(move, expected, seated)
+    except IllegalMove as err:
+        db.session.rollback()
+        return jsonify({"error": f"Illegal move: {err}"}), 400
+    if claimed is None:
+        return version_conflict(move.game_id, write_behind.version(move.game_id))
+    event_bus.publish(game_channel(move.game_id), "move", move_schema.dump(move))
+    response = move_schema.jsonify(move)
+    response.set_etag(version_etag(claimed[0]))
+    return response, 201
+
+
+# Maximum number of moves accepted by a single batch request
+MAX_BATCH_MOVES = 500
+
+
+@api_bp.route("/games/<int:game_id>/moves:batch", methods=["POST"])
+@jwt_required()
+@rate_limiter.limit("moves_batch", by="identity")
+@write_behind.exclusive("game_id")
+def create_moves_batch(game_id):
+    """Create many moves for one game with a single INSERT and commit.
+
+    The batch is all-or-nothing: moves are order-dependent, so if any item
+    fails validation nothing is inserted and errors are returned per index.
+    """
+    current_user_id = current_player_id()
+    data = request.get_json()
+
+    if not isinstance(data, list) or not data:
+        return jsonify({"error": "Expected a non-empty array of moves"}), 400
+    if len(data) > MAX_BATCH_MOVES:
+        return jsonify({"error": f"At most {MAX_BATCH_MOVES} moves per batch"}), 400
+    try:
+        expected = expected_version(request)
+    except PreconditionError as err:
+        return jsonify({"error": str(err)}), 400
+
+    game = Game.query.get(game_id)
+    if not game:
+        return jsonify({"error": "Game not found"}), 404
+
+    # Moves may omit game_id; it comes from the URL
+    items = [dict(item, game_id=item.get("game_id", game_id)) if isinstance(item, dict) else item
+             for item in data]
+
+    errors = {}
+    try:
+        moves = moves_batch_schema.load(items)
+    except ValidationError as err:
+        errors = err.messages
+        moves = []
+
+    if not errors:
+        # Check every referenced player with one query
+        player_ids = {move["player_id"] for move in moves}
+        found = {row.id for row in db.session.query(Player.id).filter(Player.id.in_(player_ids))}
+
+        for index, move in enumerate(moves):
+            item_errors = {}
+            if move["game_id"] != game_id:
+                item_errors["game_id"] = ["Must match the game in the URL"]
+            if move["player_id"] not in found:
+                item_errors["player_id"] = ["Player not found"]
+            elif move["player_id"] != current_user_id:
+                item_errors["player_id"] = ["You can only create moves for your own player"]
+            if item_errors:
+                errors[index] = item_errors
+
+    if not errors:
+        # Every move must be for the caller's own seat
+        seats = game_seats(game_id)
+        try:
+            for move in moves:
+                move["seat"] = own_seat(seats, current_user_id, move.get("seat"))
+        except SeatError as err:
+            return jsonify({"error": str(err)}), 403
+
+        # Claim the turns, then play the moves in order on top of the current board
+        if expected is not None and expected != game.version:
+            return version_conflict(game_id)
+        claimed = advance_game(game_id, game.version, turns=len(moves))
+        if claimed is None:
+            return version_conflict(game_id)
+        board = get_board(game_id, for_update=True)
+        state = GameState.from_bytes(board.state)
+        states = []
+        for index, move in enumerate(moves):
+            try:
+                move["seat"], move["position"] = play_move(
+                    state, move["seat"], move["piece_id"], move["dice_roll"], move.get("position"),
+                    move.pop("skipped_rolls", None), set(seats.values()))
+                states.append(state.to_bytes())
+            except IllegalMove as err:
+                errors[index] = {"move": [str(err)]}
+
+    if errors:
+        db.session.rollback()
+        return jsonify({"errors": errors}), 400
+
+    try:
+        result = db.session.execute(
+            db.insert(Move).returning(Move.id, sort_by_parameter_order=True), moves)
+        for move, move_id, state_bytes in zip(moves, result.scalars(), states):
+            move["id"] = move_id
+            record_move(board, state_bytes, move_id)
+        db.session.commit()
+        response_cache.invalidate(f"game:{game_id}", f"game_moves:{game_id}")
+        event_bus.publish(game_channel(game_id), "moves", moves)
+        response = jsonify({"created": len(moves)})
+        response.set_etag(version_etag(claimed[0]))
+        return response, 201
+    except Exception:
+        db.session.rollback()
+        return jsonify({"error": "Failed to create moves"}), 500
+
+
 @api_bp.route("/moves/<int:id>", methods=["GET"])
 def get_move(id):
     move = Move.query.get(id)
@@ -221,8 +731,9 @@ def get_move(id):
 
 @api_bp.route("/moves/<int:id>", methods=["PATCH"])
 @jwt_required()
+@write_behind.exclusive()
 def update_move(id):
-    current_user_id = get_jwt_identity()
+    current_user_id = current_player_id()
     move = Move.query.get(id)
 
     if not move:
@@ -231,11 +742,49 @@ def update_move(id):
     # Users can only update their own moves
     if move.player_id != current_user_id:
         return jsonify({"error": "Unauthorized to update this move"}), 403
+    try:
+        expected = expected_version(request)
+    except PreconditionError as err:
+        return jsonify({"error": str(err)}), 400
 
     data = request.get_json()
+    old_game_id = move.game_id
+    read_version = current_version(old_game_id)
     try:
         updated_move = move_schema.load(data, instance=move, partial=True)
+        # The edited move must be legal where it sits in its game's log
+        seats = game_seats(updated_move.game_id)
+        try:
+            updated_move.seat = own_seat(seats, current_user_id, updated_move.seat)
+        except SeatError as err:
+            db.session.rollback()
+            return jsonify({"error": str(err)}), 403
+        try:
+            updated_move.seat, updated_move.position = play_move(
+                state_before(updated_move.game_id, id), updated_move.seat, updated_move.piece_id,
+                updated_move.dice_roll, data.get("position"), updated_move.skipped_rolls, set(seats.values()))
+        except IllegalMove as err:
+            db.session.rollback()
+            return jsonify({"error": f"Illegal move: {err}"}), 400
+        # Rewriting the log changes the game; the version check comes first
+        if advance_game(old_game_id, read_version if expected is None else expected) is None:
+            return version_conflict(old_game_id)
+        # Boards change from this move onwards; replay from the nearest
+        # snapshot, and refuse the edit if a later move stops applying
+        db.session.flush()
+        try:
+            rebuild_board(old_game_id, id, strict=True)
+            if updated_move.game_id != old_game_id:
+                advance_game(updated_move.game_id)
+                rebuild_board(updated_move.game_id, id, strict=True)
+        except IllegalMove as err:
+            db.session.rollback()
+            return jsonify({"error": f"Illegal move: {err}"}), 400
         db.session.commit()
+        response_cache.invalidate(f"game:{old_game_id}", f"game:{updated_move.game_id}",
+                                  f"game_moves:{old_game_id}", f"game_moves:{updated_move.game_id}")
+        stats.invalidate()
+        event_bus.publish(game_channel(updated_move.game_id), "move_updated", move_schema.dump(updated_move))
         return move_schema.jsonify(updated_move)
     except ValidationError as err:
         return jsonify(err.messages), 400
@@ -243,8 +792,9 @@ def update_move(id):
 
 @api_bp.route("/moves/<int:id>", methods=["DELETE"])
 @jwt_required()
+@write_behind.exclusive()
 def delete_move(id):
-    current_user_id = get_jwt_identity()
+    current_user_id = current_player_id()
     move = Move.query.get(id)
 
     if not move:
@@ -253,8 +803,21 @@ def delete_move(id):
     # Users can only delete their own moves
     if move.player_id != current_user_id:
         return jsonify({"error": "Unauthorized to delete this move"}), 403
-
+    try:
+        expected = expected_version(request)
+    except PreconditionError as err:
+        return jsonify({"error": str(err)}), 400
+
+    game_id = move.game_id
+    read_version = current_version(game_id)
+    if advance_game(game_id, read_version if expected is None else expected) is None:
+        return version_conflict(game_id)
     db.session.delete(move)
+    db.session.flush()
+    rebuild_board(game_id, id)
     db.session.commit()
+    response_cache.invalidate(f"game:{game_id}", f"game_moves:{game_id}")
+    stats.invalidate()
+    event_bus.publish(game_channel(game_id), "move_deleted", {"id": id})
 
     return jsonify({"message": f"Move {id} deleted successfully"})
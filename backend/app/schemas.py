@@ -1,35 +1,69 @@
 from flask_marshmallow import Marshmallow
 from marshmallow import fields, validate, ValidationError
 from .models import Player, Game, Move
+from .metrics import serialization_timer
 
 ma = Marshmallow()
 
-class PlayerSchema(ma.SQLAlchemyAutoSchema):
+class BaseSchema(ma.SQLAlchemyAutoSchema):
+    def jsonify(self, obj, many=None, *args, **kwargs):
+        # Dumping and encoding both count as serialization in /metrics
+        with serialization_timer():
+            return super().jsonify(obj, many, *args, **kwargs)
+
+class PlayerSchema(BaseSchema):
     class Meta:
         model = Player
         load_instance = True
 
     name = fields.String(required=True, validate=validate.Length(min=1, max=50))
-    score = fields.Integer(validate=validate.Range(min=0))
+    # Earned by winning games (award_win, `flask players rescore`), never sent by clients
+    score = fields.Integer(dump_only=True)
 
-class GameSchema(ma.SQLAlchemyAutoSchema):
+class GameSchema(BaseSchema):
     class Meta:
         model = Game
         load_instance = True
 
-    status = fields.String(required=True, validate=validate.OneOf(["ongoing", "finished", "paused"]))
+    status = fields.String(required=True, validate=validate.OneOf(["waiting", "ongoing", "finished", "paused"]))
+    # Seats for lobby games; seats are taken through the lobby or matchmaking
+    max_players = fields.Integer(allow_none=True, validate=validate.Range(min=2, max=4))
+    player_count = fields.Integer(dump_only=True)
+    # Set by the server; send version back in If-Match to update safely
+    version = fields.Integer(dump_only=True)
+    turn_seq = fields.Integer(dump_only=True)
+    winner_id = fields.Integer(dump_only=True)
 
-class MoveSchema(ma.SQLAlchemyAutoSchema):
+class MoveSchema(BaseSchema):
     class Meta:
         model = Move
         load_instance = True
 
     dice_roll = fields.Integer(required=True, validate=validate.Range(min=1, max=6))
     piece_id = fields.Integer(required=True, validate=validate.Range(min=1, max=4))
-    position = fields.Integer(required=True, validate=validate.Range(min=0, max=57))  # 0=home, 1-52=board, 57=finished
+    # 0=yard, 1-51=track, 52-56=victory lane, 57=finished; computed by the engine if omitted
+    position = fields.Integer(validate=validate.Range(min=0, max=57))
+    seat = fields.Integer(validate=validate.Range(min=0, max=3))
+    # What each seat between the current turn and `seat` rolled; not stored
+    skipped_rolls = fields.List(fields.Integer(validate=validate.Range(min=1, max=6)), load_only=True)
     player_id = fields.Integer(required=True)
     game_id = fields.Integer(required=True)
 
+class PlayerSummarySchema(BaseSchema):
+    class Meta:
+        model = Player
+        fields = ("id", "name")
+
+class MoveWithPlayerSchema(BaseSchema):
+    class Meta:
+        model = Move
+        include_fk = True
+
+    player = fields.Nested(PlayerSummarySchema)
+
+class GameDetailSchema(GameSchema):
+    moves = fields.Nested(MoveSchema, many=True)
+
 # Schema instances
 player_schema = PlayerSchema()
 players_schema = PlayerSchema(many=True)
@@ -39,3 +73,9 @@ games_schema = GameSchema(many=True)
 
 move_schema = MoveSchema()
 moves_schema = MoveSchema(many=True)
+# Loads plain dicts for bulk inserts instead of building Move instances
+moves_batch_schema = MoveSchema(many=True, load_instance=False)
+
+# Responses that embed related rows (?include=)
+moves_with_player_schema = MoveWithPlayerSchema(many=True)
+game_detail_schema = GameDetailSchema()
@@ -0,0 +1,312 @@
+"""Headless Ludo self-play for engine benchmarks and load generation.
+
+Bots play full four-seat games on the server's engine (app.engine, the
+Python port of pathData.js and TokenCapture.jsx). A strategy is a
+function (state, dice, pieces, rng) -> piece that picks one of the legal
+pieces; use a name from STRATEGIES or a "module:function" path.
+
+Two modes, both run through the flask CLI (see commands.py):
+
+    flask simulate engine --games 1000000 --workers 4
+    flask simulate api --games 200 --workers 2
+
+`engine` plays games in memory and reports games/sec. `api` plays them
+through the Flask test client against a throwaway database: bots take
+seats through the lobby, post every move to POST /api/moves, check the
+server lands each token where the local engine did, then finish the
+game. It reports games/sec and the latency distribution per endpoint.
+Both split the games across a fork-based process pool.
+"""
+import os
+import random
+import tempfile
+import time
+from array import array
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from importlib import import_module
+import multiprocessing
+
+from .engine import GameState, SEATS, legal_moves, apply_move, skip_turn
+from .engine.rules import STEP, SAFE_SQUARES, TOKENS_PER_SEAT, FINISHED
+
+# A game that runs this long is abandoned (random bots finish in ~340 moves)
+MAX_MOVES = 10000
+
+
+def _step(state, piece, dice):
+    return STEP[state.turn][state.tokens[state.turn * TOKENS_PER_SEAT + piece] * 7 + dice]
+
+
+def _captures(state, piece, dice):
+    new, _, _, new_square, new_slot, can_capture = _step(state, piece, dice)
+    return can_capture and state.crowd[new_square] > state.occupancy[new_slot]
+
+
+def random_strategy(state, dice, pieces, rng):
+    """Any legal piece"""
+    return pieces[int(rng.random() * len(pieces))]
+
+
+def runner_strategy(state, dice, pieces, rng):
+    """Always advance the token closest to home"""
+    base = state.turn * TOKENS_PER_SEAT
+    return max(pieces, key=lambda piece: state.tokens[base + piece])
+
+
+def aggressive_strategy(state, dice, pieces, rng):
+    """Capture when possible, then enter a new token, then run"""
+    for piece in pieces:
+        if _captures(state, piece, dice):
+            return piece
+    base = state.turn * TOKENS_PER_SEAT
+    for piece in pieces:
+        if state.tokens[base + piece] == 0:
+            return piece
+    return runner_strategy(state, dice, pieces, rng)
+
+
+def cautious_strategy(state, dice, pieces, rng):
+    """Finish or reach a safe square when possible, otherwise run"""
+    for piece in pieces:
+        new, _, _, new_square, _, _ = _step(state, piece, dice)
+        if new == FINISHED or new_square in SAFE_SQUARES:
+            return piece
+    return runner_strategy(state, dice, pieces, rng)
+
+
+STRATEGIES = {
+    "random": random_strategy,
+    "runner": runner_strategy,
+    "aggressive": aggressive_strategy,
+    "cautious": cautious_strategy,
+}
+
+
+def resolve_strategy(name):
+    """A strategy from STRATEGIES or a "module:function" path"""
+    if name in STRATEGIES:
+        return STRATEGIES[name]
+    module_name, _, function_name = name.partition(":")
+    if not function_name:
+        raise ValueError(f"Unknown strategy {name!r}; use one of {', '.join(STRATEGIES)} or module:function")
+    return getattr(import_module(module_name), function_name)
+
+
+def play(state, strategies, rng, max_moves=MAX_MOVES):
+    """Play `state` to the end, yielding (seat, piece, dice, position, skipped) per move.
+
+    `strategies` holds one strategy per seat. Turns without a legal move
+    are skipped; they show up as a jump in seat between moves, and
+    `skipped` holds the roll each skipped seat couldn't use, in seat order
+    (a full round of skips leaves the turn where it was, so it drops out).
+    """
+    if state.winner() is not None:
+        return
+    roll = rng.random
+    moves = 0
+    skipped = ()
+    while moves < max_moves:
+        dice = int(roll() * 6) + 1
+        pieces = legal_moves(state, dice)
+        if not pieces:
+            skip_turn(state)
+            skipped = skipped + (dice,) if len(skipped) < len(SEATS) - 1 else ()
+            continue
+        seat = state.turn
+        piece = strategies[seat](state, dice, pieces, rng)
+        position = apply_move(state, piece, dice)
+        yield seat, piece, dice, position, skipped
+        skipped = ()
+        moves += 1
+        # A game can only end on the move that brings a token home
+        if position == FINISHED and state.winner() is not None:
+            return
+
+
+class Tally:
+    """Totals from a batch of games; batches from several workers merge()"""
+
+    def __init__(self):
+        self.games = 0
+        self.moves = 0
+        self.wins = Counter()
+        self.abandoned = 0
+        self.mismatches = 0
+        self.errors = Counter()
+        # endpoint -> request latencies in ms
+        self.latencies = {}
+
+    def record_game(self, state, moves):
+        self.games += 1
+        self.moves += moves
+        winner = state.winner()
+        if winner is None:
+            self.abandoned += 1
+        else:
+            self.wins[winner] += 1
+
+    def observe(self, endpoint, ms, status):
+        self.latencies.setdefault(endpoint, array("d")).append(ms)
+        if status >= 400:
+            self.errors[endpoint] += 1
+
+    def merge(self, other):
+        self.games += other.games
+        self.moves += other.moves
+        self.wins.update(other.wins)
+        self.abandoned += other.abandoned
+        self.mismatches += other.mismatches
+        self.errors.update(other.errors)
+        for endpoint, values in other.latencies.items():
+            self.latencies.setdefault(endpoint, array("d")).extend(values)
+        return self
+
+    def report(self, elapsed, strategies):
+        """Lines summarising the run"""
+        lines = [f"{self.games} games, {self.moves} moves in {elapsed:.1f}s: "
+                 f"{self.games / elapsed:,.1f} games/sec, {self.moves / elapsed:,.0f} moves/sec"]
+        finished = self.games - self.abandoned
+        if finished:
+            lines.append("wins: " + ", ".join(
+                f"{SEATS[seat]} ({strategies[seat]}) {self.wins[seat] / finished:.1%}"
+                for seat in range(len(SEATS))))
+        if self.abandoned:
+            lines.append(f"abandoned after {MAX_MOVES} moves: {self.abandoned}")
+        if self.latencies:
+            lines.append(f"{'endpoint':<34} {'requests':>9} {'errors':>7} "
+                         f"{'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+            for endpoint, values in sorted(self.latencies.items()):
+                ordered = sorted(values)
+                p50, p90, p99 = (ordered[min(len(ordered) - 1, int(len(ordered) * q))] for q in (0.5, 0.9, 0.99))
+                lines.append(f"{endpoint:<34} {len(ordered):>9} {self.errors[endpoint]:>7} "
+                             f"{p50:>8.2f} {p90:>8.2f} {p99:>8.2f} {ordered[-1]:>8.2f}")
+            lines.append(f"server positions differing from the local engine: {self.mismatches}")
+        return lines
+
+
+def play_engine_games(count, strategy_names, seed):
+    """Play `count` games in memory"""
+    rng = random.Random(seed)
+    strategies = [resolve_strategy(name) for name in strategy_names]
+    tally = Tally()
+    for _ in range(count):
+        state = GameState()
+        moves = 0
+        for _ in play(state, strategies, rng):
+            moves += 1
+        tally.record_game(state, moves)
+    return tally
+
+
+# Settings for the app each api worker builds: rate limits would throttle
+# the bots, and cheap inline hashes keep registration out of the
+# measurements (a hashing process pool would outlive the worker)
+API_CONFIG = {"RATELIMIT_ENABLED": False, "BCRYPT_ROUNDS": 4, "PASSWORD_HASH_EXECUTOR": "inline"}
+
+
+class ApiBots:
+    """Four bot players driving the HTTP API through a test client"""
+
+    def __init__(self, app, tally, worker):
+        self.client = app.test_client()
+        self.tally = tally
+        self.players = []
+        for seat in range(len(SEATS)):
+            credentials = {"name": f"bot{worker}x{seat}x{os.getpid()}", "password": "Bot-password1"}
+            body = self.request("POST", "/api/auth/register", "POST /api/auth/register", json=credentials)
+            self.players.append((body["player"]["id"], {"Authorization": f"Bearer {body['access_token']}"}))
+
+    def request(self, method, url, endpoint, **kwargs):
+        start = time.perf_counter()
+        response = self.client.open(url, method=method, **kwargs)
+        self.tally.observe(endpoint, (time.perf_counter() - start) * 1000, response.status_code)
+        return response.get_json()
+
+    def play_game(self, strategies, rng):
+        game = self.request("POST", "/api/games", "POST /api/games",
+                            json={"status": "waiting", "max_players": len(SEATS)})
+        game_id = game["id"]
+        for _, headers in self.players:
+            self.request("GET", "/api/lobby", "GET /api/lobby")
+            self.request("POST", f"/api/lobby/{game_id}/join", "POST /api/lobby/<id>/join", headers=headers)
+
+        state = GameState()
+        moves = 0
+        for seat, piece, dice, position, skipped in play(state, strategies, rng):
+            player_id, headers = self.players[seat]
+            move = self.request("POST", "/api/moves", "POST /api/moves", headers=headers, json={
+                "game_id": game_id, "player_id": player_id, "seat": seat,
+                "piece_id": piece + 1, "dice_roll": dice, "skipped_rolls": list(skipped)})
+            if not move or move.get("position") != position:
+                self.tally.mismatches += 1
+            moves += 1
+
+        board = self.request("GET", f"/api/games/{game_id}/state", "GET /api/games/<id>/state")
+        if board and board["tokens"] != {SEATS[seat]: state.positions(seat) for seat in range(len(SEATS))}:
+            self.tally.mismatches += 1
+        self.request("PATCH", f"/api/games/{game_id}", "PATCH /api/games/<id>", headers=self.players[0][1],
+                     json={"status": "finished"})
+        self.tally.record_game(state, moves)
+
+
+def play_api_games(count, strategy_names, seed, database_url, worker=0):
+    """Play `count` games through the HTTP API of an app on `database_url`"""
+    from . import create_app
+
+    rng = random.Random(seed)
+    strategies = [resolve_strategy(name) for name in strategy_names]
+    app = create_app(dict(API_CONFIG, SQLALCHEMY_DATABASE_URI=database_url))
+    tally = Tally()
+    bots = ApiBots(app, tally, worker)
+    for _ in range(count):
+        bots.play_game(strategies, rng)
+    return tally
+
+
+def _run_job(job):
+    mode, *args = job
+    return (play_engine_games if mode == "engine" else play_api_games)(*args)
+
+
+def run(mode, games, strategy_names, workers, seed, database_url=None):
+    """Play `games` games split across `workers` processes; returns (tally, seconds)"""
+    workers = max(1, min(workers, games))
+    counts = [games // workers + (index < games % workers) for index in range(workers)]
+    if mode == "engine":
+        jobs = [("engine", count, strategy_names, seed + index) for index, count in enumerate(counts)]
+    else:
+        jobs = [("api", count, strategy_names, seed + index, database_url, index)
+                for index, count in enumerate(counts)]
+
+    start = time.perf_counter()
+    if workers == 1:
+        tallies = [_run_job(jobs[0])]
+    else:
+        context = multiprocessing.get_context("fork")
+        with ProcessPoolExecutor(workers, mp_context=context) as pool:
+            tallies = list(pool.map(_run_job, jobs))
+    elapsed = time.perf_counter() - start
+    return _merge(tallies), elapsed
+
+
+def _merge(tallies):
+    total = Tally()
+    for tally in tallies:
+        total.merge(tally)
+    return total
+
+
+def scratch_database():
+    """(url, directory) for a throwaway SQLite database with the schema created"""
+    from . import create_app, db
+
+    directory = tempfile.TemporaryDirectory(prefix="ludo-sim-")
+    url = f"sqlite:///{os.path.join(directory.name, 'simulation.db')}"
+    app = create_app(dict(API_CONFIG, SQLALCHEMY_DATABASE_URI=url))
+    with app.app_context():
+        db.create_all()
+        # Workers fork after this; they must not share its connections
+        for engine in db.engines.values():
+            engine.dispose()
+    return url, directory
@@ -0,0 +1,309 @@
+"""Game analytics over the moves table for /api/stats.
+
+MoveTotals holds running totals per player, game and seat in NumPy
+arrays. It folds moves in id order, a chunk at a time, and remembers the
+last id it folded, so each read only fetches the moves written since:
+one indexed range scan instead of a pass over the table. Dice counts,
+game lengths and games played are bincounts over each chunk's columns.
+Captures and winners need the board before each move, so they come from
+replaying the chunk on per-game GameStates held in memory.
+
+Editing or deleting moves rewrites history a running total can't
+subtract, so those routes call Stats.invalidate(), which rebuilds the
+totals from scratch on a background thread and swaps them in; reads
+serve the old totals until then. Each worker keeps its own totals; the
+moves other workers write are picked up on the next read, and their
+edits and deletions by the rebuild every STATS_REFRESH_SECONDS.
+"""
+import threading
+import time
+from contextlib import nullcontext
+from itertools import chain
+import numpy as np
+from flask import current_app
+from .engine import GameState, SEATS, FINISHED, apply_move
+from .engine.rules import STEP, TOKENS_PER_SEAT
+
+NUM_SEATS = len(SEATS)
+# Recorded seat of legacy moves, which are played by whoever's turn it is
+NO_SEAT = 255
+NO_PLAYER = -1
+
+
+def _grow(array, size):
+    """`array` with its first axis padded with zeros to at least `size`"""
+    if len(array) >= size:
+        return array
+    grown = np.zeros((max(size, len(array) * 2),) + array.shape[1:], array.dtype)
+    grown[:len(array)] = array
+    return grown
+
+
+def _summary(values):
+    """mean/median/p90/max of an array, or None when it is empty"""
+    if not len(values):
+        return None
+    return {"mean": round(float(values.mean()), 2), "median": float(np.median(values)),
+            "p90": float(np.percentile(values, 90)), "max": int(values.max())}
+
+
+def _dice(counts):
+    return {str(face): int(counts[face]) for face in range(1, 7)}
+
+
+class MoveTotals:
+    """Running totals over moves folded in id order"""
+
+    def __init__(self):
+        self.last_move_id = 0
+        self.moves = 0
+        # [player_id, dice] -> moves; [player_id] -> tokens sent home / games played
+        self.dice = np.zeros((0, 7), np.int64)
+        self.captures = np.zeros(0, np.int64)
+        self.games_played = np.zeros(0, np.int64)
+        # [game_id] -> moves / captures / winning seat; [game_id, seat] -> last player to move there
+        self.game_moves = np.zeros(0, np.int64)
+        self.game_captures = np.zeros(0, np.int64)
+        self.winner = np.zeros(0, np.int64)
+        self.last_mover = np.zeros((0, NUM_SEATS), np.int64)
+        # Sorted (game_id << 32 | player_id) pairs already counted in games_played
+        self._pairs = np.zeros(0, np.int64)
+        self._boards = {}
+
+    def fold(self, game_id, player_id, seat, piece_id, dice_roll, move_id):
+        """Add a chunk of moves, given as equal-length int64 arrays in id order"""
+        if not len(game_id):
+            return
+        players = int(player_id.max()) + 1
+        games = int(game_id.max()) + 1
+        self.dice = _grow(self.dice, players)
+        self.captures = _grow(self.captures, players)
+        self.games_played = _grow(self.games_played, players)
+        self.game_moves = _grow(self.game_moves, games)
+        self.game_captures = _grow(self.game_captures, games)
+        if len(self.winner) < games:
+            size = max(games, len(self.winner) * 2)
+            winner = np.full(size, -1, np.int64)
+            winner[:len(self.winner)] = self.winner
+            last_mover = np.full((size, NUM_SEATS), NO_PLAYER, np.int64)
+            last_mover[:len(self.last_mover)] = self.last_mover
+            self.winner, self.last_mover = winner, last_mover
+
+        dice = np.clip(dice_roll, 0, 6)
+        self.dice[:players] += np.bincount(player_id * 7 + dice, minlength=players * 7).reshape(players, 7)
+        self.game_moves[:games] += np.bincount(game_id, minlength=games)
+
+        pairs = np.unique((game_id << 32) | player_id)
+        new = pairs[~np.isin(pairs, self._pairs, assume_unique=True)]
+        if len(new):
+            self.games_played[:players] += np.bincount(new & 0xFFFFFFFF, minlength=players)
+            self._pairs = np.union1d(self._pairs, new)
+
+        self._replay(game_id.tolist(), player_id.tolist(), seat.tolist(), piece_id.tolist(), dice_roll.tolist())
+        self.moves += len(game_id)
+        self.last_move_id = int(move_id[-1])
+
+    def _replay(self, game_ids, player_ids, seats, piece_ids, dice_rolls):
+        """Count captures, last movers and winners by playing the moves on their boards"""
+        boards = self._boards
+        captures = self.captures
+        game_captures = self.game_captures
+        last_mover = self.last_mover
+        winner = self.winner
+        for game_id, player_id, seat, piece_id, dice in zip(game_ids, player_ids, seats, piece_ids, dice_rolls):
+            state = boards.get(game_id)
+            if state is None:
+                state = boards[game_id] = GameState()
+            if seat != NO_SEAT:
+                state.turn = seat
+            seat = state.turn
+            step = (STEP[seat][state.tokens[seat * TOKENS_PER_SEAT + piece_id - 1] * 7 + dice]
+                    if 0 < piece_id <= TOKENS_PER_SEAT and 0 < dice < 7 else None)
+            if step is None:
+                # Legacy rows that never applied cleanly; replay() skips them too
+                continue
+            # Opponents on the landing square (all tokens there but ours) go home
+            _, _, _, new_square, new_slot, can_capture = step
+            sent_home = state.crowd[new_square] - state.occupancy[new_slot] if can_capture else 0
+            if apply_move(state, piece_id - 1, dice) == FINISHED and state.winner() is not None:
+                winner[game_id] = state.winner()
+            last_mover[game_id, seat] = player_id
+            if sent_home:
+                captures[player_id] += sent_home
+                game_captures[game_id] += sent_home
+
+
+class _Current:
+    """An app's MoveTotals, when they were built, and the rebuild replacing them"""
+
+    __slots__ = ("totals", "built", "rebuilding", "generation")
+
+    def __init__(self, totals):
+        self.totals = totals
+        self.built = time.monotonic()
+        self.rebuilding = False
+        # Bumped by invalidate(); a rebuild that started before the last
+        # bump may have read the old rows, so it runs again
+        self.generation = 0
+
+
+class Stats:
+    """Flask extension keeping each worker's MoveTotals current.
+
+    Every read folds the moves written since the last one, STATS_CHUNK_SIZE
+    rows per fetch. Only the first read builds the totals itself. After
+    that, invalidate() and a timer of STATS_REFRESH_SECONDS (300 by
+    default, to pick up other workers' edits and deletions; None turns it
+    off) rebuild them from scratch on a background thread. Reads keep
+    serving the old totals until the new ones are swapped in.
+    """
+
+    def __init__(self, app=None):
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault("STATS_REFRESH_SECONDS", 300)
+        app.config.setdefault("STATS_CHUNK_SIZE", 100000)
+
+    def _fold(self, totals, current=None):
+        """Fold the moves after totals.last_move_id into `totals`.
+
+        With `current`, `totals` are the ones reads are served from and
+        other reads fold into them too; returns False if a rebuild swapped
+        them out mid-scan. Without, they aren't published yet.
+        """
+        from . import db
+        from .models import Move
+
+        # Only the columns the totals need, as plain tuples; table columns keep
+        # it Core (no ORM row loading). A plain SELECT goes to the reader, so a
+        # long scan never holds the database's write lock
+        moves = Move.__table__.c
+        statement = (db.select(moves.game_id, moves.player_id, db.func.coalesce(moves.seat, NO_SEAT),
+                               moves.piece_id, moves.dice_roll, moves.id)
+                     .where(moves.id > totals.last_move_id)
+                     .order_by(moves.id)
+                     .execution_options(yield_per=current_app.config["STATS_CHUNK_SIZE"]))
+        result = db.session.execute(statement)
+        try:
+            for rows in result.partitions():
+                flat = np.fromiter(chain.from_iterable(rows), np.int64, len(rows) * 6).reshape(-1, 6)
+                # The lock covers folding a fetched chunk, not fetching it
+                with self._lock if current is not None else nullcontext():
+                    if current is not None and current.totals is not totals:
+                        return False
+                    # Another read may have folded part of this range meanwhile
+                    totals.fold(*flat[flat[:, 5] > totals.last_move_id].T)
+        finally:
+            result.close()
+        return True
+
+    def _rebuild(self, app, current):
+        while True:
+            with self._lock:
+                generation = current.generation
+            totals = MoveTotals()
+            # A fresh context (and session) per pass, so a rerun reads new rows
+            with app.app_context():
+                try:
+                    self._fold(totals)
+                except Exception:
+                    app.logger.exception("Stats rebuild failed")
+                    totals = None
+            with self._lock:
+                if totals is not None:
+                    current.totals = totals
+                # A failed rebuild is retried after another interval
+                current.built = time.monotonic()
+                if totals is None or current.generation == generation:
+                    current.rebuilding = False
+                    return
+
+    def _start_rebuild(self, current):
+        """Start a background rebuild unless one is running; call with the lock held"""
+        if not current.rebuilding:
+            current.rebuilding = True
+            threading.Thread(target=self._rebuild, args=(current_app._get_current_object(), current),
+                             name="stats-rebuild", daemon=True).start()
+
+    @property
+    def totals(self):
+        with self._lock:
+            current = current_app.extensions.get("stats")
+            if current is None:
+                current = current_app.extensions["stats"] = _Current(MoveTotals())
+            refresh = current_app.config["STATS_REFRESH_SECONDS"]
+            if refresh and time.monotonic() - current.built > refresh:
+                self._start_rebuild(current)
+            totals = current.totals
+        # Swapped mid-scan: catch up on the new totals instead
+        while not self._fold(totals, current):
+            totals = current.totals
+        return totals
+
+    def invalidate(self):
+        """Rebuild in the background (after moves are edited or deleted)"""
+        with self._lock:
+            current = current_app.extensions.get("stats")
+            if current is not None:
+                current.generation += 1
+                self._start_rebuild(current)
+
+    def player(self, player_id):
+        """Stats for one player's moves"""
+        totals = self.totals
+        if player_id < len(totals.dice):
+            dice = totals.dice[player_id]
+            games = int(totals.games_played[player_id])
+            captures = int(totals.captures[player_id])
+        else:
+            dice, games, captures = np.zeros(7, np.int64), 0, 0
+        moves = int(dice.sum())
+        # A game is won by whoever last moved for the winning seat
+        won = np.flatnonzero(totals.winner >= 0)
+        wins = int((totals.last_mover[won, totals.winner[won]] == player_id).sum())
+        return {
+            "player_id": player_id,
+            "moves": moves,
+            "games": games,
+            "wins": wins,
+            "win_rate": round(wins / games, 4) if games else None,
+            "dice": _dice(dice),
+            "dice_mean": round(float((dice * np.arange(7)).sum() / moves), 3) if moves else None,
+            "captures": captures,
+            "capture_rate": round(captures / moves, 4) if moves else None,
+            "as_of_move_id": totals.last_move_id,
+        }
+
+    def games(self):
+        """Table-wide stats: game lengths, captures, dice and wins by seat"""
+        from . import db
+        from .models import Game
+
+        totals = self.totals
+        statuses = dict(db.session.query(Game.status, db.func.count(Game.id)).group_by(Game.status).all())
+        played = totals.game_moves > 0
+        won = totals.winner >= 0
+        wins = np.bincount(totals.winner[won], minlength=NUM_SEATS)
+        finished = int(won.sum())
+        return {
+            "games": statuses,
+            "moves": totals.moves,
+            "length": {
+                "all": _summary(totals.game_moves[played]),
+                "won": _summary(totals.game_moves[won]),
+            },
+            "captures": {
+                "total": int(totals.game_captures.sum()),
+                "per_game": round(float(totals.game_captures[played].mean()), 3) if played.any() else None,
+                "per_move": round(int(totals.game_captures.sum()) / totals.moves, 4) if totals.moves else None,
+            },
+            "dice": _dice(totals.dice.sum(axis=0)),
+            "wins_by_seat": {
+                SEATS[seat]: {"wins": int(wins[seat]), "rate": round(int(wins[seat]) / finished, 4) if finished else None}
+                for seat in range(NUM_SEATS)
+            },
+            "as_of_move_id": totals.last_move_id,
+        }
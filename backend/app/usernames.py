@@ -0,0 +1,115 @@
+import threading
+from itertools import islice
+from flask import current_app
+from sortedcontainers import SortedList
+from .reload import ReloadedCopy
+
+# Longest name the players table accepts
+MAX_NAME_LENGTH = 50
+MIN_NAME_LENGTH = 3
+
+# How many names sharing a taken name's prefix are looked at for suggestions
+_SUGGESTION_SCAN = 1000
+
+
+class NameIndex:
+    """Sorted index of taken player names.
+
+    Membership is O(log n) without touching the database, and names
+    sharing a prefix sit next to each other, so suggestions for a taken
+    name come from one range scan.
+    """
+
+    def __init__(self, names=()):
+        self._lock = threading.Lock()
+        self._names = SortedList(names)
+
+    def __len__(self):
+        return len(self._names)
+
+    def __contains__(self, name):
+        return name in self._names
+
+    def add(self, name):
+        with self._lock:
+            if name not in self._names:
+                self._names.add(name)
+
+    def discard(self, name):
+        with self._lock:
+            self._names.discard(name)
+
+    def rename(self, old, new):
+        with self._lock:
+            self._names.discard(old)
+            if new not in self._names:
+                self._names.add(new)
+
+    def suggest(self, name, count=3):
+        """Up to `count` free names made by appending a number to `name`"""
+        # Leave room for the number so suggestions still fit the column
+        base = name[:MAX_NAME_LENGTH - 4]
+        with self._lock:
+            others = islice(self._names.irange(base, base + "\U0010ffff"), _SUGGESTION_SCAN)
+            taken = {other[len(base):] for other in others}
+        suggestions = []
+        number = 1
+        while len(suggestions) < count:
+            if str(number) not in taken:
+                suggestions.append(f"{base}{number}")
+            number += 1
+        return suggestions
+
+
+class Usernames:
+    """Flask extension answering username availability from a NameIndex.
+
+    The index is loaded from the players table on first use and kept
+    current by the routes that create, rename or delete players. Every
+    worker holds its own copy, reloaded in the background every
+    USERNAMES_REFRESH_SECONDS (30 by default; None turns it off) to pick
+    up other workers' registrations. A name another worker took since the
+    last reload shows as available until then; registering it still fails
+    with 409.
+    """
+
+    def __init__(self, app=None):
+        self._copy = ReloadedCopy("usernames", "USERNAMES_REFRESH_SECONDS", self._load)
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault("USERNAMES_REFRESH_SECONDS", 30)
+        app.config.setdefault("USERNAME_SUGGESTIONS", 3)
+
+    @staticmethod
+    def _load():
+        from . import db
+        from .models import Player
+
+        return NameIndex(db.session.execute(db.select(Player.name)).scalars())
+
+    @property
+    def index(self):
+        return self._copy.get()
+
+    def check(self, name):
+        """{"available": bool} plus "suggestions" when the name is taken"""
+        if not MIN_NAME_LENGTH <= len(name) <= MAX_NAME_LENGTH:
+            return {"available": False,
+                    "error": f"Username must be {MIN_NAME_LENGTH} to {MAX_NAME_LENGTH} characters long"}
+        index = self.index
+        if name not in index:
+            return {"available": True}
+        return {"available": False,
+                "suggestions": index.suggest(name, current_app.config["USERNAME_SUGGESTIONS"])}
+
+    def add(self, name):
+        self._copy.apply("add", name)
+
+    def remove(self, name):
+        self._copy.apply("discard", name)
+
+    def rename(self, old, new):
+        if old != new:
+            self._copy.apply("rename", old, new)
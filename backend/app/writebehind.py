@@ -0,0 +1,588 @@
+"""Write-behind persistence for POST /api/moves (MOVE_WRITE_BEHIND).
+
+Normally each move is committed before it is acknowledged, and on SQLite
+every game on the server waits its turn for the single writer. With
+write-behind on, a move is checked against an in-memory copy of its
+game's board, given the next move id, appended to the move journal
+(journal.py) and acknowledged once the journal is fsynced. A background
+thread commits queued moves in batches of up to
+MOVE_WRITE_BEHIND_BATCH_SIZE: one INSERT for the moves and one UPDATE
+each for their boards and games, so the database sees one transaction per
+batch instead of one per move.
+
+Recovery runs before the first request is served: journaled moves not in
+the database are inserted, their boards rebuilt and their games' version
+and turn_seq advanced, and only after that commits is the journal
+cleared. A crash part way through leaves the journal in place and the
+next start does the same again.
+
+A batch the database keeps rejecting with a constraint violation (say a
+move whose player was deleted behind the app's back) is retried
+MOVE_WRITE_BEHIND_MAX_ATTEMPTS times, then committed one move at a time.
+Moves that still fail, with every later move of their games, are written
+to the dead-letter file (MOVE_DEAD_LETTER_FILE) and released from the
+journal, and their games' boards are reloaded from the database. Other
+errors (a locked or unreachable database) are retried until they clear.
+
+Boards, move ids and the journal belong to one process, so run a single
+worker (threads are fine); a second process fails to lock the journal.
+The process keeps boards for at most MOVE_WRITE_BEHIND_MAX_GAMES games,
+dropping the least recently played once their moves are committed, and
+drops a finished game's board as soon as its last move commits.
+Routes that change games or moves any other way are wrapped in
+exclusive(): no move is accepted while they run, the queue is drained
+first, and the boards they may have changed are reloaded afterwards.
+Until its batch commits, a move shows in GET /api/games/<id>/state but
+not in move lists, stats or GET /api/games/<id>.
+"""
+import atexit
+import json
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from functools import partial, wraps
+from flask import current_app, jsonify
+from sqlalchemy.exc import IntegrityError
+from .engine import GameState
+from .journal import Journal
+
+_queue_lock = threading.Lock()
+
+MOVE_COLUMNS = ("id", "game_id", "player_id", "seat", "piece_id", "dice_roll", "position")
+
+
+class QueueStalled(Exception):
+    """Raised when queued moves don't reach the database within MOVE_WRITE_BEHIND_DRAIN_TIMEOUT"""
+
+
+class _Entry:
+    """A game's board, version and turn as of its last acknowledged move"""
+
+    __slots__ = ("state", "version", "turn_seq", "move_count", "last_move_id")
+
+    def __init__(self, state, version, turn_seq, move_count, last_move_id):
+        self.state = state
+        self.version = version
+        self.turn_seq = turn_seq
+        self.move_count = move_count
+        self.last_move_id = last_move_id
+
+
+class _Pending:
+    """An acknowledged move waiting for its batch, with its game as of that move"""
+
+    __slots__ = MOVE_COLUMNS + ("state", "move_count", "version", "turn_seq", "acknowledged")
+
+    def __init__(self, move, entry):
+        for column in MOVE_COLUMNS:
+            setattr(self, column, getattr(move, column))
+        self.state = entry.state.to_bytes()
+        self.move_count = entry.move_count
+        self.version = entry.version
+        self.turn_seq = entry.turn_seq
+        self.acknowledged = time.monotonic()
+
+
+def _registry():
+    return current_app.extensions.get("metrics")
+
+
+def _load_entry(game_id):
+    from . import db
+    from .models import Game
+    from .game_state import get_board
+
+    # Start a fresh read: a snapshot taken earlier in the request may predate
+    # moves the writer has committed since
+    db.session.commit()
+    board = get_board(game_id)
+    version, turn_seq = db.session.query(Game.version, Game.turn_seq).filter(Game.id == game_id).one()
+    entry = _Entry(GameState.from_bytes(board.state), version, turn_seq, board.move_count, board.last_move_id)
+    # Legacy games get their board built on first read; keep it
+    db.session.commit()
+    return entry
+
+
+def persist(batch):
+    """Write a batch of acknowledged moves and the boards and games they advance; does not commit.
+
+    Boards and games get their values as of the last move in the batch;
+    nothing else writes to them while their moves are queued.
+    """
+    from . import db
+    from .models import Move, Game, GameBoard, GameSnapshot
+    from .game_state import SNAPSHOT_INTERVAL
+
+    db.session.execute(db.insert(Move), [{column: getattr(item, column) for column in MOVE_COLUMNS}
+                                         for item in batch])
+    latest = {}
+    snapshots = []
+    for item in batch:
+        latest[item.game_id] = item
+        if item.move_count % SNAPSHOT_INTERVAL == 0:
+            snapshots.append({"game_id": item.game_id, "move_id": item.id,
+                              "move_count": item.move_count, "state": item.state})
+    boards = GameBoard.__table__
+    db.session.execute(
+        db.update(boards).where(boards.c.game_id == db.bindparam("b_game_id"))
+        .values(state=db.bindparam("b_state"), move_count=db.bindparam("b_move_count"),
+                last_move_id=db.bindparam("b_last_move_id")),
+        [{"b_game_id": item.game_id, "b_state": item.state, "b_move_count": item.move_count,
+          "b_last_move_id": item.id} for item in latest.values()])
+    games = Game.__table__
+    db.session.execute(
+        db.update(games).where(games.c.id == db.bindparam("g_id"))
+        .values(version=db.bindparam("g_version"), turn_seq=db.bindparam("g_turn_seq")),
+        [{"g_id": item.game_id, "g_version": item.version, "g_turn_seq": item.turn_seq}
+         for item in latest.values()])
+    if snapshots:
+        db.session.execute(db.insert(GameSnapshot), snapshots)
+
+
+def recover(journal):
+    """Commit the journal's moves that never reached the database, then clear it.
+
+    Returns the highest move id in use.
+    """
+    from . import db
+    from .models import Move, Game, Player
+    from .game_state import rebuild_board
+
+    records = journal.read()
+    last_id = db.session.query(db.func.max(Move.id)).scalar() or 0
+    if records:
+        ids = [record[0] for record in records]
+        committed = {row[0] for row in db.session.query(Move.id).filter(Move.id.between(min(ids), max(ids)))}
+        missing = [record for record in records if record[0] not in committed]
+        games = {row[0] for row in db.session.query(Game.id).filter(Game.id.in_({r[1] for r in missing}))}
+        players = {row[0] for row in db.session.query(Player.id).filter(Player.id.in_({r[2] for r in missing}))}
+        orphans = [record for record in missing if record[1] not in games or record[2] not in players]
+        if orphans:
+            current_app.logger.warning("Dropping journaled moves whose game or player is gone",
+                                       extra={"moves": [record[0] for record in orphans]})
+        missing = [record for record in missing if record[1] in games and record[2] in players]
+        if missing:
+            db.session.execute(db.insert(Move), [dict(zip(MOVE_COLUMNS, record)) for record in missing])
+            first, counts = {}, {}
+            for record in missing:
+                first.setdefault(record[1], record[0])
+                counts[record[1]] = counts.get(record[1], 0) + 1
+            for game_id, move_id in first.items():
+                rebuild_board(game_id, move_id)
+                Game.query.filter(Game.id == game_id).update(
+                    {Game.version: Game.version + counts[game_id], Game.turn_seq: Game.turn_seq + counts[game_id]},
+                    synchronize_session=False)
+            db.session.commit()
+            current_app.logger.info("Recovered journaled moves", extra={"moves": len(missing), "games": len(first)})
+        last_id = max(last_id, max(ids))
+    journal.reset()
+    return last_id
+
+
+class _Queue:
+    """One process's boards, id counter, journal and writer thread"""
+
+    def __init__(self, app):
+        config = app.config
+        self.app = app
+        self.batch_size = config["MOVE_WRITE_BEHIND_BATCH_SIZE"]
+        self.drain_timeout = config["MOVE_WRITE_BEHIND_DRAIN_TIMEOUT"]
+        self.max_attempts = config["MOVE_WRITE_BEHIND_MAX_ATTEMPTS"]
+        self.dead_letter_file = config["MOVE_DEAD_LETTER_FILE"]
+        self.max_games = config["MOVE_WRITE_BEHIND_MAX_GAMES"]
+        self.journal = Journal(config["MOVE_JOURNAL_DIR"], config["MOVE_JOURNAL_SEGMENT_BYTES"])
+        # Guards everything below; the writer and drain() wait on it
+        self.lock = threading.Condition()
+        # Least recently played first
+        self.entries = OrderedDict()
+        self.pending = deque()
+        # Bumped whenever boards are dropped, so a board read before then is not installed
+        self.generation = 0
+        self.paused = False
+        with app.app_context():
+            self.next_id = recover(self.journal) + 1
+        # Every id below next_id is in the database once committed_id catches up
+        self.committed_id = self.next_id - 1
+        self.closed = False
+        self.thread = threading.Thread(target=self._run, name="move-write-behind", daemon=True)
+        self.thread.start()
+        atexit.register(self.close)
+
+    def play(self, move, expected, play_move):
+        """Validate, number and journal `move`; see WriteBehind.submit()"""
+        while True:
+            generation = self.generation
+            loaded = None if move.game_id in self.entries else _load_entry(move.game_id)
+            with self.lock:
+                while self.paused:
+                    self.lock.wait()
+                entry = self.entries.get(move.game_id)
+                if entry is None:
+                    if loaded is None or generation != self.generation:
+                        # Boards were dropped while we read this one; read it again
+                        continue
+                    entry = self.entries[move.game_id] = loaded
+                else:
+                    self.entries.move_to_end(move.game_id)
+                if expected is not None and expected != entry.version:
+                    return None
+
+                state = entry.state.copy()
+                move.seat, move.position = play_move(state, move.seat, move.piece_id, move.dice_roll, move.position,
+                                                     move.skipped_rolls)
+                move.id = self.next_id
+                position = self.journal.append(move.id, move.game_id, move.player_id, move.seat,
+                                               move.piece_id, move.dice_roll, move.position)
+                self.next_id += 1
+                entry.state = state
+                entry.version += 1
+                entry.turn_seq += 1
+                entry.move_count += 1
+                entry.last_move_id = move.id
+                self.pending.append(_Pending(move, entry))
+                self._evict()
+                self.lock.notify_all()
+                claimed = entry.version, entry.turn_seq
+                depth = self.next_id - 1 - self.committed_id
+
+            fsync = self.journal.sync(position)
+            registry = _registry()
+            if registry is not None:
+                registry.write_behind_depth.set(depth)
+                if fsync is not None:
+                    registry.journal_fsync.observe(fsync)
+            return claimed
+
+    def _run(self):
+        from . import db
+
+        with self.app.app_context():
+            while True:
+                with self.lock:
+                    while not self.pending:
+                        self.lock.wait()
+                    batch = [self.pending.popleft() for _ in range(min(self.batch_size, len(self.pending)))]
+                self._commit(batch)
+                db.session.remove()
+
+    def _commit(self, batch):
+        from . import db, response_cache
+
+        delay = 0.05
+        attempts = 0
+        dead = []
+        while True:
+            try:
+                persist(batch)
+                db.session.commit()
+                break
+            except Exception as err:
+                db.session.rollback()
+                # The moves are safe in the journal; keep trying
+                current_app.logger.exception("Write-behind commit failed", extra={"moves": len(batch)})
+                attempts += isinstance(err, IntegrityError)
+                if attempts >= self.max_attempts:
+                    # A move the database will never take; commit around it
+                    batch, dead = self._isolate(batch)
+                    break
+                time.sleep(delay)
+                delay = min(delay * 2, 5)
+
+        committed = time.monotonic()
+        with self.lock:
+            if dead:
+                dead += self._drop_games({item.game_id for item in dead})
+            # Every move before the oldest one still queued is committed or dead-lettered
+            self.committed_id = self.pending[0].id - 1 if self.pending else self.next_id - 1
+            # Finished games take no more moves; the database has their final boards
+            finished = [item.game_id for item in batch if self._committed(item.game_id)
+                        and self.entries[item.game_id].state.winner() is not None]
+            if finished:
+                for game_id in finished:
+                    self.entries.pop(game_id, None)
+                self.generation += 1
+            self.journal.release(self.committed_id)
+            depth = self.next_id - 1 - self.committed_id
+            self.lock.notify_all()
+
+        games = {item.game_id for item in batch + dead}
+        response_cache.invalidate(*(f"game:{game_id}" for game_id in games),
+                                  *(f"game_moves:{game_id}" for game_id in games))
+        registry = _registry()
+        if registry is not None:
+            registry.write_behind_depth.set(depth)
+            if batch:
+                registry.write_behind_batches.observe(len(batch))
+            for item in batch:
+                registry.write_behind_latency.observe(committed - item.acknowledged)
+            if dead:
+                registry.write_behind_dead_letters.inc(amount=len(dead))
+
+    def _committed(self, game_id):
+        """Whether `game_id` has a board with no moves waiting to commit; holds the lock"""
+        entry = self.entries.get(game_id)
+        return entry is not None and (entry.last_move_id is None or entry.last_move_id <= self.committed_id)
+
+    def _evict(self):
+        """Drop the least recently played boards over max_games; holds the lock.
+
+        Only boards whose moves are all committed go, so the database
+        has them; a board with queued moves stays however old it is.
+        """
+        excess = len(self.entries) - self.max_games
+        if excess <= 0:
+            return
+        stale = []
+        for game_id in self.entries:
+            if len(stale) == excess:
+                break
+            if self._committed(game_id):
+                stale.append(game_id)
+        for game_id in stale:
+            del self.entries[game_id]
+        if stale:
+            self.generation += 1
+
+    def _isolate(self, batch):
+        """Commit a rejected batch one move at a time; returns (committed, dead-lettered).
+
+        Once a move fails, the rest of its game's moves were played on top
+        of it and are dead-lettered with it.
+        """
+        from . import db
+
+        committed, dead, failed = [], [], {}
+        for item in batch:
+            if item.game_id not in failed:
+                while True:
+                    try:
+                        persist([item])
+                        db.session.commit()
+                        committed.append(item)
+                        break
+                    except IntegrityError as err:
+                        db.session.rollback()
+                        failed[item.game_id] = str(err.orig)
+                        break
+                    except Exception:
+                        db.session.rollback()
+                        current_app.logger.exception("Write-behind commit failed", extra={"moves": 1})
+                        time.sleep(1)
+            if item.game_id in failed:
+                dead.append(item)
+        self._dead_letter(dead, failed)
+        return committed, dead
+
+    def _drop_games(self, game_ids):
+        """Dead-letter the queued moves of `game_ids` and forget their boards; holds the lock"""
+        dropped = [item for item in self.pending if item.game_id in game_ids]
+        if dropped:
+            self.pending = deque(item for item in self.pending if item.game_id not in game_ids)
+            self._dead_letter(dropped, dict.fromkeys(game_ids, "an earlier move of the game was rejected"))
+        for game_id in game_ids:
+            self.entries.pop(game_id, None)
+        self.generation += 1
+        return dropped
+
+    def _dead_letter(self, items, errors):
+        """Append moves the database rejected to the dead-letter file, durably"""
+        if not items:
+            return
+        with open(self.dead_letter_file, "a") as out:
+            for item in items:
+                record = {column: getattr(item, column) for column in MOVE_COLUMNS}
+                out.write(json.dumps(dict(record, error=errors[item.game_id])) + "\n")
+            out.flush()
+            os.fsync(out.fileno())
+        self.app.logger.error("Dead-lettered write-behind moves",
+                              extra={"moves": [item.id for item in items], "file": self.dead_letter_file})
+
+    def pause(self):
+        """Stop accepting moves and wait until every queued move is committed"""
+        deadline = time.monotonic() + self.drain_timeout
+        with self.lock:
+            # One exclusive route at a time
+            while self.paused:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise QueueStalled()
+                self.lock.wait(remaining)
+            self.paused = True
+            while self.committed_id < self.next_id - 1:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self.paused = False
+                    self.lock.notify_all()
+                    raise QueueStalled()
+                self.lock.wait(remaining)
+
+    def resume(self, game_id=None):
+        """Accept moves again, dropping `game_id`'s board (or all boards) so it is read afresh"""
+        from . import db
+        from .models import Move
+
+        # A fresh session: the route's may be mid-failure
+        with self.app.app_context():
+            last_id = db.session.query(db.func.max(Move.id)).scalar() or 0
+        with self.lock:
+            if game_id is None:
+                self.entries.clear()
+            else:
+                self.entries.pop(game_id, None)
+            # The route may have inserted moves itself
+            self.next_id = max(self.next_id, last_id + 1)
+            self.committed_id = self.next_id - 1
+            self.generation += 1
+            self.paused = False
+            self.lock.notify_all()
+
+    def drain(self):
+        self.pause()
+        self.resume()
+
+    def close(self):
+        """Commit everything queued and empty the journal; runs at interpreter exit.
+
+        If the queue won't drain the journal is left for recovery.
+        """
+        if self.closed:
+            return
+        self.closed = True
+        try:
+            self.pause()
+        except QueueStalled:
+            self.app.logger.warning("Write-behind queue did not drain; its journal will be replayed on start")
+            return
+        self.journal.reset()
+        self.journal.close()
+
+    def entry(self, game_id):
+        with self.lock:
+            entry = self.entries.get(game_id)
+            if entry is None:
+                return None
+            return _Entry(entry.state.copy(), entry.version, entry.turn_seq, entry.move_count, entry.last_move_id)
+
+    def stats(self):
+        with self.lock:
+            return {"queued": self.next_id - 1 - self.committed_id, "games": len(self.entries),
+                    "next_move_id": self.next_id}
+
+
+class WriteBehind:
+    """Flask extension acknowledging moves once journaled and committing them in batches.
+
+    Off unless MOVE_WRITE_BEHIND is set (config or environment). The journal lives in
+    MOVE_JOURNAL_DIR (instance/journal) in segments of
+    MOVE_JOURNAL_SEGMENT_BYTES. exclusive() routes wait up to
+    MOVE_WRITE_BEHIND_DRAIN_TIMEOUT seconds for the queue to drain before
+    answering 503.
+    """
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault("MOVE_WRITE_BEHIND",
+                              os.getenv("MOVE_WRITE_BEHIND", "").lower() in ("1", "true", "yes", "on"))
+        app.config.setdefault("MOVE_JOURNAL_DIR", os.path.join(app.instance_path, "journal"))
+        app.config.setdefault("MOVE_JOURNAL_SEGMENT_BYTES", 4 * 1024 * 1024)
+        app.config.setdefault("MOVE_WRITE_BEHIND_BATCH_SIZE", 1000)
+        app.config.setdefault("MOVE_WRITE_BEHIND_DRAIN_TIMEOUT", 30)
+        app.config.setdefault("MOVE_WRITE_BEHIND_MAX_ATTEMPTS", 5)
+        app.config.setdefault("MOVE_WRITE_BEHIND_MAX_GAMES", 10000)
+        app.config.setdefault("MOVE_DEAD_LETTER_FILE", os.path.join(app.config["MOVE_JOURNAL_DIR"], "dead-letter.ndjson"))
+        if app.config["MOVE_WRITE_BEHIND"]:
+            # Recover and start the writer in the process serving requests
+            # (not a preloading master), before its first request
+            app.before_request(self._start)
+
+    def _start(self):
+        self.queue
+
+    @property
+    def enabled(self):
+        return current_app.config["MOVE_WRITE_BEHIND"]
+
+    @property
+    def queue(self):
+        queue = current_app.extensions.get("write_behind")
+        if queue is None:
+            with _queue_lock:
+                queue = current_app.extensions.get("write_behind")
+                if queue is None:
+                    queue = _Queue(current_app._get_current_object())
+                    current_app.extensions["write_behind"] = queue
+        return queue
+
+    def submit(self, move, expected=None, seated=None):
+        """Accept a validated, transient Move once it is journaled.
+
+        Plays it on the game's in-memory board, filling in move.id, seat
+        and position; `seated` is passed on to play_move(). Returns the
+        game's new (version, turn_seq), or None if `expected` is given and
+        the game is at another version. Raises IllegalMove.
+        """
+        from .game_state import play_move
+
+        return self.queue.play(move, expected, partial(play_move, seated=seated))
+
+    def tracks(self, game_id):
+        """Whether the queue holds a board for `game_id`"""
+        return self.enabled and game_id in self.queue.entries
+
+    def board(self, game_id):
+        """(board, version, turn_seq) for a game with moves through the queue, else None.
+
+        `board` is an unsaved GameBoard, for board_to_dict().
+        """
+        from .models import GameBoard
+
+        if not self.enabled:
+            return None
+        entry = self.queue.entry(game_id)
+        if entry is None:
+            return None
+        board = GameBoard(game_id=game_id, state=entry.state.to_bytes(),
+                          move_count=entry.move_count, last_move_id=entry.last_move_id)
+        return board, entry.version, entry.turn_seq
+
+    def version(self, game_id):
+        entry = self.queue.entry(game_id)
+        return entry.version if entry is not None else None
+
+    @contextmanager
+    def paused(self, game_id=None):
+        """Run the block with the queue drained and no moves accepted.
+
+        Afterwards `game_id`'s board (or every board) is read afresh.
+        Raises QueueStalled if the queue doesn't drain in time.
+        """
+        if not self.enabled:
+            yield
+            return
+        queue = self.queue
+        queue.pause()
+        try:
+            yield
+        finally:
+            queue.resume(game_id)
+
+    def exclusive(self, game_arg=None):
+        """Run a view inside paused(); `game_arg` names the view arg holding its game id"""
+        def decorator(view):
+            @wraps(view)
+            def wrapper(**kwargs):
+                try:
+                    with self.paused(kwargs.get(game_arg) if game_arg else None):
+                        return view(**kwargs)
+                except QueueStalled:
+                    return jsonify({"error": "Moves are still being saved; try again shortly"}), 503
+            return wrapper
+        return decorator
+
+    def stats(self):
+        return self.queue.stats() if self.enabled else None
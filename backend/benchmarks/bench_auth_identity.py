@@ -0,0 +1,97 @@
+"""Benchmark authenticated requests with and without the identity cache.
+
+Runs GET /api/auth/me and POST /api/moves with a bearer token against a
+throwaway SQLite database, once with IDENTITY_CACHE_TTL_SECONDS=0 (every
+request loads the player) and once with the cache on, and reports
+requests/sec and SQL statements per request for each.
+
+Usage:
+    python benchmarks/bench_auth_identity.py [--requests 5000] [--moves 2000]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+from sqlalchemy import event
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_batch_moves import make_games  # noqa: E402
+
+PHASES = [
+    ("no cache", {"IDENTITY_CACHE_TTL_SECONDS": 0}),
+    ("cached", {}),
+]
+
+
+def run_phase(config, args):
+    """{endpoint: (requests/sec, statements/request)}"""
+    from app import create_app, db
+    from app.models import Player, Game
+    from flask_jwt_extended import create_access_token
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        app = create_app({**config, "RATELIMIT_ENABLED": False})
+
+        random.seed(1)
+        with app.app_context():
+            db.create_all()
+            player = Player(id=1, name="bench", password_hash="x")
+            db.session.add(player)
+            games = make_games(args.moves, 1, 1, 200)
+            db.session.add_all(Game(id=game_id, status="ongoing") for game_id in games)
+            db.session.commit()
+            token = create_access_token(identity=1, additional_claims={"name": player.name})
+            engines = set(db.engines.values())
+
+        statements = 0
+
+        def count(conn, cursor, statement, params, context, executemany):
+            nonlocal statements
+            statements += 1
+
+        for engine in engines:
+            event.listen(engine, "before_cursor_execute", count)
+
+        client = app.test_client()
+        headers = {"Authorization": f"Bearer {token}"}
+        results = {}
+
+        statements = 0
+        start = time.perf_counter()
+        for _ in range(args.requests):
+            resp = client.get("/api/auth/me", headers=headers)
+            assert resp.status_code == 200, resp.json
+        results["GET /api/auth/me"] = (args.requests / (time.perf_counter() - start), statements / args.requests)
+
+        moves = [move for game_moves in games.values() for move in game_moves]
+        statements = 0
+        start = time.perf_counter()
+        for move in moves:
+            resp = client.post("/api/moves", json=move, headers=headers)
+            assert resp.status_code == 201, resp.json
+        results["POST /api/moves"] = (len(moves) / (time.perf_counter() - start), statements / len(moves))
+
+        for engine in engines:
+            event.remove(engine, "before_cursor_execute", count)
+            engine.dispose()
+        return results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--moves", type=int, default=2000)
+    args = parser.parse_args()
+
+    for name, config in PHASES:
+        for endpoint, (rate, queries) in run_phase(config, args).items():
+            print(f"{name:<9} {endpoint:<18} {rate:>8.0f} req/s  {queries:>5.2f} statements/request")
+
+
+if __name__ == "__main__":
+    main()
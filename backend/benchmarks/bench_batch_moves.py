@@ -0,0 +1,104 @@
+"""Benchmark move ingestion: POST /api/moves vs POST /api/games/<id>/moves:batch.
+
+Inserts the same number of legal moves through both endpoints against a
+throwaway SQLite database and reports moves/sec for each.
+
+Usage:
+    python benchmarks/bench_batch_moves.py [--moves 5000] [--batch-size 100] [--moves-per-game 200]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.engine import GameState, SEATS, legal_moves, apply_move, skip_turn  # noqa: E402
+
+
+def make_games(count, player_id, first_game_id, moves_per_game):
+    """Legal move payloads for consecutive games, keyed by game id"""
+    games = {}
+    game_id = first_game_id
+    remaining = count
+    while remaining:
+        state = GameState()
+        moves = []
+        skipped = []
+        while len(moves) < min(moves_per_game, remaining) and state.winner() is None:
+            dice = random.randint(1, 6)
+            pieces = legal_moves(state, dice)
+            if not pieces:
+                skip_turn(state)
+                # A full round of skips leaves the turn where it started
+                skipped = skipped + [dice] if len(skipped) < len(SEATS) - 1 else []
+                continue
+            piece = random.choice(pieces)
+            moves.append({
+                "dice_roll": dice,
+                "piece_id": piece + 1,
+                "seat": state.turn,
+                "skipped_rolls": skipped,
+                "player_id": player_id,
+                "game_id": game_id,
+            })
+            skipped = []
+            apply_move(state, piece, dice)
+        games[game_id] = moves
+        remaining -= len(moves)
+        game_id += 1
+    return games
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--moves", type=int, default=5000)
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--moves-per-game", type=int, default=200)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+
+        from app import create_app, db
+        from app.models import Player, Game
+        from flask_jwt_extended import create_access_token
+
+        app = create_app({"RATELIMIT_ENABLED": False})
+
+        with app.app_context():
+            db.create_all()
+            db.session.add(Player(id=1, name="bench", password_hash="x"))
+            single_games = make_games(args.moves, 1, 1, args.moves_per_game)
+            batch_games = make_games(args.moves, 1, max(single_games) + 1, args.moves_per_game)
+            for game_id in list(single_games) + list(batch_games):
+                db.session.add(Game(id=game_id, status="ongoing"))
+            db.session.commit()
+            token = create_access_token(identity=1)
+
+        client = app.test_client()
+        headers = {"Authorization": f"Bearer {token}"}
+
+        start = time.perf_counter()
+        for moves in single_games.values():
+            for move in moves:
+                resp = client.post("/api/moves", json=move, headers=headers)
+                assert resp.status_code == 201, resp.json
+        single = args.moves / (time.perf_counter() - start)
+
+        start = time.perf_counter()
+        for game_id, moves in batch_games.items():
+            for i in range(0, len(moves), args.batch_size):
+                resp = client.post(f"/api/games/{game_id}/moves:batch",
+                                   json=moves[i:i + args.batch_size], headers=headers)
+                assert resp.status_code == 201, resp.json
+        batched = args.moves / (time.perf_counter() - start)
+
+        print(f"single   {single:>10.0f} moves/sec")
+        print(f"batched  {batched:>10.0f} moves/sec  (batch size {args.batch_size}, {batched / single:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
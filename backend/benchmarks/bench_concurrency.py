@@ -0,0 +1,135 @@
+"""Mixed read/write throughput under concurrent clients.
+
+Starts a threaded server on a throwaway SQLite database and runs
+--threads clients for --duration seconds. Each client plays its own
+games through POST /api/moves and, --read-ratio of the time, reads
+GET /api/games/<id>/state or GET /api/moves?game_id= instead.
+
+Runs twice on fresh databases: "before" with the old engine setup (no
+pool options, no pragmas, a single engine) and "after" with the default
+configuration (WAL, reader/writer engines). Reports throughput, p50/p99
+latency for reads and writes, and failed requests.
+
+Usage:
+    python benchmarks/bench_concurrency.py [--threads 16] [--duration 10] [--read-ratio 0.8]
+"""
+import argparse
+import json
+import logging
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_batch_moves import make_games  # noqa: E402
+
+BEFORE = {"SQLALCHEMY_ENGINE_OPTIONS": {}, "SQLALCHEMY_BINDS": {}, "SQLITE_TUNING": False}
+MOVES_PER_THREAD = 5000
+
+
+def request(url, body=None, headers=None):
+    data = json.dumps(body).encode() if body is not None else None
+    req = urllib.request.Request(url, data=data, headers={"Content-Type": "application/json", **(headers or {})})
+    try:
+        with urllib.request.urlopen(req) as resp:
+            resp.read()
+            return resp.status
+    except urllib.error.HTTPError as err:
+        return err.code
+
+
+def percentile(samples, pct):
+    if not samples:
+        return float("nan")
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * pct / 100))]
+
+
+def run_phase(name, config, args):
+    from werkzeug.serving import make_server
+    from app import create_app, db
+    from app.models import Player, Game
+    from flask_jwt_extended import create_access_token
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        # Measures the database, not the per-player move limit
+        app = create_app({**(config or {}), "RATELIMIT_ENABLED": False})
+
+        random.seed(1)
+        plans = []
+        with app.app_context():
+            db.create_all()
+            db.session.add(Player(id=1, name="bench", password_hash="x"))
+            next_game = 1
+            for _ in range(args.threads):
+                games = make_games(MOVES_PER_THREAD, 1, next_game, 200)
+                next_game = max(games) + 1
+                plans.append([move for moves in games.values() for move in moves])
+                db.session.add_all(Game(id=game_id, status="ongoing") for game_id in games)
+            db.session.commit()
+            headers = {"Authorization": f"Bearer {create_access_token(identity=1)}"}
+
+        server = make_server("127.0.0.1", 0, app, threaded=True)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        base_url = f"http://127.0.0.1:{server.server_port}"
+
+        stop = time.perf_counter() + args.duration
+        reads, writes, failures = [], [], []
+
+        def client(moves):
+            rng = random.Random(len(moves))
+            played = 0
+            while time.perf_counter() < stop and played < len(moves):
+                game_id = moves[played]["game_id"]
+                start = time.perf_counter()
+                if rng.random() < args.read_ratio:
+                    path = rng.choice((f"/api/games/{game_id}/state", f"/api/moves?game_id={game_id}&limit=50"))
+                    status = request(base_url + path)
+                    reads.append(time.perf_counter() - start)
+                else:
+                    status = request(f"{base_url}/api/moves", moves[played], headers)
+                    writes.append(time.perf_counter() - start)
+                    played += 1
+                if status >= 400:
+                    failures.append(status)
+
+        threads = [threading.Thread(target=client, args=(moves,)) for moves in plans]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        server.shutdown()
+        with app.app_context():
+            db.session.remove()
+            for engine in db.engines.values():
+                engine.dispose()
+
+    total = len(reads) + len(writes)
+    print(f"{name:>7} {total / elapsed:>8.0f} {percentile(reads, 50) * 1000:>9.1f} {percentile(reads, 99) * 1000:>9.1f}"
+          f" {percentile(writes, 50) * 1000:>9.1f} {percentile(writes, 99) * 1000:>9.1f} {len(failures):>7}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--read-ratio", type=float, default=0.8)
+    args = parser.parse_args()
+
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)
+    print(f"{'engine':>7} {'req/s':>8} {'read p50':>9} {'read p99':>9} {'write p50':>9} {'write p99':>9} {'failed':>7}")
+    run_phase("before", BEFORE, args)
+    run_phase("after", None, args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+"""Measure optimistic concurrency on POST /api/moves under contention.
+
+Writer threads each play as their own player through the test client,
+against a throwaway SQLite database. A writer reads the board and its
+version (GET /api/games/<id>/state), picks a legal move, and posts it
+with that version in If-Match; on 409 it rereads and tries again.
+Two runs:
+- every writer on one game, so most attempts race for the same turn;
+- one game per writer, so writers only share the database lock.
+Each reports committed moves/sec, conflicts per committed move and
+latency, then checks no move was lost or applied twice: every game's
+turn_seq and move count equal the moves its writers saw accepted, and
+its version went up once per accepted move.
+
+Usage:
+    python benchmarks/bench_contention.py [--writers 16] [--moves 2000]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def pick_move(board, rng):
+    """(seat, piece_id, dice, skipped_rolls) legal on `board` from GET /state, or None once it is won"""
+    from app.engine import GameState, SEATS
+    from app.simulation import play, random_strategy
+
+    tokens = [position for seat in SEATS for position in board["tokens"][seat]]
+    state = GameState(tokens, SEATS.index(board["turn"]))
+    for seat, piece, dice, _, skipped in play(state, [random_strategy] * len(SEATS), rng, 1):
+        return seat, piece + 1, dice, list(skipped)
+    return None
+
+
+class Writer(threading.Thread):
+    def __init__(self, app, game_id, player_id, headers, budget, seed):
+        super().__init__()
+        self.client = app.test_client()
+        self.game_id = game_id
+        self.player_id = player_id
+        self.headers = headers
+        self.budget = budget
+        self.rng = random.Random(seed)
+        self.accepted = 0
+        self.conflicts = 0
+        self.versions = []
+        self.latencies = []
+
+    def run(self):
+        while self.budget.take():
+            while True:
+                board = self.client.get(f"/api/games/{self.game_id}/state").get_json()
+                move = pick_move(board, self.rng)
+                if move is None:
+                    return
+                seat, piece_id, dice, skipped = move
+                start = time.perf_counter()
+                response = self.client.post("/api/moves", headers=dict(self.headers, **{"If-Match": f'"{board["version"]}"'}),
+                                            json={"game_id": self.game_id, "player_id": self.player_id,
+                                                  "seat": seat, "piece_id": piece_id, "dice_roll": dice,
+                                                  "skipped_rolls": skipped})
+                self.latencies.append((time.perf_counter() - start) * 1000)
+                if response.status_code == 201:
+                    self.accepted += 1
+                    self.versions.append(int(response.headers["ETag"].strip('"')))
+                    break
+                assert response.status_code == 409, (response.status_code, response.get_json())
+                self.conflicts += 1
+
+
+class Budget:
+    """Moves left to play across all writers"""
+
+    def __init__(self, moves):
+        self._left = moves
+        self._lock = threading.Lock()
+
+    def take(self):
+        with self._lock:
+            if self._left <= 0:
+                return False
+            self._left -= 1
+            return True
+
+
+def run(label, app, games, players, moves):
+    from app import db
+    from app.models import Game, Move, GameBoard
+
+    budget = Budget(moves)
+    writers = [Writer(app, games[index % len(games)], player_id, headers, budget, index)
+               for index, (player_id, headers) in enumerate(players)]
+    start = time.perf_counter()
+    for writer in writers:
+        writer.start()
+    for writer in writers:
+        writer.join()
+    elapsed = time.perf_counter() - start
+
+    accepted = sum(writer.accepted for writer in writers)
+    conflicts = sum(writer.conflicts for writer in writers)
+    latencies = sorted(ms for writer in writers for ms in writer.latencies)
+    p50, p99 = (latencies[min(len(latencies) - 1, int(len(latencies) * q))] for q in (0.5, 0.99))
+    print(f"{label:<28} {accepted / elapsed:>8.0f} moves/sec  {conflicts / max(accepted, 1):>6.2f} conflicts/move  "
+          f"POST p50 {p50:.1f} ms  p99 {p99:.1f} ms")
+
+    with app.app_context():
+        for game_id in games:
+            mine = [writer for writer in writers if writer.game_id == game_id]
+            expected = sum(writer.accepted for writer in mine)
+            game = db.session.get(Game, game_id)
+            count = db.session.query(db.func.count(Move.id)).filter(Move.game_id == game_id).scalar()
+            board = db.session.get(GameBoard, game_id)
+            assert game.turn_seq == count == board.move_count == expected, (game_id, game.turn_seq, count, expected)
+            versions = sorted(version for writer in mine for version in writer.versions)
+            assert versions == list(range(2, expected + 2)), "a version was handed out twice or skipped"
+            assert game.version == expected + 1
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--writers", type=int, default=16)
+    parser.add_argument("--moves", type=int, default=2000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        from app import create_app, db
+        from app.models import Player, Game, GameBoard
+        from app.engine import GameState
+        from flask_jwt_extended import create_access_token
+
+        app = create_app({"RATELIMIT_ENABLED": False})
+        with app.app_context():
+            db.create_all()
+            db.session.execute(db.insert(Player), [{"id": i, "name": f"p{i}", "password_hash": "x"}
+                                                   for i in range(1, args.writers + 1)])
+            games = args.writers + 1
+            db.session.execute(db.insert(Game), [{"id": i, "status": "ongoing"} for i in range(1, games + 1)])
+            db.session.execute(db.insert(GameBoard), [{"game_id": i, "state": GameState().to_bytes(), "move_count": 0}
+                                                      for i in range(1, games + 1)])
+            db.session.commit()
+            players = [(i, {"Authorization": f"Bearer {create_access_token(identity=i)}"})
+                       for i in range(1, args.writers + 1)]
+
+        # A game ends when every seat is home, so a few thousand moves fit in one game
+        run(f"{args.writers} writers, one game", app, [1], players, args.moves)
+        run(f"{args.writers} writers, own games", app, list(range(2, games + 1)), players, args.moves)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""Micro-benchmark for the Ludo engine's apply_move.
+
+Plays random games to record a trace of legal moves, then times replaying
+that trace through apply_move on fresh states, --repeat times. Reports the
+best and median runs against the target of >= 1M moves/sec; the best run
+is the least disturbed by whatever else the machine is doing.
+
+Usage:
+    python benchmarks/bench_engine.py [--moves 1000000] [--repeat 5]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.engine import GameState, legal_moves, apply_move, skip_turn  # noqa: E402
+
+TARGET = 1_000_000
+
+
+def record_games(total_moves, rng):
+    """Return a list of games, each a list of (seat, piece, dice) moves"""
+    games = []
+    recorded = 0
+    while recorded < total_moves:
+        state = GameState()
+        trace = []
+        while state.winner() is None and recorded < total_moves:
+            dice = rng.randint(1, 6)
+            pieces = legal_moves(state, dice)
+            if not pieces:
+                skip_turn(state)
+                continue
+            piece = rng.choice(pieces)
+            trace.append((state.turn, piece, dice))
+            apply_move(state, piece, dice)
+            recorded += 1
+        games.append(trace)
+    return games
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--moves", type=int, default=1_000_000)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    games = record_games(args.moves, random.Random(args.seed))
+
+    rates = []
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        for trace in games:
+            state = GameState()
+            for seat, piece, dice in trace:
+                state.turn = seat
+                apply_move(state, piece, dice)
+        rates.append(args.moves / (time.perf_counter() - start))
+
+    rates.sort()
+    best, median = rates[-1], rates[len(rates) // 2]
+    print(f"{args.moves} moves over {len(games)} games, {args.repeat} runs: "
+          f"best {best:,.0f} moves/sec, median {median:,.0f}  "
+          f"{'ok' if best >= TARGET else 'below target'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""Leaderboard ranking with 1M players.
+
+Builds a Ranking from random scores, then times rank lookups, top-K
+pages and score updates against the old approach of sorting every
+player on each request. Runs in memory; no database needed.
+
+Usage:
+    python benchmarks/bench_leaderboard.py [--players 1000000] [--ops 100000]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.leaderboard import Ranking
+
+
+def timed(label, ops, fn):
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<24} {elapsed:>8.3f}s {elapsed / ops * 1e6:>10.2f} us/op")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--players", type=int, default=1_000_000)
+    parser.add_argument("--ops", type=int, default=100_000)
+    parser.add_argument("--top", type=int, default=100)
+    args = parser.parse_args()
+
+    rng = random.Random(1)
+    rows = [(player_id, rng.randrange(10_000)) for player_id in range(1, args.players + 1)]
+    ids = [rng.randrange(1, args.players + 1) for _ in range(args.ops)]
+
+    start = time.perf_counter()
+    ranking = Ranking(rows)
+    print(f"{'build':<24} {time.perf_counter() - start:>8.3f}s  ({len(ranking)} players)")
+
+    timed("rank", args.ops, lambda: [ranking.rank(player_id) for player_id in ids])
+    # Pages cost O(log n + k), so fewer of them keep the run short
+    pages = ids[:args.ops // 10]
+    timed(f"top {args.top}", len(pages), lambda: [ranking.page(1, args.top) for _ in pages])
+    timed(f"around ({args.top})", len(pages),
+          lambda: [ranking.page(ranking.rank(player_id) - args.top // 2, args.top) for player_id in pages])
+    timed("update", args.ops,
+          lambda: [ranking.set_score(player_id, rng.randrange(10_000)) for player_id in ids])
+
+    # Baseline: what GET /api/players + a client-side sort costs per request
+    sorts = 3
+    timed(f"full sort (top {args.top})", sorts,
+          lambda: [sorted(rows, key=lambda row: (-row[1], row[0]))[:args.top] for _ in range(sorts)])
+
+    expected = sorted(rows, key=lambda row: (-row[1], row[0]))[:args.top]
+    fresh = Ranking(rows).page(1, args.top)
+    assert [(player_id, score) for _, player_id, score in fresh] == expected, "ranking order mismatch"
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""Game-route latency while a login storm is running.
+
+Starts a threaded server on a throwaway SQLite database, then for each
+password-hashing mode runs --storm threads that log in as fast as they
+can while one probe thread times GET /api/games. Reports probe p50/p99
+and how many logins succeeded or were shed with 503.
+
+Modes: "idle" (no storm), "inline" (bcrypt on the request thread, the
+old behaviour) and "process" (bounded process pool).
+
+Usage:
+    python benchmarks/bench_login_storm.py [--storm 32] [--duration 10] [--rounds 12]
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+PASSWORD = "StormPassw0rd"
+
+
+def post_json(url, body):
+    req = urllib.request.Request(
+        url, data=json.dumps(body).encode(), method="POST",
+        headers={"Content-Type": "application/json"})
+    try:
+        with urllib.request.urlopen(req) as resp:
+            return resp.status
+    except urllib.error.HTTPError as err:
+        return err.code
+
+
+def percentile(samples, pct):
+    if not samples:
+        return float("nan")
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * pct / 100))]
+
+
+def run_phase(db_path, mode, args):
+    from werkzeug.serving import make_server
+    from app import create_app
+
+    os.environ["DATABASE_URL"] = f"sqlite:///{db_path}"
+    # One client storming login; measure the hashing pool, not the login rate limit
+    app = create_app({"RATELIMIT_ENABLED": False})
+    app.config["BCRYPT_ROUNDS"] = args.rounds
+    app.config["PASSWORD_HASH_EXECUTOR"] = "inline" if mode == "idle" else mode
+    # Inline mode keeps the old unbounded behaviour
+    if mode == "inline":
+        app.config["PASSWORD_HASH_QUEUE"] = args.storm
+
+    server = make_server("127.0.0.1", 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_port}"
+
+    stop = time.perf_counter() + args.duration
+    statuses = []
+    latencies = []
+
+    def storm():
+        while time.perf_counter() < stop:
+            statuses.append(post_json(f"{base_url}/api/auth/login", {"name": "storm", "password": PASSWORD}))
+
+    def probe():
+        while time.perf_counter() < stop:
+            start = time.perf_counter()
+            with urllib.request.urlopen(f"{base_url}/api/games?limit=10") as resp:
+                resp.read()
+            latencies.append(time.perf_counter() - start)
+            time.sleep(0.05)
+
+    threads = [threading.Thread(target=probe)]
+    if mode != "idle":
+        threads += [threading.Thread(target=storm) for _ in range(args.storm)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    server.shutdown()
+
+    ok = statuses.count(200)
+    shed = statuses.count(503)
+    print(f"{mode:>8} {percentile(latencies, 50) * 1000:>9.1f} {percentile(latencies, 99) * 1000:>9.1f}"
+          f" {ok:>8} {shed:>8}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--storm", type=int, default=32, help="concurrent login threads")
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--rounds", type=int, default=12)
+    args = parser.parse_args()
+
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "bench.db")
+        os.environ["DATABASE_URL"] = f"sqlite:///{db_path}"
+        from app import create_app, db
+        from app.models import Player, Game
+
+        app = create_app()
+        app.config["BCRYPT_ROUNDS"] = args.rounds
+        app.config["PASSWORD_HASH_EXECUTOR"] = "inline"
+        with app.app_context():
+            db.create_all()
+            player = Player(name="storm")
+            player.set_password(PASSWORD)
+            db.session.add(player)
+            db.session.add_all([Game(status="ongoing") for _ in range(10)])
+            db.session.commit()
+
+        print(f"{'mode':>8} {'p50 ms':>9} {'p99 ms':>9} {'logins':>8} {'shed':>8}")
+        for mode in ("idle", "inline", "process"):
+            run_phase(db_path, mode, args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""Simulate matchmaking with synthetic players and report joins per second.
+
+Seeds --players players with random scores into a throwaway SQLite
+database, then has them join in random order, each wanting a random
+2-4 seat game:
+- the bare queue (MatchQueue.push, no games written);
+- Matchmaker.join, writing a game each time a group fills;
+- POST /api/matchmaking/join through the test client.
+Every matched game is checked to hold distinct players from one score
+band, and GET /api/lobby is timed against --open-games waiting games.
+
+Usage:
+    python benchmarks/bench_matchmaking.py [--players 20000] [--open-games 5000]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def report(label, joins, elapsed):
+    print(f"{label:<32} {joins / elapsed:>10.0f} joins/sec")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--players", type=int, default=20000)
+    parser.add_argument("--open-games", type=int, default=5000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        from app import create_app, db, matchmaker, identity_cache
+        from app.matchmaking import MatchQueue
+        from app.models import Player, Game, GamePlayer
+        from flask_jwt_extended import create_access_token
+
+        app = create_app({"RATELIMIT_ENABLED": False})
+        band_width = app.config["MATCHMAKING_BAND_WIDTH"]
+        random.seed(1)
+        scores = {i: int(random.expovariate(1 / 150)) for i in range(1, args.players + 1)}
+        wants = {i: random.choice((2, 3, 4)) for i in scores}
+        order = list(scores)
+        random.shuffle(order)
+
+        with app.app_context():
+            db.create_all()
+            db.session.execute(db.insert(Player), [{"id": i, "name": f"p{i}", "password_hash": "x", "score": score}
+                                                   for i, score in scores.items()])
+            db.session.execute(db.insert(Game), [{"status": "waiting", "max_players": 4,
+                                                  "player_count": i % 4} for i in range(args.open_games)])
+            db.session.commit()
+
+            queue = MatchQueue(band_width)
+            start = time.perf_counter()
+            for player_id in order:
+                queue.push(player_id, scores[player_id], wants[player_id])
+            report("queue only", len(order), time.perf_counter() - start)
+
+            start = time.perf_counter()
+            matched = 0
+            for player_id in order:
+                if matchmaker.join(player_id, scores[player_id], wants[player_id])["status"] == "matched":
+                    matched += 1
+            report("Matchmaker.join + game writes", len(order), time.perf_counter() - start)
+            games = db.session.query(db.func.count(Game.id)).filter(Game.status == "ongoing").scalar()
+            print(f"{'':<32} {games} games, {len(matchmaker.queue)} players still queued")
+
+            # Every seated player is in one game, with others from their band
+            seats = db.session.query(GamePlayer.game_id, GamePlayer.player_id).all()
+            assert len({player_id for _, player_id in seats}) == len(seats)
+            bands = {}
+            for game_id, player_id in seats:
+                bands.setdefault(game_id, set()).add(scores[player_id] // band_width)
+            assert all(len(found) == 1 for found in bands.values())
+            assert len(seats) + len(matchmaker.queue) == len(order)
+
+            # Players join after logging in, so their identities are cached
+            for player_id in order:
+                matchmaker.leave(player_id)
+                identity_cache.get(player_id)
+            headers = {i: {"Authorization": f"Bearer {create_access_token(identity=i)}"} for i in order}
+
+        client = app.test_client()
+        start = time.perf_counter()
+        for player_id in order:
+            resp = client.post("/api/matchmaking/join", json={"seats": wants[player_id]}, headers=headers[player_id])
+            assert resp.status_code in (201, 202), resp.json
+        report("POST /api/matchmaking/join", len(order), time.perf_counter() - start)
+
+        start = time.perf_counter()
+        pages, cursor = 0, None
+        while True:
+            resp = client.get("/api/lobby?limit=100" + (f"&cursor={cursor}" if cursor else ""))
+            pages += 1
+            cursor = resp.json["next_cursor"]
+            if not cursor:
+                break
+        elapsed = time.perf_counter() - start
+        print(f"{'GET /api/lobby?limit=100':<32} {elapsed / pages * 1000:>10.2f} ms/page over {pages} pages")
+
+
+if __name__ == "__main__":
+    main()
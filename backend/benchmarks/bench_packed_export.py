@@ -0,0 +1,101 @@
+"""Compare move history downloads: JSON vs the packed binary format.
+
+Seeds --games games of --moves-per-game moves into a throwaway SQLite
+database and reports response size and latency for:
+- one game's history: GET /api/games/<id>/moves vs ?format=packed
+- every move: paging GET /api/moves?limit=1000 vs GET /api/export/moves
+Decoded packed streams are checked against the JSON rows.
+
+Usage:
+    python benchmarks/bench_packed_export.py [--games 500] [--moves-per-game 200]
+"""
+import argparse
+import io
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def timed(fn, repeat=5):
+    """(best seconds, result) over `repeat` runs"""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def row(label, seconds, size, moves):
+    print(f"{label:<34} {size / 1024:>10.1f} KiB {size / moves:>7.1f} B/move {seconds * 1000:>9.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--games", type=int, default=500)
+    parser.add_argument("--moves-per-game", type=int, default=200)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        from app import create_app, db
+        from app.models import Player, Game, Move
+        from app.packed import read_packed
+
+        app = create_app({"RATELIMIT_ENABLED": False})
+        random.seed(1)
+        with app.app_context():
+            db.create_all()
+            db.session.execute(db.insert(Player), [{"id": i, "name": f"p{i}", "password_hash": "x"}
+                                                   for i in range(1, 5)])
+            db.session.execute(db.insert(Game), [{"id": i, "status": "finished"}
+                                                 for i in range(1, args.games + 1)])
+            db.session.execute(db.insert(Move), [
+                {"game_id": game_id, "player_id": seat + 1, "seat": seat, "dice_roll": random.randint(1, 6),
+                 "piece_id": random.randint(1, 4), "position": random.randint(0, 57)}
+                for game_id in range(1, args.games + 1)
+                for seat in (i % 4 for i in range(args.moves_per_game))])
+            db.session.commit()
+
+        client = app.test_client()
+        total = args.games * args.moves_per_game
+        print(f"{'':<34} {'size':>14} {'':>14} {'latency':>12}")
+
+        # One game; the JSON route is cached, so time it uncached
+        game_url = f"/api/games/{args.games // 2}/moves"
+        app.extensions["response_cache"].ttl = 0
+        seconds, body = timed(lambda: client.get(game_url).get_data())
+        row("game history, JSON", seconds, len(body), args.moves_per_game)
+        json_moves = client.get(game_url).json
+        seconds, packed = timed(lambda: client.get(game_url + "?format=packed").get_data())
+        row("game history, packed", seconds, len(packed), args.moves_per_game)
+        assert list(read_packed(io.BytesIO(packed))) == json_moves
+
+        def page_all():
+            size, cursor = 0, None
+            while True:
+                resp = client.get("/api/moves?limit=1000" + (f"&cursor={cursor}" if cursor else ""))
+                size += len(resp.get_data())
+                cursor = resp.json["next_cursor"]
+                if not cursor:
+                    return size
+
+        seconds, size = timed(page_all, repeat=1)
+        row("all moves, paged JSON", seconds, size, total)
+
+        def export():
+            with client.get("/api/export/moves") as resp:
+                return b"".join(resp.response)
+
+        seconds, packed = timed(export, repeat=1)
+        row("all moves, /api/export/moves", seconds, len(packed), total)
+        assert sum(1 for _ in read_packed(io.BytesIO(packed))) == total
+
+
+if __name__ == "__main__":
+    main()
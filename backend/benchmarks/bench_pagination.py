@@ -0,0 +1,99 @@
+"""Benchmark keyset pagination on a large moves table.
+
+Builds a throwaway SQLite database with N moves (default 1M) and times
+GET /api/moves pages taken from the start, middle and end of the table,
+plus the raw keyset and OFFSET queries. Keyset pages should cost the
+same at every depth; OFFSET grows linearly with depth.
+
+Usage:
+    python benchmarks/bench_pagination.py [--rows 1000000] [--limit 100]
+"""
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+INSERT_MOVE = ("INSERT INTO moves (id, dice_roll, piece_id, position, player_id, game_id) "
+               "VALUES (?, ?, ?, ?, ?, ?)")
+
+
+def build_db(path, rows):
+    from app import create_app, db
+
+    os.environ["DATABASE_URL"] = f"sqlite:///{path}"
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+
+    conn = sqlite3.connect(path)
+    conn.execute("INSERT INTO players (id, name, password_hash, score) VALUES (1, 'bench', 'x', 0)")
+    conn.executemany(
+        "INSERT INTO games (id, status) VALUES (?, 'ongoing')",
+        [(i,) for i in range(1, 1001)],
+    )
+    batch = []
+    for i in range(1, rows + 1):
+        batch.append((i, random.randint(1, 6), random.randint(1, 4), random.randint(0, 57), 1, random.randint(1, 1000)))
+        if len(batch) == 50000:
+            conn.executemany(INSERT_MOVE, batch)
+            batch = []
+    if batch:
+        conn.executemany(INSERT_MOVE, batch)
+    conn.commit()
+    conn.close()
+    return app
+
+
+def time_call(fn, repeat=20):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return samples[len(samples) // 2]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--limit", type=int, default=100)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        print(f"Building {args.rows} moves...")
+        app = build_db(path, args.rows)
+        client = app.test_client()
+        conn = sqlite3.connect(path)
+
+        print(f"{'depth':>10} {'http ms':>10} {'keyset ms':>10} {'offset ms':>10}")
+        for depth in (0, args.rows // 2, args.rows - args.limit):
+            url = f"/api/moves?limit={args.limit}" + (f"&cursor={depth}" if depth else "")
+
+            def http():
+                resp = client.get(url)
+                assert resp.status_code == 200
+
+            def keyset():
+                conn.execute(
+                    "SELECT * FROM moves WHERE id > ? ORDER BY id LIMIT ?", (depth, args.limit)
+                ).fetchall()
+
+            def offset():
+                conn.execute(
+                    "SELECT * FROM moves ORDER BY id LIMIT ? OFFSET ?", (args.limit, depth)
+                ).fetchall()
+
+            print(f"{depth:>10} {time_call(http):>10.2f} {time_call(keyset):>10.2f} {time_call(offset):>10.2f}")
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
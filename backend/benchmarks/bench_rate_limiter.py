@@ -0,0 +1,73 @@
+"""Micro-benchmark: what the rate limiter costs per request.
+
+Times TokenBuckets.hit() for one hot key and for --clients distinct
+keys, then the full @rate_limiter.limit wrapper (config lookup, key,
+bucket, concurrency slot) around a no-op view against the bare view,
+both inside a request context.
+
+Usage:
+    python benchmarks/bench_rate_limiter.py [--ops 200000] [--clients 10000]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.ratelimit import TokenBuckets, parse_rate  # noqa: E402
+
+
+def per_op(fn, ops):
+    start = time.perf_counter()
+    fn(ops)
+    return (time.perf_counter() - start) / ops * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--ops", type=int, default=200000)
+    parser.add_argument("--clients", type=int, default=10000)
+    args = parser.parse_args()
+
+    capacity, rate = parse_rate("1000000/second")
+    buckets = TokenBuckets()
+
+    def hot(ops):
+        for _ in range(ops):
+            buckets.hit("moves:player:1", capacity, rate)
+
+    keys = [f"moves:ip:10.0.{i // 256}.{i % 256}" for i in range(args.clients)]
+
+    def spread(ops):
+        for i in range(ops):
+            buckets.hit(keys[i % len(keys)], capacity, rate)
+
+    print(f"{'hit(), one key':<32} {per_op(hot, args.ops):>7.2f} us/op")
+    print(f"{f'hit(), {args.clients} keys':<32} {per_op(spread, args.ops):>7.2f} us/op")
+
+    os.environ.setdefault("DATABASE_URL", "sqlite://")
+    from app import create_app, rate_limiter
+
+    app = create_app({"RATE_LIMITS": {"bench": "1000000/second"}, "CONCURRENCY_LIMITS": {"bench": 64}})
+
+    def view():
+        return None
+
+    limited = rate_limiter.limit("bench")(view)
+
+    with app.test_request_context("/", environ_base={"REMOTE_ADDR": "10.0.0.1"}):
+        def bare(ops):
+            for _ in range(ops):
+                view()
+
+        def wrapped(ops):
+            for _ in range(ops):
+                limited()
+
+        baseline = per_op(bare, args.ops)
+        print(f"{'@rate_limiter.limit overhead':<32} {per_op(wrapped, args.ops) - baseline:>7.2f} us/request")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""Benchmark list serialization: Marshmallow vs the column/row fast path.
+
+Serializes the same N moves (default 100k) with
+`jsonify(moves_schema.dump(Move.query...all()))` and with the fast path
+used by the list endpoints, checks that both produce identical bytes,
+and reports the time for each.
+
+Usage:
+    python benchmarks/bench_serialization.py [--rows 100000]
+"""
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        os.environ["DATABASE_URL"] = f"sqlite:///{path}"
+
+        from flask import jsonify
+        from app import create_app, db
+        from app.models import Move
+        from app.schemas import moves_schema
+        from app.serialization import column_query, rows_as_dicts, json_response, orjson
+
+        app = create_app()
+        with app.app_context():
+            db.create_all()
+        conn = sqlite3.connect(path)
+        conn.execute("INSERT INTO players (id, name, password_hash, score) VALUES (1, 'bench', 'x', 0)")
+        conn.execute("INSERT INTO games (id, status) VALUES (1, 'ongoing')")
+        conn.executemany(
+            "INSERT INTO moves (dice_roll, piece_id, position, seat, player_id, game_id) "
+            "VALUES (?, ?, ?, ?, 1, 1)",
+            [(random.randint(1, 6), random.randint(1, 4), random.randint(0, 57), random.randint(0, 3))
+             for _ in range(args.rows)])
+        conn.commit()
+        conn.close()
+
+        def marshmallow():
+            moves = Move.query.order_by(Move.id).all()
+            body = jsonify(moves_schema.dump(moves)).get_data()
+            db.session.remove()
+            return body
+
+        def fast():
+            names, query = column_query(moves_schema)
+            body = json_response(rows_as_dicts(names, query.order_by(Move.id).all())).get_data()
+            db.session.remove()
+            return body
+
+        with app.test_request_context():
+            assert marshmallow() == fast(), "fast path output differs from Marshmallow"
+            print(f"{args.rows} moves, encoder: {'orjson' if orjson else 'json'}")
+            for name, fn in (("marshmallow", marshmallow), ("fast path", fast)):
+                best = float("inf")
+                for _ in range(args.repeat):
+                    start = time.perf_counter()
+                    fn()
+                    best = min(best, time.perf_counter() - start)
+                print(f"{name:>12} {best * 1000:>9.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""Startup time of the app factory and the production server.
+
+Measures, over --repeat runs each:
+- import + create_app() in a fresh interpreter
+- time until `serve.py --workers N` answers with every worker forked,
+  with the app preloaded in the master and without
+
+Usage:
+    python benchmarks/bench_startup.py [--workers 4] [--repeat 5]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from smoke_multiworker import BACKEND, free_port, wait_ready, worker_pids  # noqa: E402
+
+FACTORY = "import time; start = time.perf_counter(); from app import create_app; create_app(); " \
+          "print(time.perf_counter() - start)"
+
+
+def time_factory(env):
+    out = subprocess.run([sys.executable, "-c", FACTORY], cwd=BACKEND, env=env,
+                         capture_output=True, text=True, check=True).stdout
+    return float(out.split()[-1])
+
+
+def time_server(env, workers, preload):
+    base_url = f"http://127.0.0.1:{free_port()}"
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, os.path.join(BACKEND, "serve.py"), "--workers", str(workers),
+         "--bind", base_url.split("//")[1]],
+        env=dict(env, GUNICORN_PRELOAD="1" if preload else "0"),
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        if not wait_ready(base_url):
+            raise RuntimeError("server did not come up")
+        first = time.perf_counter() - started
+        while len(worker_pids(server.pid)) < workers:
+            time.sleep(0.01)
+        return first, time.perf_counter() - started
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ, DATABASE_URL=f"sqlite:///{os.path.join(tmp, 'startup.db')}",
+                   GUNICORN_ACCESS_LOG="/dev/null")
+        os.environ.update(env)
+        from app import create_app, db
+        with create_app().app_context():
+            db.create_all()
+
+        factory = [time_factory(env) for _ in range(args.repeat)]
+        print(f"{'create_app()':<24} {statistics.median(factory) * 1000:>8.0f} ms")
+        for preload in (True, False):
+            runs = [time_server(env, args.workers, preload) for _ in range(args.repeat)]
+            label = f"serve.py -w {args.workers}" + (" (preload)" if preload else "")
+            print(f"{label:<24} {statistics.median(run[0] for run in runs) * 1000:>8.0f} ms to first response, "
+                  f"{statistics.median(run[1] for run in runs) * 1000:.0f} ms to all workers")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""Time the /api/stats endpoints over a large moves table.
+
+Seeds --moves moves of random-bot games (app.simulation.play) among
+--players players into a throwaway SQLite database, with their final
+boards stored and most games finished, then reports:
+- the first read, which folds the whole table into MoveTotals;
+- a read after --new-moves more moves, which folds only those;
+- the endpoints' latency once the totals are current;
+- a GROUP BY over the moves table, for comparison with the dice counts.
+The totals are checked against counts kept while seeding.
+
+Usage:
+    python benchmarks/bench_stats.py [--moves 10000000] [--players 1000] [--new-moves 10000]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def seed_games(app, moves, players, rng, first_game, first_move, finish):
+    """Insert random-bot games until `moves` moves are written; returns expected totals"""
+    from app import db
+    from app.engine import GameState, SEATS
+    from app.models import Game, GameBoard
+    from app.simulation import play, random_strategy
+
+    strategies = [random_strategy] * len(SEATS)
+    dice = [0] * 7
+    game_id, move_id = first_game, first_move
+    with app.app_context():
+        connection = db.session.connection().connection.driver_connection
+        batch = []
+        while move_id - first_move < moves:
+            state = GameState()
+            seated = rng.sample(range(1, players + 1), len(SEATS))
+            for seat, piece, roll, position, _ in play(state, strategies, rng):
+                batch.append((move_id, game_id, seated[seat], seat, piece + 1, roll, position))
+                dice[roll] += 1
+                move_id += 1
+            db.session.execute(db.insert(Game).values(id=game_id, status="finished" if finish else "ongoing"))
+            db.session.execute(db.insert(GameBoard).values(game_id=game_id, state=state.to_bytes(), move_count=0))
+            game_id += 1
+            if len(batch) >= 100000 or move_id - first_move >= moves:
+                connection.executemany(
+                    "INSERT INTO moves (id, game_id, player_id, seat, piece_id, dice_roll, position) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)", batch)
+                batch = []
+        db.session.commit()
+    return game_id, move_id, dice
+
+
+def timed(label, function, repeat=1):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = function()
+    elapsed = (time.perf_counter() - start) / repeat
+    print(f"{label:<44} {elapsed * 1000:>10.1f} ms")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--moves", type=int, default=10000000)
+    parser.add_argument("--players", type=int, default=1000)
+    parser.add_argument("--new-moves", type=int, default=10000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        from app import create_app, db, stats
+        from app.models import Player, Move
+
+        app = create_app({"RATELIMIT_ENABLED": False})
+        rng = random.Random(1)
+        with app.app_context():
+            db.create_all()
+            db.session.execute(db.insert(Player), [{"id": i, "name": f"p{i}", "password_hash": "x"}
+                                                   for i in range(1, args.players + 1)])
+            db.session.commit()
+
+        start = time.perf_counter()
+        next_game, next_move, dice = seed_games(app, args.moves, args.players, rng, 1, 1, True)
+        print(f"seeded {next_move - 1} moves in {next_game - 1} games in {time.perf_counter() - start:.0f}s")
+
+        client = app.test_client()
+        with app.app_context():
+            totals = timed("first read (fold every move)", lambda: stats.totals)
+            assert totals.moves == next_move - 1
+            assert totals.dice.sum(axis=0).tolist() == dice
+            summary = stats.games()
+            assert summary["games"]["finished"] == next_game - 1
+            assert sum(seat["wins"] for seat in summary["wins_by_seat"].values()) == next_game - 1
+            print(f"{'':<44} {summary['captures']['total']} captures, "
+                  f"median game {summary['length']['all']['median']:.0f} moves")
+
+        # New games arrive; only their moves are read and replayed
+        next_game, last_move, new_dice = seed_games(app, args.new_moves, args.players, rng,
+                                                    next_game, next_move, False)
+        with app.app_context():
+            totals = timed(f"read after {last_move - next_move} new moves", lambda: stats.totals)
+            assert totals.moves == last_move - 1
+            assert totals.dice.sum(axis=0).tolist() == [a + b for a, b in zip(dice, new_dice)]
+
+            timed("stats.player (totals current)", lambda: stats.player(1), repeat=20)
+            timed("stats.games (totals current)", stats.games, repeat=20)
+            timed("GROUP BY player_id, dice_roll over moves",
+                  lambda: db.session.query(Move.player_id, Move.dice_roll, db.func.count())
+                  .group_by(Move.player_id, Move.dice_roll).all())
+
+        timed("GET /api/stats/players/1", lambda: client.get("/api/stats/players/1"), repeat=200)
+        timed("GET /api/stats/games", lambda: client.get("/api/stats/games"), repeat=200)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""Benchmark username availability checks against a 10k checks/sec target.
+
+Seeds --players names into a throwaway SQLite database, then answers
+--checks lookups (half taken, half free) four ways: the old per-check
+query, the in-memory name index, POST /api/auth/check-username, and
+POST /api/auth/check-username/batch with 100 names per request.
+
+Usage:
+    python benchmarks/bench_usernames.py [--players 100000] [--checks 20000]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+TARGET = 10000
+
+
+def report(label, checks, elapsed):
+    rate = checks / elapsed
+    print(f"{label:<28} {rate:>10.0f} checks/sec  {'ok' if rate >= TARGET else 'below target'}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--players", type=int, default=100000)
+    parser.add_argument("--checks", type=int, default=20000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        from app import create_app, db, usernames
+        from app.models import Player
+
+        app = create_app({"RATELIMIT_ENABLED": False})
+        random.seed(1)
+        with app.app_context():
+            db.create_all()
+            db.session.execute(db.insert(Player), [{"name": f"player{i}", "password_hash": "x"}
+                                                   for i in range(args.players)])
+            db.session.commit()
+
+            names = [f"player{random.randrange(args.players)}" if i % 2 else f"newcomer{i}"
+                     for i in range(args.checks)]
+
+            start = time.perf_counter()
+            for name in names:
+                Player.query.filter_by(name=name).first()
+            report("query per check", len(names), time.perf_counter() - start)
+
+            start = time.perf_counter()
+            usernames.index
+            load = time.perf_counter() - start
+            print(f"{'index load':<28} {load * 1000:>10.0f} ms for {args.players} names")
+
+            start = time.perf_counter()
+            for name in names:
+                usernames.check(name)
+            report("name index", len(names), time.perf_counter() - start)
+
+        client = app.test_client()
+        start = time.perf_counter()
+        for name in names:
+            resp = client.post("/api/auth/check-username", json={"name": name})
+            assert resp.status_code == 200, resp.json
+        report("POST check-username", len(names), time.perf_counter() - start)
+
+        start = time.perf_counter()
+        for i in range(0, len(names), 100):
+            resp = client.post("/api/auth/check-username/batch", json={"names": names[i:i + 100]})
+            assert resp.status_code == 200, resp.json
+        report("POST check-username/batch", len(names), time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    main()
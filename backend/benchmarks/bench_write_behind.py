@@ -0,0 +1,161 @@
+"""Compare sustained POST /api/moves throughput with and without write-behind.
+
+Writer threads each play their own game through the test client against
+a throwaway SQLite database, keeping the board locally so every request
+is a move (no state reads in between). The same load runs twice:
+- synchronous: each move is committed before it is acknowledged;
+- MOVE_WRITE_BEHIND: each move is acknowledged once journaled and
+  committed later in batches.
+Reports moves/sec and POST latency for each, and for write-behind the
+commit latency (acknowledged to committed), batch sizes, journal fsyncs
+and the time to drain the queue after the last move. Both runs are then
+checked: every game's moves, board and turn_seq in the database match
+what its writer played.
+
+Usage:
+    python benchmarks/bench_write_behind.py [--writers 16] [--moves 4000] [--batch-size 1000]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class Writer(threading.Thread):
+    def __init__(self, app, game_id, player_id, headers, moves, seed):
+        from app.engine import GameState
+
+        super().__init__()
+        self.client = app.test_client()
+        self.game_id = game_id
+        self.player_id = player_id
+        self.headers = headers
+        self.moves = moves
+        self.rng = random.Random(seed)
+        self.state = GameState()
+        self.played = 0
+        self.latencies = []
+
+    def next_move(self):
+        from app.engine import SEATS
+        from app.simulation import play, random_strategy
+
+        for seat, piece, dice, _, skipped in play(self.state, [random_strategy] * len(SEATS), self.rng, 1):
+            return seat, piece + 1, dice, list(skipped)
+        return None
+
+    def run(self):
+        for _ in range(self.moves):
+            move = self.next_move()
+            if move is None:
+                return
+            seat, piece_id, dice, skipped = move
+            start = time.perf_counter()
+            response = self.client.post("/api/moves", headers=self.headers, json={
+                "game_id": self.game_id, "player_id": self.player_id,
+                "seat": seat, "piece_id": piece_id, "dice_roll": dice, "skipped_rolls": skipped})
+            self.latencies.append((time.perf_counter() - start) * 1000)
+            assert response.status_code == 201, (response.status_code, response.get_json())
+            self.played += 1
+
+
+def histogram(metric):
+    """(count, mean, p50 bucket, p99 bucket) read off a rendered histogram"""
+    buckets, count, total = [], 0, 0.0
+    for line in metric.render():
+        name, _, value = line.rpartition(" ")
+        if name.startswith(f"{metric.name}_bucket"):
+            buckets.append((name.split('le="')[1].rstrip('"}'), int(value)))
+        elif name.startswith(f"{metric.name}_sum"):
+            total = float(value)
+        elif name.startswith(f"{metric.name}_count"):
+            count = int(value)
+    if not count:
+        return 0, 0.0, "-", "-"
+    p50, p99 = (next(bound for bound, cumulative in buckets if cumulative >= count * q) for q in (0.5, 0.99))
+    return count, total / count, p50, p99
+
+
+def run(label, app, games, players, moves):
+    from app import db, write_behind
+    from app.models import Game, Move, GameBoard
+
+    per_writer = moves // len(players)
+    writers = [Writer(app, game_id, player_id, headers, per_writer, game_id)
+               for game_id, (player_id, headers) in zip(games, players)]
+    start = time.perf_counter()
+    for writer in writers:
+        writer.start()
+    for writer in writers:
+        writer.join()
+    elapsed = time.perf_counter() - start
+
+    played = sum(writer.played for writer in writers)
+    latencies = sorted(ms for writer in writers for ms in writer.latencies)
+    p50, p99 = (latencies[min(len(latencies) - 1, int(len(latencies) * q))] for q in (0.5, 0.99))
+    print(f"{label:<22} {played / elapsed:>8.0f} moves/sec  POST p50 {p50:.2f} ms  p99 {p99:.2f} ms")
+
+    with app.app_context():
+        if app.config["MOVE_WRITE_BEHIND"]:
+            drain = time.perf_counter()
+            write_behind.queue.drain()
+            print(f"{'':<22} drained in {(time.perf_counter() - drain) * 1000:.0f} ms after the last move")
+            registry = app.extensions["metrics"]
+            for title, metric, unit in (("commit latency", registry.write_behind_latency, "s"),
+                                        ("batch size", registry.write_behind_batches, ""),
+                                        ("journal fsync", registry.journal_fsync, "s")):
+                count, mean, low, high = histogram(metric)
+                print(f"{'':<22} {title:<15} n={count:<6} mean {mean:.4g}{unit}  p50 <= {low}  p99 <= {high}")
+
+        for writer in writers:
+            game = db.session.get(Game, writer.game_id)
+            count = db.session.query(db.func.count(Move.id)).filter(Move.game_id == writer.game_id).scalar()
+            board = db.session.get(GameBoard, writer.game_id)
+            assert count == board.move_count == game.turn_seq == writer.played, (writer.game_id, count, writer.played)
+            assert board.state == writer.state.to_bytes(), f"game {writer.game_id} board differs from its writer's"
+    return played / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--writers", type=int, default=16)
+    parser.add_argument("--moves", type=int, default=4000)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        from app import create_app, db
+        from app.models import Player, Game, GameBoard
+        from app.engine import GameState
+        from flask_jwt_extended import create_access_token
+
+        config = {"RATELIMIT_ENABLED": False}
+        sync_app = create_app(config)
+        with sync_app.app_context():
+            db.create_all()
+            db.session.execute(db.insert(Player), [{"id": i, "name": f"p{i}", "password_hash": "x"}
+                                                   for i in range(1, args.writers + 1)])
+            games = 2 * args.writers
+            db.session.execute(db.insert(Game), [{"id": i, "status": "ongoing"} for i in range(1, games + 1)])
+            db.session.execute(db.insert(GameBoard), [{"game_id": i, "state": GameState().to_bytes(), "move_count": 0}
+                                                      for i in range(1, games + 1)])
+            db.session.commit()
+            players = [(i, {"Authorization": f"Bearer {create_access_token(identity=i)}"})
+                       for i in range(1, args.writers + 1)]
+
+        synchronous = run("synchronous", sync_app, range(1, args.writers + 1), players, args.moves)
+        behind_app = create_app(dict(config, MOVE_WRITE_BEHIND=True, MOVE_JOURNAL_DIR=os.path.join(tmp, "journal"),
+                                     MOVE_WRITE_BEHIND_BATCH_SIZE=args.batch_size))
+        behind = run("write-behind", behind_app, range(args.writers + 1, games + 1), players, args.moves)
+        behind_app.extensions["write_behind"].close()
+        print(f"write-behind sustains {behind / synchronous:.1f}x the synchronous rate")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""Check that write-behind sets aside moves the database won't take.
+
+Serves POST /api/moves with MOVE_WRITE_BEHIND on over a throwaway SQLite
+database. Before posting, a stray row takes the next move id, so the
+first move acknowledged for game 1 can never be inserted. The database's
+write lock is held while three moves are posted (game 1, game 2, game 1)
+so they queue together. It expects:
+- game 2's move committed and both of game 1's dead-lettered, with the
+  rejected move's error, in the dead-letter file;
+- write_behind_dead_letters_total at 2 and the queue drained;
+- game 1's board reloaded from the database, and a new move on it
+  accepted and committed;
+- a restart replaying nothing from the journal.
+
+Exits non-zero on any failure.
+
+Usage:
+    python benchmarks/check_dead_letters.py
+"""
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+failures = 0
+
+
+def check(ok, message):
+    global failures
+    failures += not ok
+    print(f"{'ok  ' if ok else 'FAIL'} {message}")
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "dead.db")
+        os.environ["DATABASE_URL"] = f"sqlite:///{path}"
+        from app import create_app, db
+        from app.models import Player, Game, GameBoard, Move
+        from app.engine import GameState
+        from flask_jwt_extended import create_access_token
+
+        def make_app():
+            return create_app({"RATELIMIT_ENABLED": False, "MOVE_WRITE_BEHIND": True,
+                               "MOVE_JOURNAL_DIR": os.path.join(tmp, "journal"),
+                               "MOVE_WRITE_BEHIND_MAX_ATTEMPTS": 2})
+
+        app = make_app()
+        with app.app_context():
+            db.create_all()
+            db.session.add(Player(id=1, name="one", password_hash="x"))
+            for game_id in (1, 2, 3):
+                db.session.add(Game(id=game_id, status="ongoing"))
+                db.session.add(GameBoard(game_id=game_id, state=GameState().to_bytes(), move_count=0))
+            db.session.commit()
+            headers = {"Authorization": f"Bearer {create_access_token(identity=1)}"}
+        client = app.test_client()
+        client.get("/api/games/1/state")
+        queue = app.extensions["write_behind"]
+        poisoned = queue.next_id
+        with app.app_context():
+            db.session.add(Move(id=poisoned, game_id=3, player_id=1, seat=0, piece_id=1, dice_roll=6, position=1))
+            db.session.commit()
+
+        def post(game_id):
+            response = client.post("/api/moves", headers=headers, json={
+                "game_id": game_id, "player_id": 1, "seat": 0, "piece_id": 1, "dice_roll": 6})
+            assert response.status_code == 201, response.get_json()
+            return response.get_json()["id"]
+
+        lock = sqlite3.connect(path, timeout=30)
+        lock.execute("BEGIN IMMEDIATE")
+        ids = [post(1), post(2), post(1)]
+        time.sleep(0.2)
+        lock.rollback()
+        with app.app_context():
+            queue.drain()
+            stored = {row[0]: row[1] for row in db.session.query(Move.id, Move.game_id)}
+        check(ids[0] == poisoned, f"game 1's first move took the stray row's id {poisoned}")
+        check(stored.get(ids[1]) == 2, f"game 2's move {ids[1]} was committed")
+        check(stored.get(ids[0]) == 3 and ids[2] not in stored, "game 1's moves never reached the moves table")
+
+        with open(app.config["MOVE_DEAD_LETTER_FILE"]) as lines:
+            dead = [json.loads(line) for line in lines]
+        check(sorted(record["id"] for record in dead) == [ids[0], ids[2]],
+              f"both of game 1's moves are in the dead-letter file ({[record['id'] for record in dead]})")
+        check(all(record["error"] for record in dead), "each dead letter says why")
+        metrics = app.extensions["metrics"].render()
+        check("write_behind_dead_letters_total 2" in metrics, "write_behind_dead_letters_total is 2")
+        check(queue.committed_id == queue.next_id - 1, "nothing is left queued")
+
+        board = client.get("/api/games/1/state").get_json()
+        check(board["turn"] == "Blue" and board["tokens"]["Blue"] == [0, 0, 0, 0],
+              "game 1's board was reloaded from the database")
+        fresh = post(1)
+        with app.app_context():
+            queue.drain()
+            check(db.session.get(Move, fresh) is not None, f"a new move on game 1 ({fresh}) was committed")
+            count = db.session.query(db.func.count(Move.id)).scalar()
+        queue.close()
+
+        restarted = make_app()
+        restarted.test_client().get("/api/games/1/state")
+        with restarted.app_context():
+            check(db.session.query(db.func.count(Move.id)).scalar() == count,
+                  "a restart replays none of the dead-lettered moves")
+        restarted.extensions["write_behind"].close()
+
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
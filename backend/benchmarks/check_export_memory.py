@@ -0,0 +1,134 @@
+"""Check that `flask export moves` streams in constant memory and resumes.
+
+Seeds --moves synthetic moves into a throwaway SQLite database, then:
+- exports them and checks the process's peak RSS stays under --max-rss-mb;
+- kills an export after its first checkpoint, reruns it, and checks the
+  result holds every move exactly once;
+- exports with --workers 2 and checks the joined file.
+Exits non-zero on any failure.
+
+Usage:
+    python benchmarks/check_export_memory.py [--moves 5000000] [--max-rss-mb 120]
+"""
+import argparse
+import json
+import os
+import random
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND)
+
+# Runs a command and prints the peak RSS (KiB) of it and its children
+MEASURE = ("import resource, subprocess, sys; code = subprocess.call(sys.argv[1:]); "
+           "print(resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss); sys.exit(code)")
+
+failures = 0
+
+
+def check(ok, message):
+    global failures
+    failures += not ok
+    print(f"{'ok  ' if ok else 'FAIL'} {message}")
+
+
+def export_command(out, *options):
+    return [sys.executable, "-m", "flask", "--app", "wsgi", "export", "moves", out, *options]
+
+
+def run_measured(command, env):
+    """(exit code, peak RSS in MiB)"""
+    result = subprocess.run([sys.executable, "-c", MEASURE, *command], cwd=BACKEND, env=env,
+                            capture_output=True, text=True)
+    if result.returncode:
+        print(result.stderr)
+    return result.returncode, int(result.stdout.split()[-1]) / 1024
+
+
+def verify(path, expected):
+    """Whether `path` holds ids 1..expected in order, read in constant memory"""
+    from app.packed import read_packed
+
+    count = 0
+    with open(path, "rb") as source:
+        for move in read_packed(source):
+            count += 1
+            if move["id"] != count:
+                return False
+    return count == expected
+
+
+def seed(moves):
+    from app import create_app, db
+    from app.models import Player, Game, Move
+
+    app = create_app()
+    random.seed(1)
+    with app.app_context():
+        db.create_all()
+        db.session.execute(db.insert(Player), [{"id": i, "name": f"p{i}", "password_hash": "x"} for i in range(1, 5)])
+        games = -(-moves // 200)
+        db.session.execute(db.insert(Game), [{"id": i, "status": "finished"} for i in range(1, games + 1)])
+        for start in range(0, moves, 100000):
+            db.session.execute(db.insert(Move), [
+                {"id": i + 1, "game_id": i // 200 + 1, "player_id": i % 4 + 1, "seat": i % 4,
+                 "dice_roll": random.randint(1, 6), "piece_id": random.randint(1, 4),
+                 "position": random.randint(0, 57)}
+                for i in range(start, min(start + 100000, moves))])
+            db.session.commit()
+        for engine in db.engines.values():
+            engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--moves", type=int, default=5000000)
+    parser.add_argument("--max-rss-mb", type=float, default=120)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ, DATABASE_URL=f"sqlite:///{os.path.join(tmp, 'export.db')}")
+        os.environ["DATABASE_URL"] = env["DATABASE_URL"]
+        start = time.perf_counter()
+        seed(args.moves)
+        print(f"seeded {args.moves} moves in {time.perf_counter() - start:.0f}s")
+
+        out = os.path.join(tmp, "moves.bin")
+        start = time.perf_counter()
+        code, rss = run_measured(export_command(out), env)
+        elapsed = time.perf_counter() - start
+        check(code == 0 and verify(out, args.moves), f"exported {args.moves} moves in {elapsed:.1f}s")
+        check(rss < args.max_rss_mb, f"peak RSS {rss:.0f} MiB (ceiling {args.max_rss_mb:.0f} MiB)")
+
+        # Kill an export once it has checkpointed, then resume it
+        out = os.path.join(tmp, "resumed.bin")
+        process = subprocess.Popen(export_command(out, "--chunk-size", "50000"), cwd=BACKEND, env=env)
+        checkpoint = out + ".part0.checkpoint"
+        while process.poll() is None and not os.path.exists(checkpoint):
+            time.sleep(0.01)
+        process.send_signal(signal.SIGKILL)
+        process.wait()
+        if os.path.exists(checkpoint):
+            with open(checkpoint) as source:
+                done = json.load(source)["rows"]
+            print(f"     killed after {done} rows")
+        code, _ = run_measured(export_command(out, "--chunk-size", "50000"), env)
+        check(code == 0 and verify(out, args.moves), "resumed export holds every move once, in order")
+        check(not os.path.exists(out + ".checkpoint"), "checkpoints are removed on completion")
+
+        out = os.path.join(tmp, "parallel.bin")
+        start = time.perf_counter()
+        code, rss = run_measured(export_command(out, "--workers", "2"), env)
+        elapsed = time.perf_counter() - start
+        check(code == 0 and verify(out, args.moves), f"--workers 2 export joined in order in {elapsed:.1f}s")
+        check(rss < args.max_rss_mb, f"peak RSS per process {rss:.0f} MiB with --workers 2")
+
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
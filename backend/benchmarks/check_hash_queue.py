@@ -0,0 +1,95 @@
+"""Check that the password hashing queue stays bounded when callers time out.
+
+Runs a thread pool of one worker with room for two hashes and a short
+PASSWORD_HASH_TIMEOUT, and feeds it hashes slower than the timeout. It
+expects:
+- callers that time out to get HasherBusy; a hash still queued is
+  cancelled and frees its slot, but one already running keeps its slot
+  until it finishes, so callers beyond the bound are turned away at
+  once instead of queueing more work;
+- every slot to come back once the hashes finish;
+- each server worker's pool to get PASSWORD_HASH_PROCESSES divided by
+  WEB_CONCURRENCY processes (at least one).
+
+Exits non-zero on any failure.
+
+Usage:
+    python benchmarks/check_hash_queue.py
+"""
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+HASH_SECONDS = 0.5
+TIMEOUT = 0.1
+failures = 0
+
+
+def check(ok, message):
+    global failures
+    failures += not ok
+    print(f"{'ok  ' if ok else 'FAIL'} {message}")
+
+
+def slow_hash(done):
+    time.sleep(HASH_SECONDS)
+    done.append(time.monotonic())
+    return True
+
+
+def main():
+    from app import create_app, password_hasher
+    from app.passwords import HasherBusy, _HashPool
+
+    pool = _HashPool("thread", 1, 2, TIMEOUT)
+    done, outcomes = [], []
+
+    def call():
+        try:
+            outcomes.append(pool.run(slow_hash, done))
+        except HasherBusy:
+            outcomes.append("busy")
+
+    # The first hash runs, the second queues behind it; both callers give up
+    callers = [threading.Thread(target=call) for _ in range(2)]
+    for caller in callers:
+        caller.start()
+        time.sleep(TIMEOUT / 10)
+    for caller in callers:
+        caller.join()
+    check(outcomes == ["busy", "busy"] and not done, "both callers time out while the first hash runs")
+
+    # The queued hash was cancelled and gave its slot back; the running one can't be
+    taken = threading.Thread(target=call)
+    taken.start()
+    time.sleep(TIMEOUT / 10)
+    start = time.perf_counter()
+    call()
+    check(outcomes[-1] == "busy" and time.perf_counter() - start < TIMEOUT / 2,
+          "with the running hash and one new one queued, the next caller is turned away at once")
+    taken.join()
+
+    time.sleep(HASH_SECONDS * 2 + TIMEOUT)
+    check(len(done) == 1, f"only the hash that was running when its caller gave up ran ({len(done)})")
+    check(pool.run(lambda: "hashed") == "hashed", "every slot came back once the hashes finished")
+    check(pool._slots._value == 2, f"free slots: {pool._slots._value} of 2")
+
+    for processes, workers, expected in ((8, "4", 2), (4, "9", 1), (4, None, 4)):
+        if workers is None:
+            os.environ.pop("WEB_CONCURRENCY", None)
+        else:
+            os.environ["WEB_CONCURRENCY"] = workers
+        app = create_app({"PASSWORD_HASH_PROCESSES": processes, "SQLALCHEMY_DATABASE_URI": "sqlite://"})
+        with app.app_context():
+            hash_pool = password_hasher.pool
+            check(hash_pool.workers == expected and hash_pool._slots._initial_value == expected * 4,
+                  f"{processes} processes over {workers or 1} server workers: {hash_pool.workers} per pool")
+
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
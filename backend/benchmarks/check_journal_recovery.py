@@ -0,0 +1,154 @@
+"""Check that write-behind moves survive the server being killed.
+
+A child process serves POST /api/moves with MOVE_WRITE_BEHIND on over a
+throwaway SQLite database and prints the id of every move it
+acknowledges. Part way through it takes the database's write lock and
+holds it, so later moves are acknowledged from the journal but can't be
+committed. The parent kills it with SIGKILL, tears the journal's last
+record the way a crash mid-append would, and starts the app again. It
+expects:
+- every acknowledged move in the moves table;
+- each game's stored board equal to a replay of its moves, and its
+  version and turn_seq advanced once per move;
+- the journal emptied, and a second start changing nothing.
+
+Exits non-zero on any failure.
+
+Usage:
+    python benchmarks/check_journal_recovery.py [--moves 400] [--stall-after 150]
+"""
+import argparse
+import os
+import random
+import signal
+import sqlite3
+import subprocess
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+GAMES = 3
+failures = 0
+
+
+def check(ok, message):
+    global failures
+    failures += not ok
+    print(f"{'ok  ' if ok else 'FAIL'} {message}")
+
+
+def make_app(tmp):
+    from app import create_app
+
+    return create_app({"RATELIMIT_ENABLED": False, "MOVE_WRITE_BEHIND": True,
+                       "MOVE_JOURNAL_DIR": os.path.join(tmp, "journal")})
+
+
+def child(tmp, moves, stall_after):
+    from bench_contention import pick_move
+    from flask_jwt_extended import create_access_token
+
+    app = make_app(tmp)
+    with app.app_context():
+        headers = {"Authorization": f"Bearer {create_access_token(identity=1)}"}
+    client = app.test_client()
+    rng = random.Random(1)
+    lock = None
+    for index in range(moves):
+        if index == stall_after:
+            lock = sqlite3.connect(os.path.join(tmp, "recovery.db"), timeout=30)
+            lock.execute("BEGIN IMMEDIATE")
+        game_id = index % GAMES + 1
+        board = client.get(f"/api/games/{game_id}/state").get_json()
+        seat, piece_id, dice, skipped = pick_move(board, rng)
+        response = client.post("/api/moves", headers=headers, json={
+            "game_id": game_id, "player_id": 1, "seat": seat, "piece_id": piece_id, "dice_roll": dice,
+            "skipped_rolls": skipped})
+        assert response.status_code == 201, response.get_json()
+        print(response.get_json()["id"], flush=True)
+    print("done", flush=True)
+    signal.pause()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--moves", type=int, default=400)
+    parser.add_argument("--stall-after", type=int, default=150)
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(args.child, 'recovery.db')}"
+        sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+        child(args.child, args.moves, args.stall_after)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'recovery.db')}"
+        from app import db
+        from app.models import Player, Game, GameBoard, Move
+        from app.engine import GameState
+        from app.game_state import rebuild_board
+
+        app = make_app(tmp)
+        with app.app_context():
+            db.create_all()
+            db.session.add(Player(id=1, name="one", password_hash="x"))
+            for game_id in range(1, GAMES + 1):
+                db.session.add(Game(id=game_id, status="ongoing"))
+                db.session.add(GameBoard(game_id=game_id, state=GameState().to_bytes(), move_count=0))
+            db.session.commit()
+            db.engine.dispose()
+
+        process = subprocess.Popen(
+            [sys.executable, os.path.abspath(__file__), "--child", tmp,
+             "--moves", str(args.moves), "--stall-after", str(args.stall_after)],
+            stdout=subprocess.PIPE, text=True)
+        acknowledged = []
+        for line in process.stdout:
+            if line.strip() == "done":
+                break
+            acknowledged.append(int(line))
+        process.send_signal(signal.SIGKILL)
+        process.wait()
+        check(len(acknowledged) == args.moves, f"child acknowledged {len(acknowledged)} moves before SIGKILL")
+
+        journal = os.path.join(tmp, "journal")
+        segments = sorted(name for name in os.listdir(journal) if name.endswith(".log"))
+        with open(os.path.join(journal, segments[-1]), "ab") as segment:
+            segment.write(b"\x01torn")
+
+        with app.app_context():
+            stored = db.session.query(db.func.count(Move.id)).scalar()
+        print(f"     {stored} moves in the database, {len(acknowledged) - stored} only in the journal")
+        check(stored < len(acknowledged), "some acknowledged moves were never committed")
+
+        for attempt in ("first", "second"):
+            restarted = make_app(tmp)
+            check(restarted.test_client().get("/api/games/1/state").status_code == 200,
+                  f"{attempt} restart serves requests")
+            with restarted.app_context():
+                ids = {row[0] for row in db.session.query(Move.id)}
+                check(set(acknowledged) <= ids and len(ids) == len(acknowledged),
+                      f"{attempt} restart: every acknowledged move is stored once ({len(ids)})")
+                for game_id in range(1, GAMES + 1):
+                    count = db.session.query(db.func.count(Move.id)).filter(Move.game_id == game_id).scalar()
+                    game = db.session.get(Game, game_id)
+                    board = db.session.get(GameBoard, game_id)
+                    state, move_count = board.state, board.move_count
+                    replayed = rebuild_board(game_id)
+                    check(replayed.state == state and move_count == count,
+                          f"{attempt} restart: game {game_id} board matches a replay of its {count} moves")
+                    check(game.turn_seq == count and game.version == count + 1,
+                          f"{attempt} restart: game {game_id} version {game.version}, turn_seq {game.turn_seq}")
+                    db.session.rollback()
+            restarted.extensions["write_behind"].close()
+            check(not any(name.endswith(".log") for name in os.listdir(journal)),
+                  f"{attempt} restart: journal emptied")
+
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""Check that every worker's leaderboard sees wins awarded by the others.
+
+Two apps over one throwaway SQLite database stand in for two server
+workers, with LEADERBOARD_REFRESH_SECONDS set low. A game is finished
+through the first; the second is expected to rank its winner first
+within a refresh, while the reload never blocks a read. Then `flask
+players rescore` is run with one game's winner_id cleared (as if it
+finished before winner_id was recorded) and another's board not won: it
+expects winner_id backfilled from the board, and scores counted from
+winner_id.
+
+Exits non-zero on any failure.
+
+Usage:
+    python benchmarks/check_leaderboard.py
+"""
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+REFRESH = 0.5
+failures = 0
+
+
+def check(ok, message):
+    global failures
+    failures += not ok
+    print(f"{'ok  ' if ok else 'FAIL'} {message}")
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'leaderboard.db')}"
+        from app import create_app, db
+        from app.models import Player, Game, GameBoard, Move
+        from app.engine import GameState, FINISHED
+        from flask_jwt_extended import create_access_token
+
+        config = {"RATELIMIT_ENABLED": False, "LEADERBOARD_REFRESH_SECONDS": REFRESH}
+        first, second = create_app(config), create_app(config)
+        won = GameState()
+        won.tokens[0:4] = bytes((FINISHED,) * 4)
+        with first.app_context():
+            db.create_all()
+            for player_id in (1, 2, 3):
+                db.session.add(Player(id=player_id, name=f"p{player_id}", password_hash="x"))
+            # Player 2 last moved for Blue, whose tokens are all home
+            db.session.add(Game(id=1, status="ongoing"))
+            db.session.add(GameBoard(game_id=1, state=won.to_bytes(), move_count=1))
+            db.session.add(Move(game_id=1, player_id=2, seat=0, piece_id=1, dice_roll=6, position=FINISHED))
+            db.session.commit()
+            headers = {"Authorization": f"Bearer {create_access_token(identity=1)}"}
+
+        def top(app):
+            start = time.perf_counter()
+            items = app.test_client().get("/api/leaderboard?limit=1").get_json()["items"]
+            return items[0]["id"], items[0]["score"], time.perf_counter() - start
+
+        check(top(second)[:2] == (1, 0), "the second worker loads the ranking before the win")
+        response = first.test_client().patch("/api/games/1", headers=headers, json={"status": "finished"})
+        check(response.status_code == 200 and response.get_json()["winner_id"] == 2, "the first worker awards the win")
+        check(top(first)[:2] == (2, 10), "the first worker ranks the winner first straight away")
+
+        deadline, slowest, seen = time.monotonic() + REFRESH * 10, 0.0, None
+        while time.monotonic() < deadline:
+            player_id, score, elapsed = top(second)
+            slowest = max(slowest, elapsed)
+            if (player_id, score) == (2, 10):
+                seen = time.monotonic()
+                break
+            time.sleep(REFRESH / 10)
+        check(seen is not None, "the second worker ranks the winner first after a refresh")
+        check(slowest < REFRESH, f"slowest leaderboard read during the reload took {slowest * 1000:.0f} ms")
+
+        with first.app_context():
+            # Game 1 as if finished before winner_id; game 2 credited to player 3 without a won board
+            Game.query.filter_by(id=1).update({Game.winner_id: None}, synchronize_session=False)
+            db.session.add(Game(id=2, status="finished", winner_id=3))
+            db.session.add(GameBoard(game_id=2, state=GameState().to_bytes(), move_count=0))
+            Player.query.update({Player.score: 0}, synchronize_session=False)
+            db.session.commit()
+            version = db.session.get(Game, 1).version
+        result = first.test_cli_runner().invoke(args=["players", "rescore"])
+        check(result.exit_code == 0, f"rescore ran: {result.output.strip()}")
+        with first.app_context():
+            game = db.session.get(Game, 1)
+            check(game.winner_id == 2 and game.version == version + 1,
+                  "rescore backfilled game 1's winner_id and bumped its version")
+            scores = dict(db.session.query(Player.id, Player.score))
+            check(scores == {1: 0, 2: 10, 3: 10}, f"scores counted from winner_id ({scores})")
+
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""Check that PATCH /api/moves/<id> only stores legal edits.
+
+Plays a few moves in a throwaway SQLite database, then edits the first
+one. It expects:
+- 400 for an edit the rules don't allow where the move sits in the log
+  (leaving the yard without a 6), one whose `position` isn't where the
+  engine puts the token, or one that leaves a later move unplayable
+  (bringing out another token, so the next move's token is still in
+  the yard), with the moves and the game unchanged;
+- 200 for a legal edit, with `position` computed by the engine and the
+  board rebuilt from it.
+
+Exits non-zero on any failure.
+
+Usage:
+    python benchmarks/check_move_edits.py
+"""
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+failures = 0
+
+
+def check(ok, message):
+    global failures
+    failures += not ok
+    print(f"{'ok  ' if ok else 'FAIL'} {message}")
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'edits.db')}"
+        from app import create_app, db
+        from app.models import Player, Game, GameBoard
+        from app.engine import GameState
+        from flask_jwt_extended import create_access_token
+
+        app = create_app({"RATELIMIT_ENABLED": False})
+        with app.app_context():
+            db.create_all()
+            db.session.add(Player(id=1, name="one", password_hash="x"))
+            db.session.add(Game(id=1, status="ongoing"))
+            db.session.add(GameBoard(game_id=1, state=GameState().to_bytes(), move_count=0))
+            db.session.commit()
+            headers = {"Authorization": f"Bearer {create_access_token(identity=1)}"}
+        client = app.test_client()
+
+        # Blue enters a token with a 6, moves it 2, then Red enters one with a 6
+        ids = [client.post("/api/moves", headers=headers, json=dict(
+            move, game_id=1, player_id=1)).get_json()["id"] for move in (
+            {"seat": 0, "piece_id": 1, "dice_roll": 6},
+            {"seat": 0, "piece_id": 1, "dice_roll": 2},
+            {"seat": 1, "piece_id": 1, "dice_roll": 6})]
+        before = client.get("/api/games/1/state").get_json()
+
+        def patch(move_id, **changes):
+            response = client.patch(f"/api/moves/{move_id}", headers=headers, json=changes)
+            return response.status_code, response.get_json()
+
+        status, body = patch(ids[0], dice_roll=3)
+        check(status == 400, f"a token can't leave the yard with a 3 ({status} {body})")
+        status, body = patch(ids[1], position=40)
+        check(status == 400, f"a position the engine wouldn't reach is refused ({status} {body})")
+        status, body = patch(ids[0], piece_id=2)
+        check(status == 400 and f"Move {ids[1]} no longer applies" in body["error"],
+              f"an edit that strands a later move is refused ({status} {body})")
+        status, body = patch(ids[2], piece_id=9)
+        check(status == 400, f"schema errors still come first ({status})")
+        after = client.get("/api/games/1/state").get_json()
+        stored = client.get(f"/api/moves/{ids[0]}").get_json()
+        check(after == before and (stored["dice_roll"], stored["piece_id"]) == (6, 1), "refused edits changed nothing")
+
+        status, body = patch(ids[1], dice_roll=4)
+        check(status == 200 and body["position"] == stored["position"] + 4,
+              f"a legal edit gets its position from the engine ({status} {body})")
+        board = client.get("/api/games/1/state").get_json()
+        check(board["tokens"]["Blue"][0] == stored["position"] + 4 and board["version"] == before["version"] + 1,
+              "the board was rebuilt from the edited move")
+
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""Check that only a game's seated players can post its moves.
+
+Seats two players in a two-seat lobby game in a throwaway SQLite
+database, with a third player left out, and expects, both synchronously
+and with MOVE_WRITE_BEHIND:
+- 403 for a move from the player who isn't seated, single or batched;
+- 403 for a seated player's move for the other player's seat;
+- 201 for a seated player's move for their own seat, with the seat
+  filled in from game_players when the move leaves it out;
+- Green's player to move after Blue's without a roll for Red's empty seat.
+
+Exits non-zero on any failure.
+
+Usage:
+    python benchmarks/check_move_seats.py
+"""
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+failures = 0
+
+
+def check(ok, message):
+    global failures
+    failures += not ok
+    print(f"{'ok  ' if ok else 'FAIL'} {message}")
+
+
+def run(label, app):
+    from flask_jwt_extended import create_access_token
+
+    client = app.test_client()
+    with app.app_context():
+        headers = {player_id: {"Authorization": f"Bearer {create_access_token(identity=player_id)}"}
+                   for player_id in (1, 2, 3)}
+    game_id = client.post("/api/games", json={"status": "waiting", "max_players": 2}).get_json()["id"]
+    for player_id in (1, 2):
+        client.post(f"/api/lobby/{game_id}/join", headers=headers[player_id])
+
+    def post(player_id, dice=6, **move):
+        response = client.post("/api/moves", headers=headers[player_id], json=dict(
+            move, game_id=game_id, player_id=player_id, piece_id=1, dice_roll=dice))
+        return response.status_code, response.get_json()
+
+    status, body = post(3)
+    check(status == 403, f"{label}: a player who isn't seated can't move ({status} {body})")
+    status, body = post(3, seat=0)
+    check(status == 403, f"{label}: ... not even for the seat whose turn it is ({status} {body})")
+    status, body = post(1, seat=2)
+    check(status == 403, f"{label}: Blue's player can't move for Green ({status} {body})")
+    status, body = post(1)
+    check(status == 201 and body["seat"] == 0, f"{label}: Blue's player moves for Blue ({status})")
+    post(1, dice=3)
+    status, body = post(2, seat=2)
+    check(status == 201, f"{label}: Green's 6 skips Red's empty seat without a roll ({status} {body})")
+    status = client.post(f"/api/games/{game_id}/moves:batch", headers=headers[3], json=[
+        {"player_id": 3, "piece_id": 1, "dice_roll": 6}]).status_code
+    check(status == 403, f"{label}: a player who isn't seated can't post a batch ({status})")
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'seats.db')}"
+        from app import create_app, db
+        from app.models import Player
+
+        config = {"RATELIMIT_ENABLED": False}
+        app = create_app(config)
+        with app.app_context():
+            db.create_all()
+            db.session.execute(db.insert(Player), [{"id": i, "name": f"p{i}", "password_hash": "x"}
+                                                   for i in (1, 2, 3)])
+            db.session.commit()
+        run("synchronous", app)
+        behind = create_app(dict(config, MOVE_WRITE_BEHIND=True, MOVE_JOURNAL_DIR=os.path.join(tmp, "journal")))
+        run("write-behind", behind)
+        behind.extensions["write_behind"].close()
+
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
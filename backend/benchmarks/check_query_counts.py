@@ -0,0 +1,134 @@
+"""Regression check: read endpoints run a constant number of SQL statements.
+
+Seeds a throwaway SQLite database at two sizes and counts the statements
+each endpoint runs. The counts must not grow with the number of rows,
+which is what an N+1 (one lazy load per row) looks like. Runs with the
+query guard in raise mode, and checks that the guard itself catches a
+deliberate N+1. Exits non-zero on any failure.
+
+Usage:
+    python benchmarks/check_query_counts.py [--small 5] [--large 200]
+"""
+import argparse
+import os
+import sys
+import tempfile
+
+from sqlalchemy import event
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+ENDPOINTS = [
+    "/api/moves?include=player&limit=1000",
+    "/api/games/1?include=moves",
+    "/api/games/1",
+    "/api/games/1/moves",
+    "/api/games/1/moves?format=packed",
+    "/api/export/moves",
+    "/api/games/1/state",
+    "/api/moves?game_id=1&limit=1000",
+    "/api/players?limit=1000",
+    "/api/games?limit=1000",
+    "/api/leaderboard?limit=1000",
+]
+
+
+def seed(db, Player, Game, Move, rows):
+    from app.game_state import rebuild_board
+
+    db.session.add_all(Player(id=i, name=f"player{i}", password_hash="x") for i in range(1, rows + 1))
+    db.session.add_all(Game(id=i, status="ongoing") for i in range(1, rows + 1))
+    db.session.add_all(Move(dice_roll=6, piece_id=1, position=1, seat=0, player_id=i, game_id=1)
+                       for i in range(1, rows + 1))
+    db.session.flush()
+    rebuild_board(1)
+    db.session.commit()
+
+
+def count_statements(rows):
+    """{endpoint: statements} on a fresh database seeded with `rows` rows"""
+    from app import create_app, db
+    from app.models import Player, Game, Move
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'counts.db')}"
+        app = create_app({"QUERY_REPEAT_THRESHOLD": 3, "QUERY_GUARD_RAISE": True, "TESTING": True})
+
+        with app.app_context():
+            db.create_all()
+            seed(db, Player, Game, Move, rows)
+            engines = set(db.engines.values())
+
+        statements = []
+
+        def capture(conn, cursor, statement, params, context, executemany):
+            statements.append(statement)
+
+        for engine in engines:
+            event.listen(engine, "before_cursor_execute", capture)
+        client = app.test_client()
+        counts = {}
+        for url in ENDPOINTS:
+            statements.clear()
+            # Read the whole body so streamed responses finish their queries
+            with client.get(url) as response:
+                response.get_data()
+            assert response.status_code == 200, (url, response.status_code)
+            counts[url] = len(statements)
+        for engine in engines:
+            event.remove(engine, "before_cursor_execute", capture)
+            engine.dispose()
+        return counts
+
+
+def guard_catches_n_plus_one():
+    """A view that lazy-loads Move.player per row must trip the guard"""
+    from app import create_app, db
+    from app.models import Player, Game, Move
+    from app.metrics import TooManyQueries
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'guard.db')}"
+        app = create_app({"QUERY_REPEAT_THRESHOLD": 3, "QUERY_GUARD_RAISE": True, "TESTING": True})
+
+        @app.route("/n-plus-one")
+        def n_plus_one():
+            return {"names": [move.player.name for move in Move.query.all()]}
+
+        with app.app_context():
+            db.create_all()
+            seed(db, Player, Game, Move, 10)
+        try:
+            app.test_client().get("/n-plus-one")
+        except TooManyQueries:
+            return True
+        return False
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--small", type=int, default=5)
+    parser.add_argument("--large", type=int, default=200)
+    args = parser.parse_args()
+
+    small = count_statements(args.small)
+    large = count_statements(args.large)
+
+    failures = 0
+    for url in ENDPOINTS:
+        ok = small[url] == large[url]
+        failures += not ok
+        print(f"{'ok  ' if ok else 'FAIL'} {url:<40} {small[url]:>3} statements at {args.small} rows,"
+              f" {large[url]:>3} at {args.large}")
+
+    if guard_catches_n_plus_one():
+        print("ok   query guard flags a lazy load per row")
+    else:
+        print("FAIL query guard missed a lazy load per row")
+        failures += 1
+
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
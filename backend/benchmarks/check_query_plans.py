@@ -0,0 +1,112 @@
+"""Query-plan regression check for the moves/games hot paths.
+
+Runs the routes below against a throwaway SQLite database, captures every
+SELECT/DELETE they emit and runs EXPLAIN QUERY PLAN on it. Exits non-zero
+if any statement falls back to a full table scan of moves or games.
+
+Usage:
+    python benchmarks/check_query_plans.py
+"""
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import event  # noqa: E402
+
+# Tables that must always be reached through an index
+INDEXED_TABLES = ("moves", "games", "game_snapshots", "game_players")
+
+
+def seed(db, Player, Game, Move):
+    player = Player(id=1, name="plan", password_hash="x")
+    other = Player(id=2, name="other", password_hash="x")
+    db.session.add_all([player, other])
+    for game_id in range(1, 6):
+        db.session.add(Game(id=game_id, status="ongoing"))
+        for i in range(10):
+            db.session.add(Move(dice_roll=1, piece_id=1, position=i, player_id=2, game_id=game_id))
+    db.session.add(Move(id=1000, dice_roll=6, piece_id=1, position=1, player_id=1, game_id=4))
+    db.session.add(Game(id=6, status="waiting", max_players=2))
+    db.session.commit()
+
+
+def full_scans(conn, statement, params):
+    """Return the plan lines that scan an indexed table without an index"""
+    rows = conn.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, params).fetchall()
+    bad = []
+    for row in rows:
+        detail = row[-1]
+        for table in INDEXED_TABLES:
+            if detail.startswith(f"SCAN {table}") and "INDEX" not in detail:
+                bad.append(detail)
+    return bad
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'plan.db')}"
+
+        from app import create_app, db
+        from app.models import Player, Game, Move
+        from flask_jwt_extended import create_access_token
+
+        app = create_app()
+
+        with app.app_context():
+            db.create_all()
+            seed(db, Player, Game, Move)
+            token = create_access_token(identity=1)
+
+            captured = []
+
+            def capture(conn, cursor, statement, params, context, executemany):
+                if statement.lstrip().upper().startswith(("SELECT", "DELETE", "UPDATE")):
+                    captured.append((statement, params))
+
+            # Reads go to the reader bind, writes to the default engine
+            engines = set(db.engines.values())
+            for engine in engines:
+                event.listen(engine, "before_cursor_execute", capture)
+
+            client = app.test_client()
+            auth = {"Authorization": f"Bearer {token}"}
+            checks = [
+                ("GET /api/games/<id>/moves", lambda: client.get("/api/games/1/moves")),
+                ("GET /api/moves?game_id=", lambda: client.get("/api/moves?game_id=2")),
+                ("GET /api/moves?player_id=", lambda: client.get("/api/moves?player_id=2")),
+                ("GET /api/games?status=", lambda: client.get("/api/games?status=ongoing")),
+                ("GET /api/games/<id>/state", lambda: client.get("/api/games/4/state")),
+                ("GET /api/lobby", lambda: client.get("/api/lobby?seats=2")),
+                ("POST /api/lobby/<id>/join", lambda: client.post("/api/lobby/6/join", headers=auth)),
+                ("DELETE /api/moves/<id>", lambda: client.delete("/api/moves/1000", headers=auth)),
+                ("DELETE /api/games/<id>", lambda: client.delete("/api/games/3")),
+                ("DELETE /api/players/<id>", lambda: client.delete("/api/players/1", headers=auth)),
+            ]
+
+            failures = 0
+            for name, call in checks:
+                captured.clear()
+                before = failures
+                response = call()
+                if response.status_code >= 400:
+                    print(f"FAIL {name}: HTTP {response.status_code}")
+                    failures += 1
+                    continue
+                with db.engine.connect() as conn:
+                    for statement, params in captured:
+                        for detail in full_scans(conn, statement, params):
+                            print(f"FAIL {name}: {detail}\n     {' '.join(statement.split())}")
+                            failures += 1
+                if failures == before:
+                    print(f"ok   {name}")
+
+            for engine in engines:
+                event.remove(engine, "before_cursor_execute", capture)
+
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""Check that rate and concurrency limits shed load without touching other routes.
+
+Against a throwaway SQLite database:
+- floods /api/auth/check-username from one address and expects 429s
+  with Retry-After once its bucket is empty, while GET /api/games and
+  another address keep getting 200;
+- floods POST /api/moves as one player and expects 429s while another
+  player's moves still go through;
+- holds a concurrency-limited route open on several threads and expects
+  the extra callers to get 503 immediately while GET /api/games answers.
+
+Exits non-zero on any failure.
+
+Usage:
+    python benchmarks/check_rate_limits.py
+"""
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+CONFIG = {
+    "TESTING": True,
+    "RATE_LIMITS": {"check_username": "5/minute", "moves": "3/minute"},
+    "CONCURRENCY_LIMITS": {"slow": 2},
+}
+
+failures = 0
+
+
+def check(ok, message):
+    global failures
+    failures += not ok
+    print(f"{'ok  ' if ok else 'FAIL'} {message}")
+
+
+def main():
+    from app import create_app, db, rate_limiter
+    from app.models import Player, Game
+    from flask_jwt_extended import create_access_token
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'limits.db')}"
+        app = create_app(CONFIG)
+        release = threading.Event()
+
+        @app.route("/slow")
+        @rate_limiter.limit("slow")
+        def slow():
+            release.wait(10)
+            return {"ok": True}
+
+        with app.app_context():
+            db.create_all()
+            db.session.add_all([Player(id=1, name="one", password_hash="x"),
+                                Player(id=2, name="two", password_hash="x"),
+                                Game(id=1, status="ongoing")])
+            db.session.commit()
+            tokens = {player_id: create_access_token(identity=player_id) for player_id in (1, 2)}
+
+        client = app.test_client()
+        flooder = {"REMOTE_ADDR": "10.0.0.1"}
+        bystander = {"REMOTE_ADDR": "10.0.0.2"}
+
+        # Per-address limit on an unauthenticated route
+        statuses = [client.post("/api/auth/check-username", json={"name": "someone"}, environ_base=flooder)
+                    for _ in range(20)]
+        codes = [response.status_code for response in statuses]
+        check(codes[:5] == [200] * 5 and set(codes[5:]) == {429}, "check-username allows a burst of 5, then 429")
+        retry = statuses[-1].headers.get("Retry-After")
+        check(retry is not None and int(retry) >= 1, f"429 carries Retry-After ({retry})")
+        check(client.post("/api/auth/check-username", json={"name": "someone"},
+                          environ_base=bystander).status_code == 200, "another address is unaffected")
+        check(client.get("/api/games", environ_base=flooder).status_code == 200,
+              "GET /api/games still serves the flooding address")
+
+        # Per-player limit on an authenticated route
+        def post_move(player_id):
+            return client.post("/api/moves", environ_base=flooder,
+                               json={"dice_roll": 6, "piece_id": 1, "player_id": player_id, "game_id": 1},
+                               headers={"Authorization": f"Bearer {tokens[player_id]}"}).status_code
+
+        codes = [post_move(1) for _ in range(10)]
+        check(codes[:3] == [201] * 3 and set(codes[3:]) == {429}, "POST /api/moves allows 3 per player, then 429")
+        check(post_move(2) == 201, "another player's moves still go through")
+
+        # Concurrency limit
+        results = []
+        workers = [threading.Thread(target=lambda: results.append(client.get("/slow").status_code))
+                   for _ in range(2)]
+        for worker in workers:
+            worker.start()
+        time.sleep(0.2)
+        start = time.perf_counter()
+        shed = client.get("/slow")
+        elapsed = time.perf_counter() - start
+        check(shed.status_code == 503 and shed.headers.get("Retry-After") == "1",
+              "third concurrent request is shed with 503 and Retry-After")
+        check(elapsed < 0.1, f"shedding is immediate ({elapsed * 1000:.1f} ms)")
+        check(client.get("/api/games").status_code == 200, "GET /api/games answers while the slots are full")
+        release.set()
+        for worker in workers:
+            worker.join()
+        check(results == [200, 200], "requests holding the slots complete")
+
+        registry = app.extensions["metrics"]
+        rendered = registry.render()
+        check('rate_limited_requests_total{rule="check_username",reason="rate"} 15' in rendered,
+              "rejections are counted in /metrics")
+
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
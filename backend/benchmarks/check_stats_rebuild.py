@@ -0,0 +1,94 @@
+"""Check that /api/stats recounts off the request path and across workers.
+
+Seeds --moves random-bot moves into a throwaway SQLite database shared by
+two apps standing in for two server workers; the second has a short
+STATS_REFRESH_SECONDS. Both fold the table, then a player is deleted
+(with their moves) through the first. It expects:
+- the first's reads straight after the deletion to return quickly, from
+  the old totals, while its rebuild runs in the background;
+- the first to count the deletion once its rebuild is swapped in;
+- the second, which wasn't told, to count it after its next refresh.
+
+Exits non-zero on any failure.
+
+Usage:
+    python benchmarks/check_stats_rebuild.py [--moves 300000]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+REFRESH = 1.0
+failures = 0
+
+
+def check(ok, message):
+    global failures
+    failures += not ok
+    print(f"{'ok  ' if ok else 'FAIL'} {message}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--moves", type=int, default=300000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'stats.db')}"
+        from app import create_app, db
+        from app.models import Player, Move
+        from bench_stats import seed_games
+        from flask_jwt_extended import create_access_token
+
+        config = {"RATELIMIT_ENABLED": False}
+        first = create_app(dict(config, STATS_REFRESH_SECONDS=None))
+        second = create_app(dict(config, STATS_REFRESH_SECONDS=REFRESH))
+        with first.app_context():
+            db.create_all()
+            db.session.execute(db.insert(Player), [{"id": i, "name": f"p{i}", "password_hash": "x"}
+                                                   for i in range(1, 101)])
+            db.session.commit()
+        seed_games(first, args.moves, 100, random.Random(1), 1, 1, True)
+        with first.app_context():
+            total = db.session.query(db.func.count(Move.id)).scalar()
+            removed = db.session.query(db.func.count(Move.id)).filter(Move.player_id == 1).scalar()
+            headers = {"Authorization": f"Bearer {create_access_token(identity=1)}"}
+
+        def read(app):
+            start = time.perf_counter()
+            moves = app.test_client().get("/api/stats/games").get_json()["moves"]
+            return moves, time.perf_counter() - start
+
+        (moves, fold), (other, _) = read(first), read(second)
+        check(moves == other == total, f"both workers fold all {total} moves (first fold took {fold:.1f}s)")
+
+        response = first.test_client().delete("/api/players/1", headers=headers)
+        check(response.status_code in (200, 204), f"player 1 and their {removed} moves deleted")
+
+        slowest, seen = 0.0, None
+        deadline = time.monotonic() + fold * 10 + 10
+        while time.monotonic() < deadline:
+            moves, elapsed = read(first)
+            slowest = max(slowest, elapsed)
+            if moves == total - removed:
+                seen = moves
+                break
+            time.sleep(0.05)
+        check(seen is not None, "the first worker counts the deletion once its rebuild is in")
+        check(slowest < fold / 4, f"slowest read during the rebuild took {slowest * 1000:.0f} ms")
+
+        while time.monotonic() < deadline and read(second)[0] != total - removed:
+            time.sleep(0.05)
+        check(read(second)[0] == total - removed, "the second worker counts the deletion after a refresh")
+
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""Check that moves can be written while /api/stats folds a large moves table.
+
+Seeds --moves random-bot moves into a throwaway SQLite database, starts
+GET /api/stats/games on a thread (the first read folds every move), and
+while that runs posts moves to a new game. It expects the fold to still
+be running when the moves are posted, every move to get 201, and each to
+finish in well under the fold's time: the scan runs on the reader and
+holds neither the database's write lock nor the stats lock while it
+fetches.
+
+Exits non-zero on any failure.
+
+Usage:
+    python benchmarks/check_stats_writes.py [--moves 600000]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+failures = 0
+
+
+def check(ok, message):
+    global failures
+    failures += not ok
+    print(f"{'ok  ' if ok else 'FAIL'} {message}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--moves", type=int, default=600000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'stats.db')}"
+        from app import create_app, db
+        from app.models import Player, Game, GameBoard, GamePlayer
+        from app.engine import GameState
+        from bench_stats import seed_games
+        from flask_jwt_extended import create_access_token
+
+        app = create_app({"RATELIMIT_ENABLED": False})
+        with app.app_context():
+            db.create_all()
+            db.session.execute(db.insert(Player), [{"id": i, "name": f"p{i}", "password_hash": "x"}
+                                                   for i in range(1, 101)])
+            db.session.commit()
+        game_id, _, _ = seed_games(app, args.moves, 100, random.Random(1), 1, 1, True)
+        with app.app_context():
+            db.session.add(Game(id=game_id, status="ongoing"))
+            db.session.add(GameBoard(game_id=game_id, state=GameState().to_bytes(), move_count=0))
+            db.session.add(GamePlayer(game_id=game_id, player_id=1, seat=0))
+            db.session.commit()
+            headers = {"Authorization": f"Bearer {create_access_token(identity=1)}"}
+
+        client = app.test_client()
+        fold = {}
+
+        def read_stats():
+            start = time.perf_counter()
+            fold["status"] = client.get("/api/stats/games").status_code
+            fold["elapsed"] = time.perf_counter() - start
+
+        reader = threading.Thread(target=read_stats)
+        reader.start()
+        time.sleep(0.3)
+        latencies, statuses = [], []
+        for _ in range(5):
+            # Sixes keep the turn with seat 0 and always move its first token
+            start = time.perf_counter()
+            statuses.append(client.post("/api/moves", headers=headers, json={
+                "game_id": game_id, "player_id": 1, "piece_id": 1, "dice_roll": 6}).status_code)
+            latencies.append(time.perf_counter() - start)
+        still_folding = reader.is_alive()
+        reader.join()
+
+        check(still_folding, f"the fold was still running when the moves were posted "
+                             f"(fold took {fold['elapsed']:.1f}s)")
+        check(statuses == [201] * 5, f"every move was accepted during the fold ({statuses})")
+        check(max(latencies) < 0.5, f"slowest move took {max(latencies) * 1000:.0f} ms")
+        check(fold["status"] == 200, "the stats read completed")
+
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
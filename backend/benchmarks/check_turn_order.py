@@ -0,0 +1,83 @@
+"""Check that POST /api/moves and the batch route enforce turn order.
+
+Posts moves to fresh games in a throwaway SQLite database and expects:
+- a move for the seat whose turn it is to be accepted;
+- a later seat to be rejected when a skipped seat could move with its
+  roll, or with the move's roll when no skipped rolls are sent;
+- a later seat to be accepted when every skipped seat's roll was unusable;
+- skipped rolls that don't match the number of skipped seats to be rejected;
+- the same rules in POST /api/games/<id>/moves:batch.
+
+Exits non-zero on any failure.
+
+Usage:
+    python benchmarks/check_turn_order.py
+"""
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+failures = 0
+
+
+def check(ok, message):
+    global failures
+    failures += not ok
+    print(f"{'ok  ' if ok else 'FAIL'} {message}")
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'turns.db')}"
+        from app import create_app, db
+        from app.models import Player, Game, GameBoard
+        from app.engine import GameState
+        from flask_jwt_extended import create_access_token
+
+        app = create_app({"RATELIMIT_ENABLED": False})
+        with app.app_context():
+            db.create_all()
+            db.session.add(Player(id=1, name="one", password_hash="x"))
+            for game_id in range(1, 8):
+                db.session.add(Game(id=game_id, status="ongoing"))
+                db.session.add(GameBoard(game_id=game_id, state=GameState().to_bytes(), move_count=0))
+            db.session.commit()
+            headers = {"Authorization": f"Bearer {create_access_token(identity=1)}"}
+        client = app.test_client()
+
+        def post(game_id, seat, dice, **extra):
+            response = client.post("/api/moves", headers=headers, json=dict(
+                extra, game_id=game_id, player_id=1, seat=seat, piece_id=1, dice_roll=dice))
+            return response.status_code, (response.get_json() or {}).get("error", "")
+
+        # Every seat starts in the yard, so only a 6 can move
+        status, _ = post(1, 0, 6)
+        check(status == 201, f"Blue moving on Blue's turn is accepted ({status})")
+        status, error = post(2, 2, 6)
+        check(status == 400, f"Green can't take a 6 Blue could use ({status} {error})")
+        status, error = post(3, 2, 6, skipped_rolls=[6, 2])
+        check(status == 400, f"Green can't skip Blue's reported 6 ({status} {error})")
+        status, _ = post(4, 2, 6, skipped_rolls=[3, 5])
+        check(status == 201, f"Green moves after Blue and Red rolled 3 and 5 ({status})")
+        status, error = post(5, 2, 6, skipped_rolls=[3])
+        check(status == 400, f"two skipped seats need two rolls ({status} {error})")
+        status, error = post(5, 0, 6, skipped_rolls=[3])
+        check(status == 400, f"no skipped seats take no rolls ({status} {error})")
+
+        def batch(game_id, moves):
+            return client.post(f"/api/games/{game_id}/moves:batch", headers=headers, json=[
+                dict(move, game_id=game_id, player_id=1, piece_id=1) for move in moves]).status_code
+
+        status = batch(6, [{"seat": 0, "dice_roll": 6}, {"seat": 2, "dice_roll": 6}])
+        check(status == 400, f"batch: Green can't jump Blue's extra turn ({status})")
+        status = batch(7, [{"seat": 2, "dice_roll": 6, "skipped_rolls": [4, 1]},
+                           {"seat": 2, "dice_roll": 3}])
+        check(status == 201, f"batch: skips with unusable rolls are accepted ({status})")
+
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
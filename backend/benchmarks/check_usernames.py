@@ -0,0 +1,103 @@
+"""Check that username checks pick up names registered through other workers.
+
+Two apps over one throwaway SQLite database stand in for two server
+workers, with USERNAMES_REFRESH_SECONDS set low. Both load their name
+index, then a player registers through the second. It expects:
+- the first to report the name taken within a refresh, for single and
+  batch checks, without a check waiting on the reload;
+- a name the first registers itself to stay taken across its reloads,
+  including one registered while a (deliberately slow) reload runs.
+
+Exits non-zero on any failure.
+
+Usage:
+    python benchmarks/check_usernames.py
+"""
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+REFRESH = 0.5
+failures = 0
+
+
+def check(ok, message):
+    global failures
+    failures += not ok
+    print(f"{'ok  ' if ok else 'FAIL'} {message}")
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'usernames.db')}"
+        from app import create_app, db
+        from app.models import Player
+
+        config = {"RATELIMIT_ENABLED": False, "BCRYPT_ROUNDS": 4, "PASSWORD_HASH_EXECUTOR": "inline",
+                  "USERNAMES_REFRESH_SECONDS": REFRESH}
+        first, second = create_app(config), create_app(config)
+        with first.app_context():
+            db.create_all()
+            db.session.execute(db.insert(Player), [{"name": f"player{i}", "password_hash": "x"}
+                                                   for i in range(50000)])
+            db.session.commit()
+        clients = first.test_client(), second.test_client()
+
+        def available(client, name):
+            start = time.perf_counter()
+            result = client.post("/api/auth/check-username", json={"name": name}).get_json()
+            return result["available"], time.perf_counter() - start
+
+        check(available(clients[0], "newcomer")[0] and available(clients[1], "newcomer")[0],
+              "both workers load their index with newcomer free")
+        response = clients[1].post("/api/auth/register", json={"name": "newcomer", "password": "Password123!"})
+        check(response.status_code == 201, f"newcomer registered through the second worker ({response.status_code})")
+        response = clients[0].post("/api/auth/register", json={"name": "local", "password": "Password123!"})
+        check(response.status_code == 201, f"local registered through the first worker ({response.status_code})")
+
+        deadline, slowest, seen = time.monotonic() + REFRESH * 20, 0.0, False
+        while time.monotonic() < deadline and not seen:
+            free, elapsed = available(clients[0], "newcomer")
+            slowest = max(slowest, elapsed)
+            if available(clients[0], "local")[0]:
+                check(False, "local went missing from the first worker's index during a reload")
+                break
+            seen = not free
+            time.sleep(REFRESH / 10)
+        check(seen, "the first worker reports newcomer taken after a refresh")
+        check(slowest < REFRESH, f"slowest check during the reloads took {slowest * 1000:.0f} ms")
+        batch = clients[0].post("/api/auth/check-username/batch",
+                                json={"names": ["newcomer", "local", "stranger"]}).get_json()["results"]
+        check(not batch["newcomer"]["available"] and not batch["local"]["available"],
+              "batch checks report both names taken")
+        check(batch["stranger"] == {"available": True}, "a name nobody took stays available")
+
+        # A reload slow enough to register a name while it reads the table
+        from app.reload import ReloadedCopy
+        from app.usernames import NameIndex
+
+        def slow_load():
+            names = [name for (name,) in db.session.query(Player.name)]
+            time.sleep(REFRESH)
+            return NameIndex(names)
+
+        copy = ReloadedCopy("slow_usernames", "USERNAMES_REFRESH_SECONDS", slow_load)
+        with first.app_context():
+            copy.get()
+            time.sleep(REFRESH * 1.5)
+            start = time.perf_counter()
+            copy.get()
+            check(time.perf_counter() - start < REFRESH / 2, "a due reload doesn't hold up the read that starts it")
+            # Only this worker's copy learns of it: the row itself isn't written
+            copy.apply("add", "midreload")
+            time.sleep(REFRESH * 2)
+            check("midreload" in copy.get(), "a name added during the reload survives the swap")
+
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
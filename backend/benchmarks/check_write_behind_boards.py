@@ -0,0 +1,104 @@
+"""Check that write-behind keeps a bounded number of boards in memory.
+
+Plays random-bot moves round-robin over more games than
+MOVE_WRITE_BEHIND_MAX_GAMES allows boards for, with MOVE_WRITE_BEHIND on
+over a throwaway SQLite database, then plays one game to its end. It
+expects:
+- no more boards held than the limit after any move, once the moves
+  before it have committed;
+- every game's stored board equal to what its bot played, including
+  games whose boards were dropped and read back in between moves;
+- the finished game's board dropped once its last move committed.
+
+Exits non-zero on any failure.
+
+Usage:
+    python benchmarks/check_write_behind_boards.py [--games 12] [--max-games 4] [--rounds 30]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+failures = 0
+
+
+def check(ok, message):
+    global failures
+    failures += not ok
+    print(f"{'ok  ' if ok else 'FAIL'} {message}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--games", type=int, default=12)
+    parser.add_argument("--max-games", type=int, default=4)
+    parser.add_argument("--rounds", type=int, default=30)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'boards.db')}"
+        from app import create_app, db
+        from app.models import Player, Game, GameBoard
+        from app.engine import GameState, SEATS
+        from app.simulation import play, random_strategy
+        from flask_jwt_extended import create_access_token
+
+        app = create_app({"RATELIMIT_ENABLED": False, "MOVE_WRITE_BEHIND": True,
+                          "MOVE_JOURNAL_DIR": os.path.join(tmp, "journal"),
+                          "MOVE_WRITE_BEHIND_MAX_GAMES": args.max_games})
+        games = range(1, args.games + 1)
+        with app.app_context():
+            db.create_all()
+            db.session.add(Player(id=1, name="one", password_hash="x"))
+            for game_id in games:
+                db.session.add(Game(id=game_id, status="ongoing"))
+                db.session.add(GameBoard(game_id=game_id, state=GameState().to_bytes(), move_count=0))
+            db.session.commit()
+            headers = {"Authorization": f"Bearer {create_access_token(identity=1)}"}
+        client = app.test_client()
+        rng = random.Random(1)
+        strategies = [random_strategy] * len(SEATS)
+        states = {game_id: GameState() for game_id in games}
+
+        client.get("/api/games/1/state")
+        queue = app.extensions["write_behind"]
+        peak = 0
+
+        def committed():
+            while queue.committed_id < queue.next_id - 1:
+                time.sleep(0.001)
+
+        def post(game_id, max_moves):
+            nonlocal peak
+            for seat, piece, dice, _, skipped in play(states[game_id], strategies, rng, max_moves):
+                response = client.post("/api/moves", headers=headers, json={
+                    "game_id": game_id, "player_id": 1, "seat": seat, "piece_id": piece + 1,
+                    "dice_roll": dice, "skipped_rolls": list(skipped)})
+                assert response.status_code == 201, response.get_json()
+                peak = max(peak, len(queue.entries))
+                committed()
+
+        for _ in range(args.rounds):
+            for game_id in games:
+                post(game_id, 1)
+        post(1, 10000)
+        check(peak <= args.max_games, f"at most {peak} boards held for {args.games} games (limit {args.max_games})")
+        check(1 not in queue.entries and states[1].winner() is not None,
+              "the finished game's board was dropped")
+        with app.app_context():
+            queue.drain()
+            matches = sum(db.session.get(GameBoard, game_id).state == states[game_id].to_bytes()
+                          for game_id in games)
+            check(matches == args.games, f"{matches} of {args.games} stored boards match what was played")
+        queue.close()
+
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+"""Load test for the game event stream: N spectators per game.
+
+Opens --spectators SSE connections to /api/games/<id>/events for each of
+--games games, then PATCHes every game --updates times and measures how
+long each update takes to reach every spectator. All spectator sockets
+are read by one selector thread, so the client side stays cheap even
+with thousands of idle connections.
+
+By default an in-process threaded server is started on a throwaway
+SQLite database. Point --url at a running server (for example gunicorn
+with gevent workers) to test that instead; games are created through
+the API either way.
+
+Usage:
+    python benchmarks/load_spectators.py [--games 10] [--spectators 100] [--updates 20]
+    python benchmarks/load_spectators.py --url http://127.0.0.1:8000 --spectators 500
+"""
+import argparse
+import json
+import logging
+import os
+import selectors
+import socket
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+from urllib.parse import urlparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def start_local_server(tmp):
+    from werkzeug.serving import make_server
+
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+    from app import create_app, db
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)
+    server = make_server("127.0.0.1", 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}"
+
+
+def request_json(url, method, body, token=None):
+    headers = {"Content-Type": "application/json"}
+    if token is not None:
+        headers["Authorization"] = f"Bearer {token}"
+    req = urllib.request.Request(url, data=json.dumps(body).encode(), method=method, headers=headers)
+    with urllib.request.urlopen(req) as resp:
+        return json.loads(resp.read())
+
+
+EVENT_MARKER = b"event: game\n"
+
+
+class Spectators:
+    """Many SSE connections multiplexed on one selector"""
+
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+        self.selector = selectors.DefaultSelector()
+        self.arrivals = {}  # game_id -> list of per-spectator arrival lists
+        self.running = True
+
+    def open(self, game_id):
+        sock = socket.create_connection((self.host, self.port))
+        sock.sendall(
+            f"GET /api/games/{game_id}/events HTTP/1.1\r\nHost: {self.host}\r\n"
+            f"Accept: text/event-stream\r\n\r\n".encode())
+        sock.setblocking(False)
+        arrivals = []
+        self.arrivals.setdefault(game_id, []).append(arrivals)
+        self.selector.register(sock, selectors.EVENT_READ, [arrivals, b""])
+
+    def run(self):
+        while self.running:
+            for key, _ in self.selector.select(timeout=0.2):
+                arrivals, tail = key.data
+                try:
+                    chunk = key.fileobj.recv(65536)
+                except BlockingIOError:
+                    continue
+                if not chunk:
+                    self.selector.unregister(key.fileobj)
+                    continue
+                now = time.perf_counter()
+                buffer = tail + chunk
+                arrivals.extend(now for _ in range(buffer.count(EVENT_MARKER)))
+                # Keep a tail too short to hold a whole marker, in case one
+                # straddles two reads
+                key.data[1] = buffer[-(len(EVENT_MARKER) - 1):]
+
+    def close(self):
+        self.running = False
+        for key in list(self.selector.get_map().values()):
+            key.fileobj.close()
+
+
+def percentile(samples, pct):
+    if not samples:
+        return float("nan")
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * pct / 100))]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url")
+    parser.add_argument("--games", type=int, default=10)
+    parser.add_argument("--spectators", type=int, default=100, help="per game")
+    parser.add_argument("--updates", type=int, default=20, help="per game")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        server = None
+        base_url = args.url
+        if base_url is None:
+            server, base_url = start_local_server(tmp)
+        parsed = urlparse(base_url)
+
+        # Updating a game takes a logged-in player
+        token = request_json(f"{base_url}/api/auth/register", "POST",
+                             {"name": f"spectate{os.getpid()}", "password": "Spectate-password1"})["access_token"]
+        game_ids = [request_json(f"{base_url}/api/games", "POST", {"status": "ongoing"})["id"]
+                    for _ in range(args.games)]
+
+        spectators = Spectators(parsed.hostname, parsed.port)
+        start = time.perf_counter()
+        for game_id in game_ids:
+            for _ in range(args.spectators):
+                spectators.open(game_id)
+        print(f"opened {args.games * args.spectators} spectators in {time.perf_counter() - start:.2f}s")
+        reader = threading.Thread(target=spectators.run, daemon=True)
+        reader.start()
+        time.sleep(1.0)
+
+        sent = {game_id: [] for game_id in game_ids}
+        start = time.perf_counter()
+        for i in range(args.updates):
+            for game_id in game_ids:
+                sent[game_id].append(time.perf_counter())
+                status = "paused" if i % 2 == 0 else "ongoing"
+                request_json(f"{base_url}/api/games/{game_id}", "PATCH", {"status": status}, token)
+        publish_time = time.perf_counter() - start
+        time.sleep(1.0)
+
+        latencies = []
+        delivered = 0
+        for game_id in game_ids:
+            for arrivals in spectators.arrivals[game_id]:
+                delivered += len(arrivals)
+                latencies.extend(arrivals[k] - sent[game_id][k] for k in range(len(arrivals)))
+
+        spectators.close()
+        if server is not None:
+            server.shutdown()
+
+    expected = args.games * args.spectators * args.updates
+    print(f"updates sent:     {args.games * args.updates} in {publish_time:.2f}s")
+    print(f"events delivered: {delivered}/{expected}")
+    print(f"latency p50:      {percentile(latencies, 50) * 1000:.1f} ms")
+    print(f"latency p99:      {percentile(latencies, 99) * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+"""Smoke load test against the multi-worker production server.
+
+Creates a throwaway SQLite database, starts `serve.py --workers N` on a
+free port and runs --clients threads of mixed reads and writes
+(create game, list games, board state, leaderboard) for --duration
+seconds. Reports throughput and latency and exits non-zero on any
+failed request or if fewer than N workers came up.
+
+Usage:
+    python benchmarks/smoke_multiworker.py [--workers 4] [--clients 16] [--duration 10]
+"""
+import argparse
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND)
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def request(url, body=None):
+    data = json.dumps(body).encode() if body is not None else None
+    req = urllib.request.Request(url, data=data, headers={"Content-Type": "application/json"})
+    try:
+        with urllib.request.urlopen(req, timeout=30) as resp:
+            return resp.status, resp.read()
+    except urllib.error.HTTPError as err:
+        return err.code, err.read()
+    except OSError:
+        return 0, b""
+
+
+def wait_ready(base_url, timeout=30):
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        if request(f"{base_url}/api/games?limit=1")[0] == 200:
+            return True
+        time.sleep(0.1)
+    return False
+
+
+def worker_pids(master_pid):
+    """Children of the gunicorn master, read from /proc"""
+    pids = []
+    for entry in os.listdir("/proc"):
+        if entry.isdigit():
+            try:
+                with open(f"/proc/{entry}/stat") as stat:
+                    if int(stat.read().rsplit(")", 1)[1].split()[1]) == master_pid:
+                        pids.append(int(entry))
+            except (OSError, IndexError, ValueError):
+                continue
+    return pids
+
+
+def percentile(samples, pct):
+    if not samples:
+        return float("nan")
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * pct / 100))]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=10)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ, DATABASE_URL=f"sqlite:///{os.path.join(tmp, 'smoke.db')}",
+                   GUNICORN_ACCESS_LOG="/dev/null")
+        os.environ.update(env)
+        from app import create_app, db
+        with create_app().app_context():
+            db.create_all()
+
+        base_url = f"http://127.0.0.1:{free_port()}"
+        server = subprocess.Popen(
+            [sys.executable, os.path.join(BACKEND, "serve.py"), "--workers", str(args.workers),
+             "--threads", str(args.threads), "--bind", base_url.split("//")[1]],
+            env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            started = time.perf_counter()
+            if not wait_ready(base_url):
+                print("server did not come up")
+                sys.exit(1)
+            print(f"ready in {time.perf_counter() - started:.2f}s")
+            time.sleep(1)
+            workers = len(worker_pids(server.pid))
+
+            stop = time.perf_counter() + args.duration
+            latencies, failures = [], []
+
+            def client(seed):
+                rng = random.Random(seed)
+                game_ids = []
+                while time.perf_counter() < stop:
+                    roll = rng.random()
+                    start = time.perf_counter()
+                    if roll < 0.1 or not game_ids:
+                        status, body = request(f"{base_url}/api/games", {"status": "ongoing"})
+                        if status == 201:
+                            game_ids.append(json.loads(body)["id"])
+                    elif roll < 0.5:
+                        status, _ = request(f"{base_url}/api/games/{rng.choice(game_ids)}/state")
+                    elif roll < 0.8:
+                        status, _ = request(f"{base_url}/api/games?limit=20")
+                    else:
+                        status, _ = request(f"{base_url}/api/leaderboard?limit=10")
+                    latencies.append(time.perf_counter() - start)
+                    if not 200 <= status < 300:
+                        failures.append(status)
+
+            threads = [threading.Thread(target=client, args=(seed,)) for seed in range(args.clients)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        finally:
+            server.terminate()
+            server.wait(timeout=30)
+
+    print(f"workers:   {workers}/{args.workers}")
+    print(f"requests:  {len(latencies)} ({len(latencies) / args.duration:.0f}/s)")
+    print(f"p50/p99:   {percentile(latencies, 50) * 1000:.1f} / {percentile(latencies, 99) * 1000:.1f} ms")
+    print(f"failed:    {len(failures)} {sorted(set(failures)) if failures else ''}")
+    sys.exit(1 if failures or workers < args.workers else 0)
+
+
+if __name__ == "__main__":
+    main()
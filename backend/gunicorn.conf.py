@@ -0,0 +1,60 @@
+"""Gunicorn settings for production.
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+    python serve.py --workers 4
+
+Defaults are sized from the CPU count; every setting can be overridden
+from the environment or (through serve.py) the command line.
+
+`kill -HUP <master pid>` reloads this file and replaces the workers
+gracefully. Because the app is preloaded in the master, new code needs
+a new master: `kill -USR2 <master pid>`, then `kill -TERM` the old one
+once the new workers are up.
+"""
+import multiprocessing
+import os
+
+cpus = multiprocessing.cpu_count()
+
+# MOVE_WRITE_BEHIND keeps queued moves and their journal in one process
+write_behind = os.getenv("MOVE_WRITE_BEHIND", "").lower() in ("1", "true", "yes", "on")
+
+bind = os.getenv("BIND", f"{os.getenv('HOST', '0.0.0.0')}:{os.getenv('PORT', '5000')}")
+
+# Requests mostly wait on SQLite or bcrypt (which runs in its own pool),
+# so a few threads per worker keep each process busy. Each open event
+# stream holds a thread for as long as the spectator watches, so a gthread
+# worker serves at most `threads` streams and requests at once; set
+# GUNICORN_WORKER_CLASS=gevent to hold up to `worker_connections` each
+workers = int(os.getenv("WEB_CONCURRENCY", 1 if write_behind else cpus * 2 + 1))
+worker_class = os.getenv("GUNICORN_WORKER_CLASS", "gthread")
+threads = int(os.getenv("GUNICORN_THREADS", "4"))
+worker_connections = int(os.getenv("GUNICORN_WORKER_CONNECTIONS", "1000"))
+
+# Build the app once in the master and fork it, so workers start fast and
+# share its memory; database pools are reset in each child. gevent patches
+# the standard library as each worker starts, so under it the app is
+# imported in the workers, after the patching, instead
+preload_app = os.getenv("GUNICORN_PRELOAD", "0" if worker_class == "gevent" else "1") == "1"
+
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "30"))
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", "30"))
+keepalive = 5
+
+# Recycle workers now and then to cap slow leaks; jitter avoids restarting them all at once
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", "10000"))
+max_requests_jitter = max_requests // 10
+
+accesslog = os.getenv("GUNICORN_ACCESS_LOG", "-")
+errorlog = "-"
+loglevel = os.getenv("LOG_LEVEL", "info")
+
+
+def on_starting(server):
+    # The workers inherit the final count (after --workers), which the
+    # password hashing pool divides the CPUs by; see app/passwords.py
+    os.environ["WEB_CONCURRENCY"] = str(server.cfg.workers)
+    # WEB_CONCURRENCY or --workers can still ask for more than one
+    if write_behind and server.cfg.workers > 1:
+        raise SystemExit(f"MOVE_WRITE_BEHIND needs a single worker process, not {server.cfg.workers}: "
+                         "every worker would queue moves against its own copy of the boards")
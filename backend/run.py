@@ -3,4 +3,6 @@ from app import create_app
 app = create_app()
 
 if __name__ == "__main__":
-    app.run(debug=True)
\ No newline at end of file
+    # Development server; set FLASK_DEBUG=1 for the debugger and reloader.
+    # Use serve.py (gunicorn) in production.
+    app.run()
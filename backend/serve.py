@@ -0,0 +1,47 @@
+"""Run the API under gunicorn with the settings in gunicorn.conf.py.
+
+Usage:
+    python serve.py [--workers N] [--threads N] [--worker-class gthread|gevent] [--bind HOST:PORT] [--reload]
+
+Flags override gunicorn.conf.py, which in turn reads its defaults from
+the environment. Use run.py for the single-process development server.
+"""
+import argparse
+import os
+import sys
+from gunicorn.app.wsgiapp import WSGIApplication
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", "-w", type=int, help="worker processes (default: 2 x CPUs + 1)")
+    parser.add_argument("--threads", type=int, help="threads per worker (default: 4)")
+    parser.add_argument("--worker-class", "-k", choices=("gthread", "gevent"),
+                        help="gevent holds many event streams per worker (default: gthread)")
+    parser.add_argument("--bind", "-b", help="address to listen on (default: 0.0.0.0:5000)")
+    parser.add_argument("--reload", action="store_true", help="restart workers when code changes (development)")
+    args = parser.parse_args(argv)
+
+    gunicorn_args = ["--config", os.path.join(HERE, "gunicorn.conf.py"), "--chdir", HERE]
+    if args.workers is not None:
+        gunicorn_args += ["--workers", str(args.workers)]
+    if args.threads is not None:
+        gunicorn_args += ["--threads", str(args.threads)]
+    if args.worker_class:
+        # gunicorn.conf.py reads it to decide on preloading
+        os.environ["GUNICORN_WORKER_CLASS"] = args.worker_class
+    if args.bind:
+        gunicorn_args += ["--bind", args.bind]
+    if args.reload:
+        # Code reloading needs the app imported in the workers, not the master
+        os.environ["GUNICORN_PRELOAD"] = "0"
+        gunicorn_args.append("--reload")
+
+    sys.argv = ["gunicorn"] + gunicorn_args + ["wsgi:app"]
+    WSGIApplication("%(prog)s [OPTIONS] [APP_MODULE]").run()
+
+
+if __name__ == "__main__":
+    main()
@@ -114,11 +114,11 @@ function Game() {
     // Track the move immediately after
     if (gameId && playerId && selectedToken) {
       try {
-        const position = getTokenPosition(selectedToken.player, selectedToken.index);
+        // The server replays the rules and works out where the token lands
         const moveData = {
           dice_roll: diceValue,
           piece_id: selectedToken.index + 1,
-          position: position.col + position.row * 15, // Calculate position based on row and col
+          seat: currentPlayerIndex,
           player_id: playerId,
           game_id: gameId
         };
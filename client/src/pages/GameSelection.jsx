@@ -11,7 +11,7 @@ const GameSelection = () => {
     const fetchGames = async () => {
       try {
         const response = await api.get('/games');
-        setGames(response.data);
+        setGames(response.data.items);
       } catch (error) {
         console.error('Failed to fetch games:', error);
       } finally {
@@ -9,7 +9,7 @@ const History = () => {
     const fetchGames = async () => {
       try {
         const response = await api.get('/games');
-        setGames(response.data);
+        setGames(response.data.items);
       } catch (error) {
         console.error('Error fetching games:', error);
       } finally {
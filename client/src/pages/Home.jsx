@@ -18,7 +18,7 @@ const Home = () => {
   const fetchPlayers = async () => {
     try {
       const response = await api.get('/players');
-      setPlayers(response.data);
+      setPlayers(response.data.items);
     } catch {
       // error ignored
     }
@@ -27,7 +27,7 @@ const Home = () => {
   const fetchGames = async () => {
     try {
       const response = await api.get('/games');
-      setGames(response.data);
+      setGames(response.data.items);
     } catch {
       // error ignored
     }